@@ -2,11 +2,8 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
 from sklearn.cluster import KMeans, DBSCAN, AgglomerativeClustering
-import copy
 import hdbscan
-from sklearn.impute import SimpleImputer
 import logging
 import random
 from math import radians, cos, sin, asin, sqrt
@@ -16,6 +13,7 @@ import time
 import os
 from dotenv import load_dotenv
 import uuid
+import hashlib
 
 # Import Google Generative AI
 try:
@@ -25,6 +23,18 @@ except ImportError:
     print("Warning: google-generativeai not installed. AI insights will not be available.")
     GEMINI_AVAILABLE = False
 from feature_descriptions import get_feature_description, get_features_by_category, get_all_categories, get_feature_suggestions, FEATURE_DESCRIPTIONS
+from response_formats import build_response, parse_response_mode
+from dataset_store import DatasetRegistry, SpatialDataset, compute_dataset_id, extract_features, is_arrow_upload, read_arrow_table
+from geometry_utils import GeometryCache
+from feature_store import IMPUTATION_ZERO, NORMALIZATION_MINMAX, NORMALIZATION_RANK
+from ranking import RankingCache, RankingIndex, parse_filters, parse_page
+from cluster_matching import CLUSTER_MATCH_DISTANCE_WEIGHT, match_clusters, renumber_matched_clusters
+from scenarios import (MAX_BASELINE_CLUSTERINGS, ScenarioResultCache, apply_scenario, canonical_hash, cluster_means, feature_sensitivity, labels_from_clusters,
+                       parse_ensemble, parse_sweep, restore_overlays, scenario_overlays, scenario_seed, scenario_target_mask,
+                       score_scenario_ensemble, summarize_ensemble, sweep_scores)
+from scoring import (normalize_weights, parse_chunked_scoring, parse_imputation, parse_normalization, rank_correlations, rescale_scores,
+                     resolve_directions, resolve_weight_schemes, score_batch, score_chunked, score_histograms, top_k_rows,
+                     use_chunked_scoring)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -41,6 +51,30 @@ if not GEMINI_API_KEY:
     print("Warning: GEMINI_API_KEY not found. AI insights will not be available.")
     GEMINI_AVAILABLE = False
 
+# --- Dataset Registry ---
+dataset_registry = DatasetRegistry()
+
+# Per-polygon centroid / bbox / area summaries reused across requests that re-post the same polygons
+geometry_cache = GeometryCache()
+
+# Rank indexes of registered datasets per scoring parameters, so paging and filtering skip re-scoring
+ranking_cache = RankingCache()
+
+# Clustered scenario results per dataset and request, so repeated what-if runs skip scoring and clustering
+scenario_cache = ScenarioResultCache()
+
+# Baseline clusterings per dataset and clustering parameters, reused as the original side of scenario comparisons
+baseline_cache = ScenarioResultCache(MAX_BASELINE_CLUSTERINGS)
+
+# Request keys that do not change a scenario result: the dataset is keyed separately and the rest only shape the response
+_SCENARIO_CACHE_IGNORED_KEYS = ('polygons', 'dataset_id', 'response_mode', 'stream_response')
+
+# Clusters returned per clustering run unless params.max_clusters says otherwise (0 returns every cluster)
+DEFAULT_MAX_CLUSTERS = int(os.getenv('DEFAULT_MAX_CLUSTERS', 10))
+
+# Request bodies larger than this are parsed incrementally instead of through request.json
+STREAMING_UPLOAD_THRESHOLD_BYTES = int(os.getenv('STREAMING_UPLOAD_THRESHOLD_MB', 64)) * 1024 * 1024
+
 # --- Decorators ---
 def performance_monitor(func):
     """A decorator to monitor the execution time of a function."""
@@ -249,25 +283,10 @@ def _get_nearest_city(lat, lng):
     
     return location_desc
 
-def _extract_coordinates(polygons):
-    """Extracts longitude and latitude from polygon geometries."""
-    coordinates = []
-    valid_indices = []
-    for i, p in enumerate(polygons):
-        geom = p.get('geometry', {})
-        coords = None
-        if geom.get('type') == 'Point':
-            coords = geom['coordinates']
-        elif geom.get('type') == 'Polygon':
-            coords = np.mean(geom['coordinates'][0], axis=0)
-        elif geom.get('type') == 'MultiPolygon':
-            coords = np.mean(geom['coordinates'][0][0], axis=0)
-        
-        if coords is not None and len(coords) == 2:
-            coordinates.append(coords)
-            valid_indices.append(i)
-            
-    return np.array(coordinates), valid_indices
+def _extract_coordinates(dataset):
+    """Returns the clusterable lng/lat coordinates of a dataset and their row indices."""
+    valid_indices = np.flatnonzero(dataset.valid_mask)
+    return dataset.coords[valid_indices], valid_indices
 
 def _buffer_clustering(coords, radius_km, min_points):
     """
@@ -349,6 +368,80 @@ def _get_clustering_model(algorithm, params):
     else:
         raise ValueError(f"Unknown algorithm: {algorithm}")
 
+def _fit_cluster_labels(coords, algorithm, params):
+    """Fits the requested clustering to the (n, 2) lng/lat coordinates and returns the raw labels."""
+    if algorithm == 'buffer':
+        # Custom buffer clustering implementation
+        return _buffer_clustering(coords, params.get('radius', 5.0), params.get('min_polygons_per_cluster', 1))
+    model = _get_clustering_model(algorithm, params)
+    
+    # HDBSCAN uses a different input format if using Haversine
+    X_cluster = np.radians(coords) if algorithm in ['dbscan', 'hdbscan'] else coords
+    return model.fit_predict(X_cluster)
+
+def _dataset_key(data, dataset):
+    """The request's dataset_id for registered datasets, or a content fingerprint of inline polygons."""
+    return data['dataset_id'] if data.get('dataset_id') and not data.get('polygons') else dataset.fingerprint()
+
+def _scores_digest(dataset):
+    """Hash of the dataset's score vector, for keying results computed from it."""
+    return hashlib.sha256(np.ascontiguousarray(dataset.scores, dtype=np.float64).tobytes()).hexdigest()
+
+def _baseline_id(dataset, algorithm, params):
+    """Hash of a clustering's algorithm and params and of the scores its cluster statistics come from."""
+    return canonical_hash({'algorithm': algorithm, 'params': params, 'scores': _scores_digest(dataset)})[:16]
+
+def _retained_baseline(data, dataset_key, dataset, algorithm, params):
+    """
+    Baseline clustering retained for the request's 'baseline_id', or for the same dataset, algorithm,
+    params and scores.
+    
+    Returns:
+        Tuple of (copies of the retained clusters, or None if neither is cached, baseline id)
+    """
+    baseline_id = _baseline_id(dataset, algorithm, params)
+    for candidate in (data.get('baseline_id'), baseline_id):
+        clusters = baseline_cache.get((dataset_key, candidate)) if candidate else None
+        if clusters is not None:
+            return [dict(c) for c in clusters], candidate
+    return None, baseline_id
+
+def _baseline_clusters(data, dataset_key, dataset, algorithm, params, min_size, max_size, compute=True):
+    """
+    Baseline clusters for a scenario comparison.
+    
+    Uses the retained clustering (see _retained_baseline), and clusters the baseline (retaining the
+    result) only when none is cached and compute is True.
+    
+    Returns:
+        Tuple of (clusters, or None if the baseline is not cached and not computed or has no valid
+        coordinates, baseline id, whether it was reused)
+    """
+    clusters, baseline_id = _retained_baseline(data, dataset_key, dataset, algorithm, params)
+    if clusters is not None:
+        logger.info(f"Reusing baseline clustering {baseline_id} for dataset {dataset_key}.")
+        return clusters, baseline_id, True
+    
+    coords, valid_indices = _extract_coordinates(dataset) if compute else (np.empty((0, 2)), None)
+    if coords.shape[0] == 0:
+        return None, baseline_id, False
+    labels = _fit_cluster_labels(coords, algorithm, params)
+    clusters, _ = _process_cluster_results(dataset, labels, coords, valid_indices, min_size, max_size,
+                                           params.get('max_clusters', DEFAULT_MAX_CLUSTERS))
+    
+    # Ensure original cluster numbers are unique
+    clusters = _ensure_unique_cluster_numbers(clusters, "original_")
+    baseline_cache.put((dataset_key, baseline_id), [dict(c) for c in clusters])
+    return clusters, baseline_id, False
+
+def _scenario_key(dataset_key, request_digest, baseline_clusters):
+    """
+    Scenario cache key of a request (digest of its body and the scores it started from) and of the
+    baseline clusters its cluster numbers and cluster_matching were matched against, None if unmatched.
+    """
+    baseline = canonical_hash(baseline_clusters) if baseline_clusters is not None else None
+    return dataset_key, canonical_hash({'request': request_digest, 'baseline': baseline})
+
 def _generate_unique_id():
     """Generate a unique numeric ID for clusters."""
     import time
@@ -422,12 +515,58 @@ def _add_polygon_ids(polygons):
             polygon['id'] = _generate_polygon_id()
     return polygons
 
-def _process_cluster_results(polygons, labels, coords, valid_indices, min_size, max_size):
-    """Filters clusters by size, calculates stats, and assigns labels to polygons."""
+def _resolve_dataset(data):
+    """
+    Returns the request's data as a SpatialDataset.
+    
+    Registered datasets are looked up by dataset_id and returned as a shallow copy so
+    per-request labels never leak into the registry; inline polygons are parsed once.
+    Returns None if the dataset_id is unknown or no polygons were provided.
+    """
+    polygons = data.get('polygons')
+    dataset_id = data.get('dataset_id')
+    if not polygons and dataset_id:
+        dataset = dataset_registry.get(dataset_id)
+        return dataset.shallow_copy() if dataset is not None else None
+    if not polygons:
+        return None
+    return SpatialDataset.from_features(_add_polygon_ids(polygons), geometry_cache=geometry_cache)
+
+def _should_stream_upload():
+    """True when the request asks for streaming ingestion or its body is too large to decode at once."""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return (request.content_length or 0) > STREAMING_UPLOAD_THRESHOLD_BYTES
+
+def _load_request_data():
+    """
+    Returns the request's JSON body.
+    
+    Large bodies (or ?stream=true) are parsed incrementally: their features are registered as a
+    dataset and replaced by its dataset_id, so the whole payload never exists as Python objects.
+    The id hashes only the features, so requests that differ in other keys share one dataset.
+    """
+    if request.mimetype == 'multipart/form-data' or not _should_stream_upload():
+        return request.json
+    dataset_id, payload = dataset_registry.register_stream(request.stream, feature_keys=('polygons',), features_only=True)
+    if dataset_id:
+        payload['dataset_id'] = dataset_id
+    return payload
+
+def _process_cluster_results(dataset, labels, coords, valid_indices, min_size, max_size, max_clusters=DEFAULT_MAX_CLUSTERS):
+    """
+    Filters clusters by size and calculates stats from the dataset's score vector.
+    Only the max_clusters best-scoring clusters are kept (all of them if max_clusters is 0 or None).
+    
+    Returns:
+        Tuple of (cluster stats, per-row cluster number array with -1 for unassigned rows)
+    """
+    final_labels = np.full(len(dataset), -1, dtype=np.int64)
     if len(labels) == 0:
-        return [], []
+        return [], final_labels
         
-    unique_labels, counts = np.unique(labels, return_counts=True)
+    labels = np.asarray(labels)
+    unique_labels, first_index, counts = np.unique(labels, return_index=True, return_counts=True)
     
     # Remove noise (-1) from consideration
     valid_labels = unique_labels[unique_labels != -1]
@@ -445,6 +584,12 @@ def _process_cluster_results(polygons, labels, coords, valid_indices, min_size,
     
     logger.info(f"Found {len(valid_cluster_ids)} valid clusters after filtering by size (min: {min_size}, max: {max_size}).")
 
+    # Group members by label once instead of masking the label vector per cluster
+    order = np.argsort(labels, kind='stable')
+    group_start = dict(zip(unique_labels.tolist(), np.searchsorted(labels[order], unique_labels).tolist()))
+    group_count = dict(zip(unique_labels.tolist(), counts.tolist()))
+    member_scores_all = dataset.scores[valid_indices]
+
     # Calculate statistics for valid clusters
     clusters_stats = []
     cluster_counter = 1  # Sequential counter for cluster IDs
@@ -458,11 +603,10 @@ def _process_cluster_results(polygons, labels, coords, valid_indices, min_size,
         sequential_counter += 1
     
     for cid in valid_cluster_ids:
-        cluster_mask = (labels == cid)
-        member_indices = np.where(cluster_mask)[0]
+        start = group_start[int(cid)]
+        member_indices = order[start:start + group_count[int(cid)]]
         
-        cluster_polygons = [polygons[valid_indices[i]] for i in member_indices]
-        cluster_scores = [p['properties'].get('suitabilityScore', 0) for p in cluster_polygons]
+        cluster_scores = member_scores_all[member_indices]
         
         cluster_coords = coords[member_indices]
         centroid = np.mean(cluster_coords, axis=0).tolist() if len(cluster_coords) > 0 else [0, 0]
@@ -476,18 +620,19 @@ def _process_cluster_results(polygons, labels, coords, valid_indices, min_size,
             'cluster_id': cluster_id,
             'cluster_number': cluster_number,  # Now guaranteed to be sequential
             'count': len(member_indices),
-            'avg_suitability_score': float(np.mean(cluster_scores)) if cluster_scores else 0.0,
-            'median_suitability_score': float(np.median(cluster_scores)) if cluster_scores else 0.0,
-            'min_suitability_score': float(np.min(cluster_scores)) if cluster_scores else 0.0,
-            'max_suitability_score': float(np.max(cluster_scores)) if cluster_scores else 0.0,
+            'avg_suitability_score': float(np.mean(cluster_scores)) if len(cluster_scores) else 0.0,
+            'median_suitability_score': float(np.median(cluster_scores)) if len(cluster_scores) else 0.0,
+            'min_suitability_score': float(np.min(cluster_scores)) if len(cluster_scores) else 0.0,
+            'max_suitability_score': float(np.max(cluster_scores)) if len(cluster_scores) else 0.0,
             'std_suitability_score': float(np.std(cluster_scores)) if len(cluster_scores) > 1 else 0.0,
             'centroid': centroid,
-            'polygon_ids': [p.get('id', _generate_polygon_id()) for p in cluster_polygons]
+            'polygon_ids': dataset.ids[valid_indices[member_indices]].tolist()
         })
 
-    # Sort clusters by score and take the top 10
-    clusters_stats = sorted(clusters_stats, key=lambda c: c['avg_suitability_score'], reverse=True)[:10]
-    final_cluster_numbers = {c['cluster_number'] for c in clusters_stats}
+    # Sort clusters by score and take the top max_clusters
+    clusters_stats = sorted(clusters_stats, key=lambda c: c['avg_suitability_score'], reverse=True)
+    if max_clusters:
+        clusters_stats = clusters_stats[:max_clusters]
     
     # Validate that all cluster numbers are unique
     cluster_numbers = [c['cluster_number'] for c in clusters_stats]
@@ -503,93 +648,60 @@ def _process_cluster_results(polygons, labels, coords, valid_indices, min_size,
             if cluster['cluster_number'] != original_number:
                 logger.info(f"Reassigned cluster number from {original_number} to {cluster['cluster_number']}")
     
-    # Update final_cluster_numbers after fixing duplicates
     final_cluster_numbers = {c['cluster_number'] for c in clusters_stats}
     
-    # Create mapping from original labels to sequential cluster numbers for polygon assignment
-    label_to_cluster_number = {c['cluster_number']: c['cluster_number'] for c in clusters_stats}
-    
-    # Assign final cluster labels to the original polygons using sequential numbers
-    final_labels = {}
-    for i, label in enumerate(labels):
-        if label in valid_cluster_ids and label_to_sequential.get(label) in final_cluster_numbers:
-            final_labels[valid_indices[i]] = label_to_sequential[label]
-    
-    output_polygons = []
-    for i, p in enumerate(polygons):
-        if i in final_labels:
-            # Add unique polygon ID if not present
-            if 'id' not in p:
-                p['id'] = _generate_polygon_id()
-            p['cluster'] = final_labels[i]  # Now using sequential cluster numbers
-            output_polygons.append(p)
+    # Assign final cluster labels to the dataset rows using sequential numbers via a lookup table
+    lookup = np.full(int(unique_labels.max()) + 2, -1, dtype=np.int64)
+    for label, sequential in label_to_sequential.items():
+        if sequential in final_cluster_numbers:
+            lookup[int(label) + 1] = sequential
+    final_labels[valid_indices] = lookup[labels + 1]
     
     # Log final cluster numbers for debugging
     logger.info(f"Final cluster numbers: {[c['cluster_number'] for c in clusters_stats]}")
     logger.info(f"All cluster numbers are unique: {len(set(c['cluster_number'] for c in clusters_stats)) == len(clusters_stats)}")
             
-    return clusters_stats, output_polygons
+    return clusters_stats, final_labels
     
 # --- Scenario & Scoring Functions ---
 
-def _apply_scenario(polygons, scenario_config):
-    """Applies feature changes to a deep copy of polygons based on scenario."""
-    logger.info("Applying scenario changes to polygons.")
-    polygons_new = copy.deepcopy(polygons)
-    feature_changes = scenario_config.get('featureChanges', [])
-    village_percentage = scenario_config.get('villagePercentage', 100)
-    randomness_factor = scenario_config.get('randomnessFactor', 0)
-    
-    n = len(polygons_new)
-    n_affected = max(1, int(n * village_percentage / 100))
-    affected_indices = set(random.sample(range(n), n_affected))
-
-    for idx in affected_indices:
-        p_props = polygons_new[idx]['properties']
-        for fc in feature_changes:
-            feat = fc['feature']
-            base_val = p_props.get(feat, 0)
-            percent = fc['percentChange']
-            actual_percent = percent + random.uniform(-randomness_factor, randomness_factor)
-            p_props[feat] = base_val * (1 + actual_percent / 100)
-            
-    return polygons_new
-
 @performance_monitor
-def normalize_and_score(polygons, features, weights):
-    """Optimized normalization and scoring function."""
-    if not polygons or not features or not weights:
-        return polygons
-        
-    properties = [p['properties'] for p in polygons]
-    df = pd.DataFrame(properties)
-    
-    # Ensure all required features exist, fill with 0 if not
-    for feat in features:
-        if feat not in df.columns:
-            df[feat] = 0
-            
-    feature_matrix = df[features].to_numpy(dtype=np.float64, na_value=0)
+def normalize_and_score(dataset, features, weights, normalization=NORMALIZATION_MINMAX, directions=None, chunked=None,
+                        imputation=IMPUTATION_ZERO):
+    """
+    Normalizes the selected feature columns and writes the suitability score vector onto the dataset.
     
-    scaler = MinMaxScaler()
-    normalized_matrix = scaler.fit_transform(feature_matrix)
+    Args:
+        normalization: 'minmax', 'robust', 'zscore' or 'rank' (see FeatureColumn.normalized)
+        directions: Per-feature booleans, False for features where lower values are better;
+            defaults to positive_impact from the feature catalog
+        chunked: Force (True) or disable (False) out-of-core scoring; None decides from the selection size
+        imputation: How missing values are filled: 'zero', 'median', 'mean' or 'neighbor' (spatial neighbors)
+    """
+    if not len(dataset) or not features or not weights:
+        return dataset
+        
+    normalized_weights = normalize_weights(weights)
+    if directions is None:
+        directions = resolve_directions(features, None)
+    # Fill values are computed once per dataset and method; later requests reuse the imputed table
+    feature_table = dataset.feature_table.imputed(imputation, dataset.coords, features)
     
-    weights_arr = np.array(weights, dtype=np.float64)
-    normalized_weights = weights_arr / weights_arr.sum()
+    if use_chunked_scoring(feature_table, features, normalization, chunked):
+        # Too large to normalize in memory: two passes over row chunks into a memory-mapped score vector
+        logger.info(f"Scoring {len(dataset)} polygons out of core over {len(features)} features.")
+        dataset.scores = score_chunked(feature_table, features, normalized_weights, normalization, directions)
+        dataset.scored = True
+        return dataset
     
-    suitability_scores = np.dot(normalized_matrix, normalized_weights)
+    # One matrix-vector product over the dataset's cached normalized matrix
+    suitability_scores = feature_table.weighted_sum(features, normalized_weights, method=normalization,
+                                                             directions=directions)
     
-    # Scale scores for better differentiation (e.g., 7-10 range)
-    min_s, max_s = suitability_scores.min(), suitability_scores.max()
-    if max_s > min_s:
-        final_scores = 7 + 3 * (suitability_scores - min_s) / (max_s - min_s)
-    else:
-        final_scores = np.full_like(suitability_scores, 8.5)
-
-    for i, p in enumerate(polygons):
-        p['properties']['suitabilityScore'] = float(final_scores[i])
-        
-    return polygons
+    # Scale scores for better differentiation (7-10 range)
+    dataset.scores = rescale_scores(suitability_scores)
+    dataset.scored = True
+    return dataset
 
 # --- AI Insight Generation (Refactored) ---
 
@@ -855,6 +967,80 @@ Generate a comprehensive, business-focused analysis for {product_name} that incl
     
 # --- Feature Analysis (Rewritten for Statistical Soundness) ---
 
+def _sensitivity_level(sensitivity_ratio):
+    """Buckets a score-change-per-percent ratio into High / Medium / Low."""
+    if sensitivity_ratio >= 0.5:
+        return 'High'
+    if sensitivity_ratio >= 0.2:
+        return 'Medium'
+    return 'Low'
+
+def _feature_changes_list(feature_changes):
+    """Feature changes as a list of {feature, percentChange}, from either a list or a {feature: percent} dict."""
+    if isinstance(feature_changes, dict):
+        return [{'feature': k, 'percentChange': v} for k, v in feature_changes.items()]
+    return list(feature_changes or [])
+
+def _analytic_feature_sensitivity(dataset, data):
+    """
+    Exact sensitivity of every fixed cluster to each feature change, without a scenario clustering pass.
+    
+    Clusters come from original_clusters' polygon_ids, or the polygons' 'cluster' values when those
+    are absent. Changes apply to all villages, or to the villages matched by 'target'.
+    
+    Raises:
+        ValueError: for missing weights, unscored features or rank normalization
+    """
+    features = data.get('features', [])
+    weights = data.get('weights', [])
+    if not features or len(features) != len(weights):
+        raise ValueError('Analytic sensitivity needs features and weights of equal length')
+    changes = [(fc.get('feature'), float(fc.get('percentChange', 0))) for fc in _feature_changes_list(data.get('feature_changes'))]
+    unscored = [f for f, _ in changes if f not in features]
+    if unscored:
+        raise ValueError(f"Changed features must be among the scored features: {unscored}")
+    normalization = parse_normalization(data)
+    if normalization == NORMALIZATION_RANK:
+        raise ValueError('Analytic sensitivity needs a fixed normalization scale; rank normalization is not supported')
+    directions = resolve_directions(features, data)
+    imputation = parse_imputation(data)
+    rows = np.flatnonzero(scenario_target_mask(dataset, data['target'])) if data.get('target') else None
+
+    clusters = data.get('original_clusters') or []
+    labels = labels_from_clusters(dataset, clusters) if any(c.get('polygon_ids') for c in clusters) else dataset.labels
+    feature_table = dataset.feature_table.imputed(imputation, dataset.coords, features)
+    numbers, effects = feature_sensitivity(feature_table, features, weights, changes, normalization, directions, labels, rows)
+
+    sensitivity = {}
+    for effect in effects:
+        # Without clusters the whole dataset counts as one
+        cluster_changes = effect['cluster_changes'] if len(numbers) else effect['village_changes'][None].mean(axis=1)
+        cluster_marginals = effect['cluster_marginals']
+        percent_change = effect['percent_change']
+        avg_score_change = float(cluster_changes.mean())
+        sensitivity_ratio = abs(avg_score_change / percent_change) if percent_change != 0 else 0
+        sensitivity[effect['feature']] = {
+            'feature': effect['feature'],
+            'percent_change': percent_change,
+            'avg_score_change': avg_score_change,
+            'max_score_change': float(cluster_changes.max()),
+            'min_score_change': float(cluster_changes.min()),
+            'sensitivity_ratio': sensitivity_ratio,
+            'sensitivity_level': _sensitivity_level(sensitivity_ratio),
+            'clusters_affected': int(np.count_nonzero(cluster_changes)),
+            'village_score_change': {
+                'mean': float(effect['village_changes'].mean()),
+                'min': float(effect['village_changes'].min()),
+                'max': float(effect['village_changes'].max())
+            },
+            'clusters': [{
+                'cluster_number': number,
+                'score_change': float(cluster_changes[c]),
+                'marginal_effect_per_percent': float(cluster_marginals[c])
+            } for c, number in enumerate(numbers.tolist())]
+        }
+    return sensitivity
+
 def _calculate_feature_sensitivity(orig_clusters, scen_clusters, feature_changes):
     """Calculate how sensitive each feature is to changes."""
     logger.info(f"Calculating feature sensitivity - Original clusters: {len(orig_clusters)}, Scenario clusters: {len(scen_clusters)}, Feature changes: {feature_changes}")
@@ -873,10 +1059,8 @@ def _calculate_feature_sensitivity(orig_clusters, scen_clusters, feature_changes
     sensitivity = {}
     
     # Handle both list and dict formats for feature_changes
-    if isinstance(feature_changes, list):
-        changes_list = feature_changes
-    elif isinstance(feature_changes, dict):
-        changes_list = [{'feature': k, 'percentChange': v} for k, v in feature_changes.items()]
+    if isinstance(feature_changes, (list, dict)):
+        changes_list = _feature_changes_list(feature_changes)
     else:
         logger.error(f"Unexpected feature_changes format: {type(feature_changes)}")
         return {}
@@ -910,14 +1094,7 @@ def _calculate_feature_sensitivity(orig_clusters, scen_clusters, feature_changes
             
             # Calculate sensitivity ratio with better handling
             sensitivity_ratio = abs(avg_score_change / percent_change) if percent_change != 0 else 0
-            
-            # Determine sensitivity level
-            if sensitivity_ratio >= 0.5:
-                sensitivity_level = 'High'
-            elif sensitivity_ratio >= 0.2:
-                sensitivity_level = 'Medium'
-            else:
-                sensitivity_level = 'Low'
+            sensitivity_level = _sensitivity_level(sensitivity_ratio)
             
             logger.info(f"Feature {feature_name} - Avg change: {avg_score_change:.3f}, Sensitivity ratio: {sensitivity_ratio:.3f}, Level: {sensitivity_level}")
             
@@ -1037,52 +1214,118 @@ def _calculate_feature_correlations(orig_clusters, scen_clusters, features, feat
 def cluster_endpoint():
     """
     Main endpoint for clustering operations only.
-    Expects pre-scored polygons from the normalize-score endpoint.
+    Expects pre-scored polygons from the normalize-score endpoint, or features and weights to score
+    the polygons or registered dataset with first.
     """
     try:
-        data = request.json
+        data = _load_request_data()
         
         # Debug logging
         logger.info(f"Received clustering request with keys: {list(data.keys()) if data else 'None'}")
         logger.info(f"Algorithm: {data.get('algorithm') if data else 'None'}")
         logger.info(f"Params: {data.get('params') if data else 'None'}")
         logger.info(f"Polygons count: {len(data.get('polygons', [])) if data else 0}")
+        logger.info(f"Dataset ID: {data.get('dataset_id') if data else 'None'}")
         
         # --- 1. Input Validation ---
         algorithm = data.get('algorithm')
         params = data.get('params', {})
-        polygons = data.get('polygons')
+        dataset = _resolve_dataset(data)
+        
+        if dataset is None and data.get('dataset_id') and not data.get('polygons'):
+            return jsonify({'error': f"Unknown dataset_id: {data['dataset_id']}"}), 404
         
-        if not all([algorithm, params, polygons]):
+        if not all([algorithm, params, dataset]):
             missing_fields = []
             if not algorithm: missing_fields.append('algorithm')
             if not params: missing_fields.append('params')
-            if not polygons: missing_fields.append('polygons')
+            if not dataset: missing_fields.append('polygons or dataset_id')
             logger.error(f"Missing required fields: {missing_fields}")
             return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
 
+        try:
+            response_mode = parse_response_mode(data)
+            normalization = parse_normalization(data)
+            imputation = parse_imputation(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         # --- 2. Apply Scenario (if provided) ---
-        original_polygons = copy.deepcopy(polygons) # Keep a copy for comparison analysis
+        original_dataset = dataset # Scenario changes are applied to a copy, so this stays untouched for comparison
+        ensemble, replicate_scores = None, None
+        scenario_key = None
         if 'scenarioConfig' in data:
-            logger.info("Scenario configuration found, applying changes.")
-            polygons = _apply_scenario(polygons, data['scenarioConfig'])
+            # Scenarios are seeded, so the same dataset, scores and request always give the same result
+            dataset_key = _dataset_key(data, dataset)
+            request_key = {k: v for k, v in data.items() if k not in _SCENARIO_CACHE_IGNORED_KEYS}
+            request_digest = canonical_hash({**request_key, 'scores': _scores_digest(dataset)})
+            if data.get('features') and data.get('weights'):
+                # The baseline is scored like a baseline request with the same features and weights
+                try:
+                    original_dataset = normalize_and_score(original_dataset, data['features'], data['weights'], normalization,
+                                                           resolve_directions(data['features'], data),
+                                                           parse_chunked_scoring(data, normalization), imputation)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+            # Cached results carry cluster numbers matched to a baseline, so they are keyed by the retained baseline too
+            retained_baseline, _ = _retained_baseline(data, dataset_key, original_dataset, algorithm, params)
+            scenario_key = _scenario_key(dataset_key, request_digest, retained_baseline)
+            cached = scenario_cache.get(scenario_key)
+            if cached is not None:
+                logger.info(f"Scenario result for dataset {dataset_key} served from cache.")
+                result, overlays, dataset.scores, dataset.labels, dataset.scored = cached
+                restore_overlays(dataset, overlays)
+                return build_response({**result, 'scenario_cached': True}, dataset, np.flatnonzero(dataset.labels >= 0),
+                                      include_labels=True, response_mode=response_mode,
+                                      stream=bool(data.get('stream_response')))
             
-            # Re-score the scenario-modified polygons
+            logger.info("Scenario configuration found, applying changes.")
             features = data.get('features', [])
             weights = data.get('weights', [])
-            if features and weights:
-                polygons = normalize_and_score(polygons, features, weights)
-
-        # --- 3. Ensure all polygons have unique IDs ---
-        polygons = _add_polygon_ids(polygons)
-        original_polygons = _add_polygon_ids(original_polygons)
+            try:
+                ensemble = parse_ensemble(data['scenarioConfig'])
+                if ensemble and not (features and weights):
+                    raise ValueError('Scenario ensembles need features and weights')
+                if ensemble:
+                    # Seeded replicates; the response scores are their mean and properties show the first one
+                    directions = resolve_directions(features, data)
+                    dataset, replicate_scores = score_scenario_ensemble(
+                        dataset, data['scenarioConfig'], features, weights, normalization, directions, imputation,
+                        ensemble['replicates'], ensemble['seed'])
+                    dataset.scores = replicate_scores.mean(axis=0)
+                    dataset.scored = True
+                else:
+                    dataset = apply_scenario(dataset, data['scenarioConfig'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            # Re-score the scenario-modified dataset
+            if features and weights and not ensemble:
+                try:
+                    directions = resolve_directions(features, data)
+                    chunked = parse_chunked_scoring(data, normalization)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                dataset = normalize_and_score(dataset, features, weights, normalization, directions, chunked, imputation)
+        elif data.get('features') and data.get('weights'):
+            try:
+                directions = resolve_directions(data['features'], data)
+                chunked = parse_chunked_scoring(data, normalization)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            dataset = normalize_and_score(dataset, data['features'], data['weights'], normalization, directions, chunked,
+                                          imputation)
+        
+        if data.get('dataset_id') and not data.get('polygons') and not dataset.scored and not dataset.scores.any():
+            # Registered datasets keep no scores between requests, only those uploaded as suitabilityScore
+            return jsonify({'error': f"Dataset {data['dataset_id']} has no suitability scores. Pass features and weights to score it."}), 400
 
-        # --- 4. Coordinate Extraction ---
-        coords, valid_indices = _extract_coordinates(polygons)
+        # --- 3. Coordinate Extraction ---
+        coords, valid_indices = _extract_coordinates(dataset)
         if coords.shape[0] == 0:
             return jsonify({'error': 'No valid coordinates found in the provided polygon data.'}), 400
 
-        # --- 5. Validate and Adjust Clustering Parameters ---
+        # --- 4. Validate and Adjust Clustering Parameters ---
         n_samples = coords.shape[0]
         
         # Algorithm-specific parameter validation and adjustment
@@ -1109,84 +1352,103 @@ def cluster_endpoint():
             spiral_spacing = params.get('spiral_spacing')
             logger.info(f"Archimedean spiral clustering with radius: {spiral_radius}, spacing: {spiral_spacing}")
 
-        # --- 6. Model Selection & Execution ---
+        # --- 5. Model Selection & Execution ---
         logger.info(f"Executing '{algorithm}' clustering with {n_samples} samples...")
         
-        if algorithm == 'buffer':
-            # Custom buffer clustering implementation
-            labels = _buffer_clustering(coords, params.get('radius', 5.0), params.get('min_polygons_per_cluster', 1))
-        else:
-            model = _get_clustering_model(algorithm, params)
-            
-            # HDBSCAN uses a different input format if using Haversine
-            X_cluster = np.radians(coords) if algorithm in ['dbscan', 'hdbscan'] else coords
-            labels = model.fit_predict(X_cluster)
+        labels = _fit_cluster_labels(coords, algorithm, params)
         
-        # --- 7. Process and Filter Results ---
+        # --- 6. Process and Filter Results ---
         min_size = params.get('min_polygons_per_cluster', 1)  # Reduced default
         max_size = params.get('max_polygons_per_cluster', 1000)  # Increased default
-        clusters, output_polygons = _process_cluster_results(polygons, labels, coords, valid_indices, min_size, max_size)
+        max_clusters = params.get('max_clusters', DEFAULT_MAX_CLUSTERS)
+        clusters, dataset.labels = _process_cluster_results(dataset, labels, coords, valid_indices, min_size, max_size, max_clusters)
         
         # Ensure cluster numbers are unique
         clusters = _ensure_unique_cluster_numbers(clusters, "main_")
         
+        if ensemble:
+            # Bands are matched to clusters by number before baseline matching renumbers them
+            village_bands, cluster_bands = summarize_ensemble(replicate_scores, dataset.labels,
+                                                              np.flatnonzero(dataset.labels >= 0), ensemble['percentiles'])
+            for cluster in clusters:
+                cluster['avg_suitability_score_bands'] = cluster_bands.get(cluster['cluster_number'])
+        
+        result_extras = {}
+        if 'scenarioConfig' not in data:
+            # Retain this clustering so scenario comparisons against the same baseline can reuse it
+            baseline_id = _baseline_id(dataset, algorithm, params)
+            baseline_cache.put((_dataset_key(data, dataset), baseline_id), [dict(c) for c in clusters])
+            result_extras['baseline_id'] = baseline_id
+        
+        original_clusters = None
+        if 'scenarioConfig' in data:
+            # Match against the retained baseline clustering; comparisons cluster the baseline if none is retained
+            needs_baseline = data.get('include_ai_insights', False) or data.get('match_baseline', False)
+            original_clusters, baseline_id, baseline_reused = _baseline_clusters(
+                data, dataset_key, original_dataset, algorithm, params, min_size, max_size, compute=needs_baseline)
+            # The result is cached under the baseline it is matched against, which a later lookup must find retained
+            scenario_key = _scenario_key(dataset_key, request_digest, original_clusters)
+            if original_clusters is not None:
+                result_extras['baseline_id'] = baseline_id
+                result_extras['baseline_reused'] = baseline_reused
+                
+                # Scenario clusters take the numbers of their optimally matched original clusters, so clusters
+                # can be tracked as improved, declined or unchanged; new clusters are numbered after them
+                matching = match_clusters(original_clusters, clusters)
+                dataset.labels = renumber_matched_clusters(clusters, matching, dataset.labels)
+                result_extras['cluster_matching'] = matching
+                logger.info(f"Matched {len(matching['matches'])} scenario clusters to the baseline, "
+                            f"{len(matching['splits'])} splits and {len(matching['merges'])} merges.")
         
         ai_insights = None
         if data.get('include_ai_insights', False):
             features = data.get('features', [])
             base_prompt = _build_base_prompt(data.get('product_info', {}), algorithm, features)
-            if 'scenarioConfig' in data:
-                # We need original clusters for comparison
-                original_coords, original_valid_indices = _extract_coordinates(original_polygons)
-                if original_coords.shape[0] > 0:
-                    # Re-run clustering on original data for comparison
-                    original_model = _get_clustering_model(algorithm, params)
-                    original_X_cluster = np.radians(original_coords) if algorithm in ['dbscan', 'hdbscan'] else original_coords
-                    original_labels = original_model.fit_predict(original_X_cluster)
-                    original_clusters, _ = _process_cluster_results(original_polygons, original_labels, original_coords, original_valid_indices, min_size, max_size)
-                    
-                    # Ensure original cluster numbers are unique
-                    original_clusters = _ensure_unique_cluster_numbers(original_clusters, "original_")
-                    
-                    # Generate comparison insights
-                    feature_changes = data['scenarioConfig'].get('featureChanges', [])
-                    
-                    # Ensure scenario clusters maintain the same cluster numbers as original clusters for comparison
-                    # This allows us to track which clusters improved, declined, or stayed the same
-                    if len(clusters) == len(original_clusters):
-                        # If we have the same number of clusters, assign them the same numbers
-                        for i, cluster in enumerate(clusters):
-                            original_cluster_number = original_clusters[i].get('cluster_number', i + 1)
-                            cluster['cluster_number'] = original_cluster_number
-                            cluster['cluster_id'] = f"scenario_{original_cluster_number}"
-                            logger.info(f"Scenario cluster {i+1} assigned same number as original: {original_cluster_number}")
-                    else:
-                        # If cluster count changed, use sequential numbers but mark them as scenario
-                        for i, cluster in enumerate(clusters):
-                            cluster['cluster_number'] = i + 1
-                            cluster['cluster_id'] = f"scenario_{i + 1}"
-                            logger.warning(f"Cluster count changed: {len(original_clusters)} original vs {len(clusters)} scenario. Using sequential numbering.")
-                    
-                    ai_insights = generate_comparison_insights(original_clusters, clusters, base_prompt, feature_changes)
-                else:
-                    ai_insights = generate_ai_cluster_insights(clusters, base_prompt)
+            if original_clusters is not None:
+                # Generate comparison insights over matched pairs, best original clusters first
+                feature_changes = data['scenarioConfig'].get('featureChanges', [])
+                by_number = {c['cluster_number']: c for c in clusters}
+                pairs = [(c, by_number[c['cluster_number']]) for c in original_clusters if c['cluster_number'] in by_number]
+                ai_insights = generate_comparison_insights([o for o, _ in pairs], [s for _, s in pairs], base_prompt,
+                                                           feature_changes)
             else:
                 ai_insights = generate_ai_cluster_insights(clusters, base_prompt)
 
-        # Results
+        # Results (polygons are only materialized in the response, for the clustered rows)
+        output_rows = np.flatnonzero(dataset.labels >= 0)
         result = {
             'clusters': clusters,
-            'polygons': output_polygons,
             'algorithm': algorithm,
             'total_clusters': len(clusters),
-            'total_polygons': len(output_polygons)
+            'total_polygons': len(output_rows)
         }
         
+        result.update(result_extras)
+        if data.get('dataset_id') and not data.get('polygons'):
+            result['dataset_id'] = data['dataset_id']
+        if scenario_key is not None:
+            result['scenario_seed'] = scenario_seed(data['scenarioConfig'])
+            result['scenario_cached'] = False
+        
+        if ensemble:
+            result['ensemble'] = {
+                'replicates': ensemble['replicates'],
+                'seed': ensemble['seed'],
+                'percentiles': ensemble['percentiles'],
+                'polygon_ids': dataset.ids[output_rows].tolist(),
+                'village_scores': village_bands
+            }
+        
         if ai_insights:
             result['ai_insights'] = ai_insights
             
-        logger.info(f"Clustering completed successfully. Found {len(clusters)} clusters with {len(output_polygons)} polygons.")
-        return jsonify(result)
+        logger.info(f"Clustering completed successfully. Found {len(clusters)} clusters with {len(output_rows)} polygons.")
+        if scenario_key is not None:
+            # Only the overlays, scores and labels are kept; the scenario table's normalized caches are not
+            scenario_cache.put(scenario_key, (result, scenario_overlays(dataset), dataset.scores, dataset.labels,
+                                              dataset.scored))
+        return build_response(result, dataset, output_rows, include_labels=True, response_mode=response_mode,
+                              stream=bool(data.get('stream_response')))
         
     except Exception as e:
         logger.error(f"Error in cluster_endpoint: {str(e)}")
@@ -1194,13 +1456,40 @@ def cluster_endpoint():
 
 @app.route('/api/feature-analysis', methods=['POST'])
 def get_feature_analysis():
-    """Endpoint for sound feature sensitivity and correlation analysis."""
+    """
+    Endpoint for sound feature sensitivity and correlation analysis.
+    
+    By default sensitivity compares original_clusters with scenario_clusters from two clustering runs.
+    With "sensitivity_mode": "analytic" it is computed exactly from the dataset (dataset_id or polygons),
+    features and weights instead, for the clusters fixed by original_clusters, and scenario_clusters
+    are only needed for the correlation analysis.
+    """
     try:
-        data = request.json
+        data = _load_request_data()
         original_clusters = data.get('original_clusters', [])
         scenario_clusters = data.get('scenario_clusters', [])
         features = data.get('features', [])
         feature_changes = data.get('feature_changes', {}) # e.g., {'featureA': 20, 'featureB': -10}
+        
+        if data.get('sensitivity_mode') == 'analytic':
+            dataset = _resolve_dataset(data)
+            if dataset is None and data.get('dataset_id') and not data.get('polygons'):
+                return jsonify({'error': f"Unknown dataset_id: {data['dataset_id']}"}), 404
+            if dataset is None or not feature_changes:
+                return jsonify({'error': 'Missing required data for feature analysis'}), 400
+            try:
+                sensitivity_analysis = _analytic_feature_sensitivity(dataset, data)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            correlation_matrix = {}
+            if original_clusters and scenario_clusters and features:
+                correlation_matrix = _calculate_feature_correlations(original_clusters, scenario_clusters, features, feature_changes)
+            return jsonify({
+                'sensitivity_analysis': sensitivity_analysis,
+                'correlation_analysis': correlation_matrix,
+                'sensitivity_mode': 'analytic',
+                'message': 'Sensitivity computed exactly from the feature matrix, without re-clustering.'
+            })
 
         logger.info(f"Feature analysis request - Original clusters: {len(original_clusters)}, Scenario clusters: {len(scenario_clusters)}, Features: {len(features)}, Feature changes: {len(feature_changes)}")
         logger.info(f"Feature changes: {feature_changes}")
@@ -1265,6 +1554,35 @@ def get_cluster_insights():
         logger.error(f"Error in cluster insights: {e}", exc_info=True)
         return jsonify({'error': f'Failed to generate cluster insights: {str(e)}'}), 500
 
+@app.route('/api/match-clusters', methods=['POST'])
+def match_cluster_runs():
+    """
+    Endpoint to match the clusters of a scenario run to those of the original run.
+    Returns the matching and copies of the scenario clusters carrying their matched original numbers.
+    """
+    try:
+        data = request.json or {}
+        original_clusters = data.get('original_clusters') or []
+        scenario_clusters = data.get('scenario_clusters') or []
+        if not original_clusters or not scenario_clusters:
+            return jsonify({'error': 'original_clusters and scenario_clusters are required'}), 400
+        distance_weight = float(data.get('distance_weight', CLUSTER_MATCH_DISTANCE_WEIGHT))
+        if not 0 <= distance_weight <= 1:
+            return jsonify({'error': 'distance_weight must be between 0 and 1'}), 400
+        
+        matched = [dict(c) for c in scenario_clusters]
+        matching = match_clusters(original_clusters, matched, distance_weight)
+        renumber_matched_clusters(matched, matching)
+        logger.info(f"Matched {len(matching['matches'])} of {len(scenario_clusters)} scenario clusters "
+                    f"to {len(original_clusters)} original clusters.")
+        return jsonify({**matching, 'matched_scenario_clusters': matched})
+    
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in cluster matching: {e}", exc_info=True)
+        return jsonify({'error': f'Failed to match clusters: {str(e)}'}), 500
+
 @app.route('/api/feature-descriptions', methods=['GET'])
 def get_feature_descriptions():
     """Endpoint to provide feature descriptions for the frontend."""
@@ -1282,47 +1600,417 @@ def get_feature_descriptions():
 def normalize_score_only():
     """Endpoint for normalization and scoring only, without clustering."""
     try:
-        data = request.json
+        data = _load_request_data()
         
         # Debug logging
         logger.info(f"Received normalize-score request with keys: {list(data.keys()) if data else 'None'}")
         logger.info(f"Features count: {len(data.get('features', [])) if data else 0}")
         logger.info(f"Weights count: {len(data.get('weights', [])) if data else 0}")
         logger.info(f"Polygons count: {len(data.get('polygons', [])) if data else 0}")
+        logger.info(f"Dataset ID: {data.get('dataset_id') if data else 'None'}")
         
         # --- 1. Input Validation ---
-        polygons = data.get('polygons')
+        dataset = _resolve_dataset(data)
         features = data.get('features', [])
         weights = data.get('weights', [])
         
-        if not all([polygons, features, weights]):
+        if dataset is None and data.get('dataset_id') and not data.get('polygons'):
+            return jsonify({'error': f"Unknown dataset_id: {data['dataset_id']}"}), 404
+        
+        if not all([dataset, features, weights]):
             missing_fields = []
-            if not polygons: missing_fields.append('polygons')
+            if not dataset: missing_fields.append('polygons or dataset_id')
             if not features: missing_fields.append('features')
             if not weights: missing_fields.append('weights')
             logger.error(f"Missing required fields: {missing_fields}")
             return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
 
-        
-        polygons = _add_polygon_ids(polygons)
+        try:
+            response_mode = parse_response_mode(data)
+            normalization = parse_normalization(data)
+            directions = resolve_directions(features, data)
+            chunked = parse_chunked_scoring(data, normalization)
+            imputation = parse_imputation(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-   
-        scored_polygons = normalize_and_score(polygons, features, weights)
+        dataset = normalize_and_score(dataset, features, weights, normalization, directions, chunked, imputation)
         
-
         result = {
-            'polygons': scored_polygons,
-            'total_polygons': len(scored_polygons),
+            'total_polygons': len(dataset),
             'features_used': features,
-            'weights_used': weights
+            'weights_used': weights,
+            'normalization': normalization,
+            'inverted_features': [f for f, positive in zip(features, directions) if not positive],
+            'imputation': imputation,
+            'null_counts': dataset.feature_table.null_counts(features)
         }
+        if data.get('dataset_id') and not data.get('polygons'):
+            result['dataset_id'] = data['dataset_id']
         
-        logger.info(f"Normalization and scoring completed successfully. Processed {len(scored_polygons)} polygons.")
-        return jsonify(result)
+        logger.info(f"Normalization and scoring completed successfully. Processed {len(dataset)} polygons.")
+        return build_response(result, dataset, np.arange(len(dataset)), response_mode=response_mode,
+                              stream=bool(data.get('stream_response')))
         
     except Exception as e:
         logger.error(f"Error in normalize_score_only: {str(e)}")
         return jsonify({'error': f'Normalization failed: {str(e)}'}), 500
 
+@app.route('/api/batch-score', methods=['POST'])
+def batch_score():
+    """
+    Scores many weighting schemes in one pass and returns per-scheme summaries.
+    
+    Accepts dataset_id or polygons, plus weights_matrix (rows aligned with features) and/or
+    schemes ({name, preset, weights}). Returns the top-k villages and a score histogram per
+    scheme, and the Spearman rank correlations between schemes.
+    """
+    try:
+        data = _load_request_data()
+        dataset = _resolve_dataset(data)
+        if dataset is None and data.get('dataset_id') and not data.get('polygons'):
+            return jsonify({'error': f"Unknown dataset_id: {data['dataset_id']}"}), 404
+        if dataset is None or not len(dataset):
+            return jsonify({'error': 'Missing required fields: polygons or dataset_id'}), 400
+
+        try:
+            features, scheme_names, weight_matrix = resolve_weight_schemes(data, get_feature_suggestions())
+            normalization = parse_normalization(data)
+            directions = resolve_directions(features, data)
+            imputation = parse_imputation(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        top_k = int(data.get('top_k', 10))
+        bins = int(data.get('histogram_bins', 10))
+        if top_k < 0 or bins < 1:
+            return jsonify({'error': 'top_k must be >= 0 and histogram_bins >= 1'}), 400
+
+        logger.info(f"Batch scoring {len(scheme_names)} schemes over {len(features)} features for {len(dataset)} polygons.")
+        feature_table = dataset.feature_table.imputed(imputation, dataset.coords, features)
+        scores = score_batch(feature_table, features, weight_matrix, normalization, directions)
+        top_rows = top_k_rows(scores, top_k)
+        correlations = rank_correlations(scores)
+        edges, counts = score_histograms(scores, bins)
+
+        schemes = []
+        for s, name in enumerate(scheme_names):
+            rows = top_rows[:, s]
+            schemes.append({
+                'name': name,
+                'weights': {f: float(w) for f, w in zip(features, weight_matrix[:, s]) if w},
+                'mean_score': float(scores[:, s].mean()),
+                'top_villages': [{'id': i, 'suitabilityScore': float(v)} for i, v in zip(dataset.ids[rows].tolist(), scores[rows, s])],
+                'histogram': counts[s].tolist()
+            })
+
+        result = {
+            'total_polygons': len(dataset),
+            'features_used': features,
+            'normalization': normalization,
+            'inverted_features': [f for f, positive in zip(features, directions) if not positive],
+            'imputation': imputation,
+            'null_counts': dataset.feature_table.null_counts(features),
+            'histogram_bin_edges': edges.tolist(),
+            'schemes': schemes,
+            'rank_correlation': {
+                'schemes': scheme_names,
+                'matrix': [[None if np.isnan(v) else float(v) for v in row] for row in correlations]
+            }
+        }
+        if data.get('dataset_id') and not data.get('polygons'):
+            result['dataset_id'] = data['dataset_id']
+        return jsonify(result)
+
+    except Exception as e:
+        logger.error(f"Error in batch_score: {str(e)}")
+        return jsonify({'error': f'Batch scoring failed: {str(e)}'}), 500
+
+@app.route('/api/scenario-sweep', methods=['POST'])
+def scenario_sweep():
+    """
+    Evaluates ranges of percent changes per feature in one batched run.
+    
+    Accepts dataset_id or polygons, features, weights and sweep (a list of {feature, percent_changes}
+    or {feature, min, max, steps}), with an optional scenario target. Returns, per swept feature,
+    curves of the mean and top-k scores and of each cluster's average score. Clusters are fitted
+    once on the baseline when algorithm and params are given (otherwise the polygons' 'cluster'
+    values are used) and re-derived from every point's scores only with "recluster": true.
+    """
+    try:
+        data = _load_request_data()
+        dataset = _resolve_dataset(data)
+        if dataset is None and data.get('dataset_id') and not data.get('polygons'):
+            return jsonify({'error': f"Unknown dataset_id: {data['dataset_id']}"}), 404
+        if dataset is None or not len(dataset):
+            return jsonify({'error': 'Missing required fields: polygons or dataset_id'}), 400
+
+        features = data.get('features', [])
+        weights = data.get('weights', [])
+        if not features or len(features) != len(weights):
+            return jsonify({'error': 'features and weights must be non-empty and of equal length'}), 400
+        try:
+            normalization = parse_normalization(data)
+            if normalization == NORMALIZATION_RANK:
+                raise ValueError('Sweeps need a fixed normalization scale; rank normalization is not supported')
+            directions = resolve_directions(features, data)
+            imputation = parse_imputation(data)
+            sweeps = parse_sweep(data, features)
+            rows = np.flatnonzero(scenario_target_mask(dataset, data['target'])) if data.get('target') else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        top_k = int(data.get('top_k', 10))
+        if top_k < 1:
+            return jsonify({'error': 'top_k must be >= 1'}), 400
+
+        n_points = sum(len(percents) for _, percents in sweeps)
+        logger.info(f"Sweeping {n_points} points over {len(sweeps)} features for {len(dataset)} polygons.")
+        feature_table = dataset.feature_table.imputed(imputation, dataset.coords, features)
+        dataset.scores, scores = sweep_scores(feature_table, features, weights, sweeps, normalization, directions, rows)
+        dataset.scored = True
+
+        algorithm = data.get('algorithm')
+        params = dict(data.get('params') or {})
+        min_size = params.get('min_polygons_per_cluster', 1)
+        max_size = params.get('max_polygons_per_cluster', 1000)
+        max_clusters = params.get('max_clusters', DEFAULT_MAX_CLUSTERS)
+        labels, valid_indices, coords = None, None, None
+        baseline_clusters = []
+        if algorithm:
+            coords, valid_indices = _extract_coordinates(dataset)
+            if coords.shape[0] == 0:
+                return jsonify({'error': 'No valid coordinates found in the provided polygon data.'}), 400
+            if 'n_clusters' in params:
+                params['n_clusters'] = min(params['n_clusters'], coords.shape[0])
+            labels = _fit_cluster_labels(coords, algorithm, params)
+            baseline_clusters, dataset.labels = _process_cluster_results(dataset, labels, coords, valid_indices, min_size, max_size,
+                                                                         max_clusters)
+        cluster_numbers, cluster_scores = cluster_means(scores, dataset.labels)
+        _, baseline_cluster_scores = cluster_means(dataset.scores[None, :], dataset.labels)
+
+        baseline_top = top_k_rows(dataset.scores[:, None], top_k)[:, 0]
+        baseline_top_mean = float(dataset.scores[baseline_top].mean())
+        top_rows = top_k_rows(scores.T, top_k)
+        top_means = np.take_along_axis(scores.T, top_rows, axis=0).mean(axis=0)
+        retained = np.isin(top_rows, baseline_top).mean(axis=0)
+        mean_scores = scores.mean(axis=1)
+        baseline_mean = float(dataset.scores.mean())
+
+        curves = []
+        start = 0
+        for feature, percents in sweeps:
+            points = slice(start, start + len(percents))
+            start += len(percents)
+            curve = {
+                'feature': feature,
+                'percent_changes': percents.tolist(),
+                'mean_score': mean_scores[points].tolist(),
+                'mean_score_change': (mean_scores[points] - baseline_mean).tolist(),
+                'top_k_mean_score': top_means[points].tolist(),
+                'top_k_mean_score_change': (top_means[points] - baseline_top_mean).tolist(),
+                'top_k_retained': retained[points].tolist(),
+                'clusters': [{
+                    'cluster_number': number,
+                    'avg_suitability_score': cluster_scores[points, c].tolist(),
+                    'avg_score_change': (cluster_scores[points, c] - baseline_cluster_scores[0, c]).tolist()
+                } for c, number in enumerate(cluster_numbers.tolist())]
+            }
+            if algorithm and data.get('recluster'):
+                # Cluster membership depends only on coordinates; sizes, ranking and stats follow each point's scores
+                reclustered = []
+                for p in range(points.start, points.stop):
+                    point = dataset.shallow_copy()
+                    point.scores = scores[p]
+                    point_clusters, _ = _process_cluster_results(point, labels, coords, valid_indices, min_size, max_size,
+                                                                 max_clusters)
+                    # Keep the baseline's cluster numbers where ranking or size filtering reorders clusters
+                    renumber_matched_clusters(point_clusters, match_clusters(baseline_clusters, point_clusters))
+                    reclustered.append([{k: v for k, v in c.items() if k != 'polygon_ids'} for c in point_clusters])
+                curve['reclustered'] = reclustered
+            curves.append(curve)
+
+        result = {
+            'total_polygons': len(dataset),
+            'targeted_polygons': len(dataset) if rows is None else len(rows),
+            'features_used': features,
+            'normalization': normalization,
+            'inverted_features': [f for f, positive in zip(features, directions) if not positive],
+            'imputation': imputation,
+            'top_k': top_k,
+            'baseline': {
+                'mean_score': baseline_mean,
+                'top_k_mean_score': baseline_top_mean,
+                'top_villages': [{'id': i, 'suitabilityScore': float(v)}
+                                 for i, v in zip(dataset.ids[baseline_top].tolist(), dataset.scores[baseline_top])],
+                'clusters': [{'cluster_number': number, 'avg_suitability_score': float(baseline_cluster_scores[0, c])}
+                             for c, number in enumerate(cluster_numbers.tolist())]
+            },
+            'curves': curves
+        }
+        if algorithm:
+            result['algorithm'] = algorithm
+            result['baseline']['clusters'] = [{k: v for k, v in c.items() if k != 'polygon_ids'} for c in baseline_clusters]
+        if data.get('dataset_id') and not data.get('polygons'):
+            result['dataset_id'] = data['dataset_id']
+        return jsonify(result)
+
+    except Exception as e:
+        logger.error(f"Error in scenario_sweep: {str(e)}")
+        return jsonify({'error': f'Scenario sweep failed: {str(e)}'}), 500
+
+@app.route('/api/rankings', methods=['POST'])
+def rank_villages():
+    """
+    Returns one page of villages ranked by suitability score.
+    
+    Accepts dataset_id or polygons with features and weights (normalization and feature_directions
+    as in /api/normalize-score), optional filters, page (1-based) and page_size. Rank indexes of
+    registered datasets are cached per scoring parameters, so further pages and filters are cheap.
+    """
+    try:
+        data = _load_request_data()
+        dataset = _resolve_dataset(data)
+        features = data.get('features', [])
+        weights = data.get('weights', [])
+        
+        if dataset is None and data.get('dataset_id') and not data.get('polygons'):
+            return jsonify({'error': f"Unknown dataset_id: {data['dataset_id']}"}), 404
+        
+        if not all([dataset, features, weights]):
+            missing_fields = []
+            if not dataset: missing_fields.append('polygons or dataset_id')
+            if not features: missing_fields.append('features')
+            if not weights: missing_fields.append('weights')
+            return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
+
+        try:
+            normalization = parse_normalization(data)
+            directions = resolve_directions(features, data)
+            imputation = parse_imputation(data)
+            conditions = parse_filters(data, dataset.feature_table)
+            page, page_size = parse_page(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        registered = bool(data.get('dataset_id')) and not data.get('polygons')
+        key = (data['dataset_id'], tuple(features), tuple(normalize_weights(weights).tolist()), normalization, directions,
+               imputation) if registered else None
+        index = ranking_cache.get(key) if key else None
+        if index is None:
+            scored = normalize_and_score(dataset.shallow_copy(), features, weights, normalization, directions,
+                                         imputation=imputation)
+            index = RankingIndex(scored.scores)
+            if key:
+                ranking_cache.put(key, index)
+
+        mask = dataset.feature_table.filter_mask(conditions) if conditions else None
+        rows, total_matches = index.page((page - 1) * page_size, page_size, mask)
+        values = dataset.feature_table.decode(features, rows, fill=np.nan)
+
+        villages = []
+        for rank, (i, score, row_values) in enumerate(zip(dataset.ids[rows].tolist(), index.scores[rows].tolist(), values.tolist()),
+                                                      start=(page - 1) * page_size + 1):
+            villages.append({
+                'rank': rank,
+                'id': i,
+                'suitabilityScore': score,
+                'features': {f: (None if v != v else v) for f, v in zip(features, row_values)}
+            })
+
+        result = {
+            'total_polygons': len(dataset),
+            'total_matches': total_matches,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': -(-total_matches // page_size),
+            'features_used': features,
+            'weights_used': weights,
+            'normalization': normalization,
+            'imputation': imputation,
+            'filters': [{'feature': name, 'op': op, 'value': value} for name, op, value in conditions],
+            'villages': villages
+        }
+        if registered:
+            result['dataset_id'] = data['dataset_id']
+        return jsonify(result)
+
+    except Exception as e:
+        logger.error(f"Error in rank_villages: {str(e)}")
+        return jsonify({'error': f'Ranking failed: {str(e)}'}), 500
+
+@app.route('/api/datasets', methods=['POST'])
+def register_dataset():
+    """
+    Registers a dataset once so later requests can reference it by dataset_id.
+    Accepts a GeoJSON FeatureCollection, a {'polygons': [...]} body, a bare list of features,
+    or a Parquet / Arrow IPC file with lon/lat (or WKB geometry) columns plus feature columns.
+    The file may be sent as the raw request body or as a multipart upload named 'file'.
+    Large GeoJSON bodies (or ?stream=true) are parsed incrementally; ?columns=a,b limits which
+    numeric properties are kept.
+    """
+    try:
+        upload = request.files.get('file')
+        if upload:
+            raw_body = upload.read()
+        elif _should_stream_upload():
+            # Binary formats are recognised from their first bytes; anything else is streamed as GeoJSON
+            prefix = request.stream.read(8)
+            if not is_arrow_upload(prefix):
+                columns = [c for c in request.args.get('columns', '').split(',') if c] or None
+                dataset_id, _ = dataset_registry.register_stream(request.stream, prefix=prefix, columns=columns)
+                if not dataset_id:
+                    return jsonify({'error': 'No features found in the uploaded dataset'}), 400
+                return jsonify({**dataset_registry.info(dataset_id), 'streamed': True})
+            raw_body = prefix + request.stream.read()
+        else:
+            raw_body = request.get_data()
+        if not raw_body:
+            return jsonify({'error': 'Request body is empty'}), 400
+        
+        # Hash the raw bytes first so re-uploads of the same file skip parsing entirely
+        dataset_id = compute_dataset_id(raw_body)
+        if dataset_id in dataset_registry:
+            logger.info(f"Dataset {dataset_id} already registered, skipping parse.")
+            return jsonify({**dataset_registry.info(dataset_id), 'already_registered': True})
+        
+        table = read_arrow_table(raw_body)
+        if table is not None:
+            dataset = SpatialDataset.from_arrow_table(table, id_prefix=dataset_id)
+        else:
+            polygons = extract_features(json.loads(raw_body))
+            if not polygons:
+                return jsonify({'error': 'No features found in the uploaded dataset'}), 400
+            dataset = SpatialDataset.from_features(_add_polygon_ids(polygons), geometry_cache=geometry_cache)
+        
+        if not len(dataset):
+            return jsonify({'error': 'No rows found in the uploaded dataset'}), 400
+        dataset_registry.register(dataset_id, dataset)
+        
+        logger.info(f"Registered dataset {dataset_id} with {len(dataset)} polygons and {len(dataset.feature_names)} numeric features.")
+        return jsonify({**dataset_registry.info(dataset_id), 'already_registered': False})
+        
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return jsonify({'error': f'Unrecognised upload, expected GeoJSON, Parquet or Arrow IPC: {str(e)}'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in register_dataset: {str(e)}")
+        return jsonify({'error': f'Dataset registration failed: {str(e)}'}), 500
+
+@app.route('/api/datasets/<dataset_id>', methods=['GET', 'DELETE'])
+def dataset_detail(dataset_id):
+    """Returns metadata for a registered dataset, or removes it from the registry."""
+    if request.method == 'DELETE':
+        ranking_cache.discard(dataset_id)
+        scenario_cache.discard(dataset_id)
+        baseline_cache.discard(dataset_id)
+        if not dataset_registry.remove(dataset_id):
+            return jsonify({'error': f'Unknown dataset_id: {dataset_id}'}), 404
+        return jsonify({'dataset_id': dataset_id, 'removed': True})
+    
+    info = dataset_registry.info(dataset_id)
+    if info is None:
+        return jsonify({'error': f'Unknown dataset_id: {dataset_id}'}), 404
+    return jsonify(info)
+
 if __name__ == '__main__':
     app.run(port=5000, debug=True)
@@ -0,0 +1,165 @@
+"""
+Optimal matching between the clusters of a baseline run and a scenario run.
+Clusters are paired by minimum total cost with the Hungarian algorithm (scipy's linear_sum_assignment).
+The cost mixes the haversine distance between centroids with member overlap (1 - Jaccard of
+polygon_ids), so pairs follow shared villages where clusters overlap and nearby centroids where
+they do not. Member overlaps also give the clusters that split or merged between the runs.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import linear_sum_assignment
+
+EARTH_RADIUS_KM = 6371.0
+
+# Share of the matching cost given to centroid distance; the rest is member overlap
+CLUSTER_MATCH_DISTANCE_WEIGHT = float(os.getenv('CLUSTER_MATCH_DISTANCE_WEIGHT', 0.5))
+# Centroid distance that counts as the full distance cost
+CLUSTER_MATCH_DISTANCE_SCALE_KM = float(os.getenv('CLUSTER_MATCH_DISTANCE_SCALE_KM', 50))
+# Pairs farther apart than this that share no villages are left unmatched
+CLUSTER_MATCH_MAX_DISTANCE_KM = float(os.getenv('CLUSTER_MATCH_MAX_DISTANCE_KM', 100))
+
+# Share of a cluster's villages another cluster must hold to count towards a split or merge
+SPLIT_MERGE_MIN_SHARE = 0.2
+
+
+def haversine_km(a, b):
+    """Great-circle distances in km between (k, 2) and (m, 2) lng/lat arrays, as a (k, m) matrix."""
+    lng1, lat1 = np.radians(a[:, 0])[:, None], np.radians(a[:, 1])[:, None]
+    lng2, lat2 = np.radians(b[:, 0])[None, :], np.radians(b[:, 1])[None, :]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def _centroids(clusters):
+    centroids = np.full((len(clusters), 2), np.nan)
+    for i, cluster in enumerate(clusters):
+        centroid = cluster.get('centroid')
+        if centroid and len(centroid) >= 2:
+            centroids[i] = centroid[:2]
+    return centroids
+
+
+def overlap_counts(original, scenario):
+    """
+    Shared polygon_ids between every pair of clusters, from one sparse membership product.
+
+    Returns:
+        Tuple of ((k, m) shared counts, original sizes, scenario sizes)
+    """
+    members = [c.get('polygon_ids') or [] for c in original] + [c.get('polygon_ids') or [] for c in scenario]
+    sizes = np.array([len(m) for m in members], dtype=np.int64)
+    codes, uniques = pd.factorize(pd.Series([i for m in members for i in m], dtype=object))
+    owners = np.repeat(np.arange(len(members)), sizes)
+    membership = sparse.csr_matrix((np.ones(len(codes)), (owners, codes)), shape=(len(members), max(len(uniques), 1)))
+    k = len(original)
+    shared = (membership[:k] @ membership[k:].T).toarray()
+    return shared, sizes[:k], sizes[k:]
+
+
+def match_clusters(original, scenario, distance_weight=CLUSTER_MATCH_DISTANCE_WEIGHT):
+    """
+    Optimal one-to-one matching of scenario clusters to original clusters, plus split and merge events.
+
+    Args:
+        original, scenario: Cluster dicts with cluster_number, centroid ([lng, lat]) and polygon_ids
+        distance_weight: Share of the cost given to centroid distance, between 0 and 1
+    Returns:
+        Dict with 'matches' ({original_cluster_number, scenario_cluster_number, distance_km, jaccard},
+        by original number), 'splits' (an original cluster whose villages went to several scenario
+        clusters), 'merges' (a scenario cluster drawing on several original clusters),
+        'unmatched_original' and 'unmatched_scenario'
+    """
+    original = sorted(original, key=lambda c: c.get('cluster_number', 0))
+    scenario = sorted(scenario, key=lambda c: c.get('cluster_number', 0))
+    original_numbers = [c.get('cluster_number') for c in original]
+    scenario_numbers = [c.get('cluster_number') for c in scenario]
+    result = {'matches': [], 'splits': [], 'merges': [], 'unmatched_original': original_numbers,
+              'unmatched_scenario': scenario_numbers}
+    if not original or not scenario:
+        return result
+
+    distances = haversine_km(_centroids(original), _centroids(scenario))
+    shared, original_sizes, scenario_sizes = overlap_counts(original, scenario)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        jaccard = np.nan_to_num(shared / (original_sizes[:, None] + scenario_sizes[None, :] - shared))
+    distance_cost = np.minimum(np.nan_to_num(distances, nan=np.inf) / CLUSTER_MATCH_DISTANCE_SCALE_KM, 1.0)
+    cost = distance_weight * distance_cost + (1 - distance_weight) * (1 - jaccard)
+
+    matched_original, matched_scenario = set(), set()
+    for i, j in zip(*linear_sum_assignment(cost)):
+        if jaccard[i, j] == 0 and not distances[i, j] <= CLUSTER_MATCH_MAX_DISTANCE_KM:
+            continue
+        matched_original.add(i)
+        matched_scenario.add(j)
+        result['matches'].append({
+            'original_cluster_number': original_numbers[i],
+            'scenario_cluster_number': scenario_numbers[j],
+            'distance_km': None if np.isnan(distances[i, j]) else float(distances[i, j]),
+            'jaccard': float(jaccard[i, j])
+        })
+    result['unmatched_original'] = [n for i, n in enumerate(original_numbers) if i not in matched_original]
+    result['unmatched_scenario'] = [n for j, n in enumerate(scenario_numbers) if j not in matched_scenario]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        original_share = np.nan_to_num(shared / original_sizes[:, None])
+        scenario_share = np.nan_to_num(shared / scenario_sizes[None, :])
+    for i, number in enumerate(original_numbers):
+        targets = np.flatnonzero(original_share[i] >= SPLIT_MERGE_MIN_SHARE)
+        if len(targets) > 1:
+            result['splits'].append({
+                'original_cluster_number': number,
+                'scenario_cluster_numbers': [scenario_numbers[j] for j in targets],
+                'shares': [float(original_share[i, j]) for j in targets]
+            })
+    for j, number in enumerate(scenario_numbers):
+        sources = np.flatnonzero(scenario_share[:, j] >= SPLIT_MERGE_MIN_SHARE)
+        if len(sources) > 1:
+            result['merges'].append({
+                'scenario_cluster_number': number,
+                'original_cluster_numbers': [original_numbers[i] for i in sources],
+                'shares': [float(scenario_share[i, j]) for i in sources]
+            })
+    return result
+
+
+def renumber_matched_clusters(clusters, matching, labels=None):
+    """
+    Gives matched scenario clusters their original cluster's number, and unmatched ones numbers
+    after every original number, in place; the matching and the per-row labels follow.
+
+    Args:
+        clusters: Scenario cluster dicts, as matched
+        matching: Result of match_clusters for these clusters
+        labels: Optional per-row cluster numbers (-1 for unassigned rows)
+    Returns:
+        The renumbered labels, or None if labels is None
+    """
+    mapping = {m['scenario_cluster_number']: m['original_cluster_number'] for m in matching['matches']}
+    taken = set(mapping.values()) | set(matching['unmatched_original'])
+    next_number = max(taken, default=0) + 1
+    for number in matching['unmatched_scenario']:
+        mapping[number] = next_number
+        next_number += 1
+
+    for cluster in clusters:
+        number = mapping.get(cluster.get('cluster_number'), cluster.get('cluster_number'))
+        cluster['cluster_number'] = number
+        cluster['cluster_id'] = f"scenario_{number}"
+    for match in matching['matches']:
+        match['scenario_cluster_number'] = mapping[match['scenario_cluster_number']]
+    for split in matching['splits']:
+        split['scenario_cluster_numbers'] = [mapping.get(n, n) for n in split['scenario_cluster_numbers']]
+    for merge in matching['merges']:
+        merge['scenario_cluster_number'] = mapping.get(merge['scenario_cluster_number'], merge['scenario_cluster_number'])
+    matching['unmatched_scenario'] = [mapping[n] for n in matching['unmatched_scenario']]
+
+    if labels is None or not mapping or not len(labels):
+        return labels
+    lookup = np.arange(max(int(labels.max()), max(mapping)) + 2, dtype=np.int64) - 1
+    for old, new in mapping.items():
+        lookup[old + 1] = new
+    return lookup[labels + 1]
@@ -0,0 +1,837 @@
+"""
+Server-side dataset registry for uploaded village datasets.
+Datasets are parsed once on upload and kept under a content-hash id, so repeat
+analyses can reference them by dataset_id instead of re-posting every polygon.
+"""
+
+import codecs
+import copy
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from feature_store import MAX_CATEGORY_VALUES, CategoryColumn, FeatureColumn, FeatureTable
+from geometry_utils import RingAccumulator, summarize_geojson, summarize_wkb
+
+logger = logging.getLogger(__name__)
+
+# Properties that carry pipeline output rather than input features
+RESERVED_PROPERTIES = ('suitabilityScore', 'cluster')
+
+# Column names recognised as coordinates in Parquet / Arrow uploads (matched case-insensitively)
+LONGITUDE_COLUMNS = ('lon', 'lng', 'long', 'longitude', 'x')
+LATITUDE_COLUMNS = ('lat', 'latitude', 'y')
+GEOMETRY_COLUMNS = ('geometry', 'geom', 'wkb', 'wkb_geometry')
+ID_COLUMNS = ('id', 'polygon_id')
+
+# Magic bytes used to detect binary uploads
+PARQUET_MAGIC = b'PAR1'
+ARROW_FILE_MAGIC = b'ARROW1'
+ARROW_STREAM_CONTINUATION = b'\xff\xff\xff\xff'
+
+# Maximum number of datasets kept in memory before the least recently used one is evicted
+MAX_REGISTERED_DATASETS = int(os.getenv('MAX_REGISTERED_DATASETS', 8))
+
+# Directory where registered datasets are persisted as memory-mappable files; empty disables it
+DATASET_CACHE_DIR = os.getenv('DATASET_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset_cache'))
+
+# Datasets kept in the disk cache before the least recently registered ones are deleted
+MAX_CACHED_DATASETS = int(os.getenv('MAX_CACHED_DATASETS', 32))
+
+# Bumped whenever the on-disk layout changes so stale caches are ignored
+CACHE_FORMAT_VERSION = 6
+
+# Bytes read from the request stream per refill when parsing uploads incrementally
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Top-level keys whose array value holds the features of a streamed upload
+FEATURE_ARRAY_KEYS = ('features', 'polygons')
+
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def compute_dataset_id(raw_bytes):
+    """Derive a stable dataset id from the raw uploaded bytes."""
+    return hashlib.sha256(raw_bytes).hexdigest()[:16]
+
+
+def extract_features(payload):
+    """Returns the list of features from a FeatureCollection, a {'polygons': [...]} body or a bare list."""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        if isinstance(payload.get('features'), list):
+            return payload['features']
+        if isinstance(payload.get('polygons'), list):
+            return payload['polygons']
+    return None
+
+
+def _category_column(values):
+    """CategoryColumn of the string values of a property, or None if it holds none or too many distinct ones."""
+    strings = [v if isinstance(v, str) else None for v in values]
+    if all(v is None for v in strings):
+        return None
+    return CategoryColumn.encode(strings)
+
+
+def _find_column(names, candidates):
+    """Returns the first column name matching one of the candidates case-insensitively."""
+    lowered = {name.lower(): name for name in names}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    return None
+
+
+def is_arrow_upload(raw_bytes):
+    """True if the bytes start like a Parquet file, Arrow IPC file or Arrow IPC stream."""
+    return raw_bytes.startswith((PARQUET_MAGIC, ARROW_FILE_MAGIC, ARROW_STREAM_CONTINUATION))
+
+
+def read_arrow_table(raw_bytes):
+    """Reads a Parquet file, Arrow IPC file or Arrow IPC stream from raw bytes, or returns None."""
+    if raw_bytes[:4] == PARQUET_MAGIC:
+        return pq.read_table(pa.BufferReader(raw_bytes))
+    if raw_bytes[:6] == ARROW_FILE_MAGIC:
+        return pa.ipc.open_file(pa.BufferReader(raw_bytes)).read_all()
+    if raw_bytes[:4] == ARROW_STREAM_CONTINUATION:
+        return pa.ipc.open_stream(pa.BufferReader(raw_bytes)).read_all()
+    return None
+
+
+class SpatialDataset:
+    """
+    Columnar (struct-of-arrays) view of a polygon dataset used by every pipeline stage.
+
+    Attributes:
+        ids: Object array of polygon ids
+        coords: (n, 2) float64 array of lng/lat points, NaN where the geometry is unusable
+        valid_mask: Boolean array, True where coords can be clustered
+        feature_table: FeatureTable of the numeric property columns in their compact storage form
+        feature_names: Names of the numeric property columns
+        scores: float64 suitability score vector
+        labels: int64 cluster label vector, -1 for unassigned polygons
+        source_features: Original GeoJSON features, only read when materializing responses
+        source_table: Arrow table of the uploaded columns, used instead of source_features for
+            Parquet / Arrow uploads
+        areas: Optional polygon areas in squared degrees, from the geometry kernel
+        bboxes: Optional (n, 4) polygon bounding boxes, from the geometry kernel
+    """
+
+    def __init__(self, ids, coords, feature_table, scores=None, source_features=None, source_table=None,
+                 areas=None, bboxes=None):
+        n = len(ids)
+        self.ids = ids
+        self.coords = coords
+        self.valid_mask = ~np.isnan(coords).any(axis=1) if n else np.zeros(0, dtype=bool)
+        self.feature_table = feature_table
+        self.scores = scores if scores is not None else np.zeros(n, dtype=np.float64)
+        self.labels = np.full(n, -1, dtype=np.int64)
+        self.source_features = source_features
+        self.source_table = source_table
+        self.areas = areas
+        self.bboxes = bboxes
+        self.scored = False
+        self.modified_columns = set()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def feature_names(self):
+        return self.feature_table.names
+
+    @classmethod
+    def from_features(cls, features, geometry_cache=None):
+        """
+        Builds a dataset from GeoJSON features in a single pass over the input.
+        Geometry summaries are taken from geometry_cache when given, so unchanged polygons skip the kernel.
+        """
+        n = len(features)
+        ids = np.array([f.get('id') for f in features], dtype=object)
+
+        if geometry_cache is not None:
+            geometry = geometry_cache.summarize(features)
+        else:
+            geometry = summarize_geojson(f.get('geometry') for f in features)
+
+        df = pd.DataFrame([f.get('properties') or {} for f in features], index=range(n))
+
+        scores = np.zeros(n, dtype=np.float64)
+        if 'suitabilityScore' in df.columns:
+            scores = pd.to_numeric(df['suitabilityScore'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+        feature_names, columns, categories = [], [], {}
+        for col in df.columns:
+            if col in RESERVED_PROPERTIES:
+                continue
+            values = pd.to_numeric(df[col], errors='coerce')
+            if values.notna().any():
+                feature_names.append(col)
+                columns.append(values.to_numpy(dtype=np.float64, na_value=np.nan))
+            else:
+                category = _category_column(df[col])
+                if category is not None:
+                    categories[col] = category
+
+        feature_table = FeatureTable.from_arrays(feature_names, columns, n)
+        feature_table.categories = categories
+        dataset = cls(ids, geometry.centroids, feature_table, scores, features, areas=geometry.areas, bboxes=geometry.bboxes)
+
+        # Cluster numbers echoed from an earlier clustering response, so scenarios can target clusters
+        clusters = pd.to_numeric(pd.Series([f.get('cluster') for f in features], dtype=object), errors='coerce')
+        if clusters.notna().any():
+            dataset.labels = clusters.fillna(-1).to_numpy(dtype=np.int64)
+        return dataset
+
+    @classmethod
+    def from_arrow_table(cls, table, id_prefix='row'):
+        """
+        Builds a dataset directly from an Arrow table without creating per-row Python objects.
+        
+        Coordinates come from lon/lat columns or, failing that, a WKB geometry column.
+        Every other numeric or boolean column becomes a feature column.
+        """
+        names = table.column_names
+        lon_col = _find_column(names, LONGITUDE_COLUMNS)
+        lat_col = _find_column(names, LATITUDE_COLUMNS)
+        geom_col = _find_column(names, GEOMETRY_COLUMNS)
+        id_col = _find_column(names, ID_COLUMNS)
+        n = table.num_rows
+
+        areas = bboxes = None
+        if lon_col and lat_col:
+            coords = np.column_stack([
+                pc.cast(table[lon_col], pa.float64()).to_numpy(zero_copy_only=False),
+                pc.cast(table[lat_col], pa.float64()).to_numpy(zero_copy_only=False)
+            ])
+        elif geom_col:
+            geometry = summarize_wkb(table[geom_col])
+            coords, areas, bboxes = geometry.centroids, geometry.areas, geometry.bboxes
+        else:
+            raise ValueError(f"No coordinate columns found; expected lon/lat or a WKB geometry column, got {names}")
+
+        if id_col:
+            ids = np.array(pc.cast(table[id_col], pa.string()).to_pylist(), dtype=object)
+        else:
+            ids = np.char.add(f'{id_prefix}-', np.arange(n).astype(str)).astype(object)
+
+        scores = None
+        if 'suitabilityScore' in names:
+            scores = pc.fill_null(pc.cast(table['suitabilityScore'], pa.float64()), 0).to_numpy(zero_copy_only=False)
+
+        skipped = {lon_col, lat_col, geom_col, id_col}
+        feature_names, columns, categories = [], [], {}
+        for name in names:
+            if name in skipped or name in RESERVED_PROPERTIES:
+                continue
+            column_type = table.schema.field(name).type
+            value_type = column_type.value_type if pa.types.is_dictionary(column_type) else column_type
+            if pa.types.is_integer(column_type) or pa.types.is_floating(column_type) or pa.types.is_boolean(column_type):
+                feature_names.append(name)
+                columns.append(pc.cast(table[name], pa.float64()).to_numpy(zero_copy_only=False))
+            elif pa.types.is_string(value_type) or pa.types.is_large_string(value_type):
+                category = CategoryColumn.encode(pc.cast(table[name], pa.string()).to_numpy(zero_copy_only=False))
+                if category is not None:
+                    categories[name] = category
+
+        feature_table = FeatureTable.from_arrays(feature_names, columns, n)
+        feature_table.categories = categories
+        # WKB bytes are not JSON serializable, so the geometry column is dropped from the response source
+        source_table = table.drop_columns([geom_col]) if geom_col and not (lon_col and lat_col) else table
+        return cls(ids, np.ascontiguousarray(coords, dtype=np.float64), feature_table, scores,
+                   source_table=source_table, areas=areas, bboxes=bboxes)
+
+    def shallow_copy(self):
+        """Returns a copy that shares the underlying arrays, so stages can rebind them without side effects."""
+        clone = copy.copy(self)
+        clone.modified_columns = set(self.modified_columns)
+        return clone
+
+    def fingerprint(self):
+        """Content hash of the ids, coordinates and feature columns, for keying results of datasets posted inline."""
+        digest = hashlib.sha256()
+        digest.update('\x1f'.join(map(str, self.ids.tolist())).encode('utf-8'))
+        digest.update(np.ascontiguousarray(self.coords).tobytes())
+        for name, column in zip(self.feature_table.names, self.feature_table.columns):
+            digest.update(f'{name}:{column.kind}'.encode('utf-8'))
+            digest.update(np.ascontiguousarray(column.data).tobytes())
+            if column.null_mask is not None:
+                digest.update(np.ascontiguousarray(column.null_mask).tobytes())
+        for name, category in self.feature_table.categories.items():
+            digest.update('\x1f'.join([name] + category.categories).encode('utf-8'))
+            digest.update(np.ascontiguousarray(category.codes).tobytes())
+        return digest.hexdigest()[:16]
+
+    def to_features(self, indices=None):
+        """Materializes GeoJSON features (with score, modified properties and cluster) for the given rows."""
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices, dtype=np.int64)
+        # Only the requested rows are converted, so callers can materialize large outputs in batches
+        scores = self.scores[indices].tolist() if self.scored else None
+        labels = self.labels[indices].tolist()
+        modified = [(name, self.feature_table.column(name).decode(indices).tolist()) for name in self.modified_columns]
+
+        output = []
+        for k, (i, source) in enumerate(zip(indices, self._source_features(indices))):
+            feature = dict(source)
+            feature['id'] = self.ids[i]
+            if scores is not None or modified:
+                properties = dict(source.get('properties') or {})
+                for name, values in modified:
+                    value = values[k]
+                    properties[name] = 0.0 if value != value else value
+                if scores is not None:
+                    properties['suitabilityScore'] = scores[k]
+                feature['properties'] = properties
+            if labels[k] >= 0:
+                feature['cluster'] = labels[k]
+            output.append(feature)
+        return output
+
+    def _source_features(self, indices):
+        """Yields the source GeoJSON feature for each row, building Point features for Arrow uploads."""
+        if self.source_features is not None:
+            for i in indices:
+                yield self.source_features[i]
+            return
+
+        indices = np.fromiter(indices, dtype=np.int64)
+        rows = self.source_table.take(pa.array(indices)).to_pylist()
+        coords = self.coords[indices].tolist()
+        for row, (lng, lat) in zip(rows, coords):
+            geometry = None if np.isnan(lng) or np.isnan(lat) else {'type': 'Point', 'coordinates': [lng, lat]}
+            yield {'type': 'Feature', 'geometry': geometry, 'properties': row}
+
+
+class _JsonlFeatureSource:
+    """Random-access view of persisted GeoJSON features; a feature is only parsed when it is read."""
+
+    def __init__(self, path, offsets):
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b''
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return json.loads(self._data[self._offsets[i]:self._offsets[i + 1]])
+
+
+def save_dataset(dataset, directory, staging=None, feature_offsets=None):
+    """
+    Persists a dataset as .npy / Arrow files that can later be memory-mapped by any worker.
+    Files are written to a temporary directory first and moved into place atomically.
+    
+    Args:
+        staging: Existing staging directory to complete instead of creating a new one
+        feature_offsets: Byte offsets of a features.jsonl already written to staging
+    """
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = staging or tempfile.mkdtemp(dir=parent, prefix='.staging-')
+    try:
+        ids = dataset.ids.tolist()
+        if all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            np.save(os.path.join(staging, 'ids.npy'), np.array(ids, dtype=np.int64))
+        elif all(isinstance(i, str) for i in ids):
+            np.save(os.path.join(staging, 'ids.npy'), np.array(ids, dtype=str))
+        else:
+            # Mixed id types keep their JSON types rather than all becoming strings
+            with open(os.path.join(staging, 'ids.json'), 'w') as f:
+                json.dump(ids, f)
+        np.save(os.path.join(staging, 'coords.npy'), np.ascontiguousarray(dataset.coords))
+        dataset.feature_table.save(staging)
+        np.save(os.path.join(staging, 'scores.npy'), np.ascontiguousarray(dataset.scores))
+        if (dataset.labels >= 0).any():
+            np.save(os.path.join(staging, 'labels.npy'), np.ascontiguousarray(dataset.labels))
+        if dataset.areas is not None:
+            np.save(os.path.join(staging, 'areas.npy'), np.ascontiguousarray(dataset.areas))
+            np.save(os.path.join(staging, 'bboxes.npy'), np.ascontiguousarray(dataset.bboxes))
+
+        if dataset.source_table is not None:
+            source_kind = 'arrow'
+            with pa.OSFile(os.path.join(staging, 'source.arrow'), 'wb') as sink:
+                with pa.ipc.new_file(sink, dataset.source_table.schema) as writer:
+                    writer.write_table(dataset.source_table)
+        elif feature_offsets is not None:
+            source_kind = 'geojson'
+            np.save(os.path.join(staging, 'feature_offsets.npy'), np.asarray(feature_offsets, dtype=np.int64))
+        else:
+            source_kind = 'geojson'
+            offsets = [0]
+            with open(os.path.join(staging, 'features.jsonl'), 'wb') as out:
+                for i in range(len(dataset)):
+                    line = json.dumps(dataset.source_features[i], separators=(',', ':')).encode('utf-8')
+                    out.write(line)
+                    offsets.append(offsets[-1] + len(line))
+            np.save(os.path.join(staging, 'feature_offsets.npy'), np.array(offsets, dtype=np.int64))
+
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump({
+                'version': CACHE_FORMAT_VERSION,
+                'feature_names': dataset.feature_names,
+                'total_polygons': len(dataset),
+                'source': source_kind,
+                'scored': dataset.scored,
+                'registered_at': time.time()
+            }, f)
+
+        if os.path.isdir(directory) and _cache_version(directory) != CACHE_FORMAT_VERSION:
+            # Move a cache left by an older format out of the way so it is rebuilt
+            stale = tempfile.mkdtemp(dir=parent, prefix='.stale-')
+            os.replace(directory, os.path.join(stale, 'dataset'))
+            shutil.rmtree(stale, ignore_errors=True)
+        if os.path.isdir(directory):
+            shutil.rmtree(staging)
+        else:
+            os.replace(staging, directory)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def _cache_version(directory):
+    """Returns the format version recorded in a dataset cache directory, or None if unreadable."""
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            return json.load(f).get('version')
+    except (OSError, ValueError):
+        return None
+
+
+def load_dataset(directory):
+    """Opens a persisted dataset with memory-mapped arrays. Returns None if missing or from an older format."""
+    meta_path = os.path.join(directory, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('version') != CACHE_FORMAT_VERSION:
+        logger.warning(f"Ignoring dataset cache {directory} with format version {meta.get('version')}")
+        return None
+
+    def _load(name):
+        return np.load(os.path.join(directory, name), mmap_mode='r')
+
+    if meta['source'] == 'arrow':
+        source_table = pa.ipc.open_file(pa.memory_map(os.path.join(directory, 'source.arrow'))).read_all()
+        source_features = None
+    else:
+        source_table = None
+        source_features = _JsonlFeatureSource(os.path.join(directory, 'features.jsonl'),
+                                              np.load(os.path.join(directory, 'feature_offsets.npy')))
+
+    if os.path.exists(os.path.join(directory, 'ids.json')):
+        with open(os.path.join(directory, 'ids.json')) as f:
+            ids = np.empty(meta['total_polygons'], dtype=object)
+            ids[:] = json.load(f)
+    else:
+        ids = np.load(os.path.join(directory, 'ids.npy')).astype(object)
+
+    dataset = SpatialDataset(
+        ids,
+        _load('coords.npy'),
+        FeatureTable.load(directory),
+        np.array(_load('scores.npy')),
+        source_features=source_features,
+        source_table=source_table
+    )
+    dataset.scored = meta.get('scored', False)
+    if os.path.exists(os.path.join(directory, 'labels.npy')):
+        dataset.labels = np.array(_load('labels.npy'))
+    if os.path.exists(os.path.join(directory, 'areas.npy')):
+        dataset.areas = _load('areas.npy')
+        dataset.bboxes = _load('bboxes.npy')
+    return dataset, meta
+
+
+class StreamingGeoJSONParser:
+    """
+    Incremental parser that decodes a GeoJSON upload one feature at a time.
+    
+    Accepts a FeatureCollection, a {'polygons': [...]} body or a bare list of features.
+    Top-level keys other than the feature array are decoded normally and collected in payload,
+    and the raw bytes are hashed as they are read so the dataset id matches a regular upload.
+    The features alone are hashed too, for uploads embedded in API requests whose other keys
+    (params, weights, ...) change from call to call.
+    API request bodies pass feature_keys=('polygons',) since their 'features' key lists column names.
+    """
+
+    def __init__(self, stream, prefix=b'', chunk_size=STREAM_CHUNK_SIZE, feature_keys=FEATURE_ARRAY_KEYS):
+        self.payload = {}
+        self._feature_keys = feature_keys
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._hash = hashlib.sha256()
+        self._features_hash = hashlib.sha256()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        if prefix:
+            self._feed(prefix)
+
+    def _feed(self, raw):
+        self._hash.update(raw)
+        self._buf = self._buf[self._pos:] + self._utf8.decode(raw)
+        self._pos = 0
+
+    def _fill(self):
+        """Reads the next chunk into the buffer. Returns False once the stream is exhausted."""
+        raw = self._stream.read(self._chunk_size)
+        if not raw:
+            self._eof = True
+            self._buf += self._utf8.decode(b'', final=True)
+            return False
+        self._feed(raw)
+        return True
+
+    def _peek(self):
+        while True:
+            self._pos = _JSON_WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or not self._fill():
+                return self._buf[self._pos:self._pos + 1]
+
+    def _expect(self, chars):
+        ch = self._peek()
+        if not ch or ch not in chars:
+            raise ValueError(f"Malformed JSON upload: expected one of {chars!r}, found {ch!r}")
+        self._pos += 1
+        return ch
+
+    def _decode_value(self, keep_text=False):
+        """Decodes the next JSON value, reading more data until it is complete."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A value ending exactly at the buffer edge may be a truncated number or literal
+                if end < len(self._buf) or self._eof:
+                    text = self._buf[self._pos:end] if keep_text else None
+                    self._pos = end
+                    return value, text
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def _array_items(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            feature, text = self._decode_value(keep_text=True)
+            self._features_hash.update(text.encode('utf-8') + b'\n')
+            yield feature, text
+            if self._expect(',]') == ']':
+                return
+
+    def features(self):
+        """Yields (feature, raw_text) pairs; other top-level keys are collected into payload."""
+        ch = self._peek()
+        if ch == '[':
+            yield from self._array_items()
+            return
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key, _ = self._decode_value()
+            self._expect(':')
+            if key in self._feature_keys and self._peek() == '[':
+                yield from self._array_items()
+            else:
+                self.payload[key], _ = self._decode_value()
+            if self._expect(',}') == '}':
+                return
+
+    def dataset_id(self):
+        """Returns the content-hash id of the whole upload, draining any unread trailing bytes."""
+        while not self._eof:
+            self._fill()
+        return self._hash.hexdigest()[:16]
+
+    def features_id(self):
+        """Returns the content-hash id of the features alone, ignoring the other top-level keys."""
+        return self._features_hash.hexdigest()[:16]
+
+
+def _as_float(value):
+    """Converts a property value to float the way pd.to_numeric would, or returns None."""
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_dataset_from_stream(parser, columns=None, feature_sink=None):
+    """
+    Builds a SpatialDataset from a StreamingGeoJSONParser, one feature at a time.
+    
+    Only each feature's ring coordinates and numeric properties (restricted to columns when given)
+    are kept, in growing typed arrays; the GeoJSON objects and other properties are dropped as
+    soon as the feature has been read. Raw feature text is written to feature_sink when provided.
+    
+    Returns:
+        Tuple of (dataset without a response source, byte offsets of the features in feature_sink)
+    """
+    keep = set(columns) if columns else None
+    ids = []
+    sparse_columns = {}  # name -> (row indices, values)
+    text_columns = {}  # name -> (row indices, codes, {value: code}); dropped past MAX_CATEGORY_VALUES
+    dropped_text = set()
+    score_rows, score_values = array('q'), array('d')
+    label_rows, label_values = array('q'), array('q')
+    offsets = array('q', [0])
+    rings = RingAccumulator()
+
+    for row, (feature, text) in enumerate(parser.features()):
+        ids.append(feature['id'] if 'id' in feature else str(uuid.uuid4()))
+        rings.add(row, feature.get('geometry'))
+        # Cluster numbers echoed from an earlier clustering response, as in SpatialDataset.from_features
+        cluster = _as_float(feature.get('cluster'))
+        if cluster is not None and cluster == cluster:
+            label_rows.append(row)
+            label_values.append(int(cluster))
+
+        for key, value in (feature.get('properties') or {}).items():
+            if key == 'cluster' or (keep is not None and key not in keep and key != 'suitabilityScore'):
+                continue
+            number = _as_float(value)
+            if number is None:
+                if isinstance(value, str) and key not in dropped_text:
+                    entry = text_columns.get(key)
+                    if entry is None:
+                        entry = text_columns[key] = (array('q'), array('q'), {})
+                    code = entry[2].setdefault(value, len(entry[2]))
+                    if len(entry[2]) > MAX_CATEGORY_VALUES:
+                        dropped_text.add(key)
+                        del text_columns[key]
+                        continue
+                    entry[0].append(row)
+                    entry[1].append(code)
+                continue
+            if key == 'suitabilityScore':
+                score_rows.append(row)
+                score_values.append(number)
+                continue
+            entry = sparse_columns.get(key)
+            if entry is None:
+                entry = sparse_columns[key] = (array('q'), array('d'))
+            entry[0].append(row)
+            entry[1].append(number)
+
+        if feature_sink is not None:
+            encoded = text.encode('utf-8')
+            feature_sink.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+
+    def _np(values, dtype):
+        return np.frombuffer(values, dtype=dtype) if len(values) else np.empty(0, dtype=dtype)
+
+    n = len(ids)
+    geometry = rings.summarize(n)
+    # Densify and encode one column at a time so only a single float64 column is materialized
+    columns = []
+    for name, (rows, values) in sparse_columns.items():
+        column = np.full(n, np.nan, dtype=np.float64)
+        column[_np(rows, np.int64)] = _np(values, np.float64)
+        columns.append(FeatureColumn.encode(name, column))
+        del rows[:], values[:]
+    scores = np.zeros(n, dtype=np.float64)
+    scores[_np(score_rows, np.int64)] = _np(score_values, np.float64)
+
+    # Text properties become category columns unless the property also holds numbers
+    categories = {}
+    for name, (rows, codes, values) in text_columns.items():
+        if name in sparse_columns:
+            continue
+        dense = np.full(n, -1, dtype=np.int64)
+        dense[_np(rows, np.int64)] = _np(codes, np.int64)
+        categories[name] = CategoryColumn.from_codes(dense, list(values))
+
+    feature_table = FeatureTable(list(sparse_columns), columns, n, categories)
+    dataset = SpatialDataset(np.array(ids, dtype=object), geometry.centroids, feature_table, scores,
+                             areas=geometry.areas, bboxes=geometry.bboxes)
+    dataset.labels[_np(label_rows, np.int64)] = _np(label_values, np.int64)
+    return dataset, offsets
+
+
+class DatasetRegistry:
+    """
+    Thread-safe, bounded in-memory store of registered datasets keyed by dataset id.
+    
+    When a cache directory is configured, datasets are also persisted there and reopened with
+    memory mapping on a miss, so restarted or sibling workers never re-parse the upload.
+    """
+
+    def __init__(self, max_datasets=MAX_REGISTERED_DATASETS, cache_dir=DATASET_CACHE_DIR):
+        self.max_datasets = max(1, max_datasets)
+        self.cache_dir = cache_dir or None
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _dataset_dir(self, dataset_id):
+        return os.path.join(self.cache_dir, dataset_id)
+
+    def __contains__(self, dataset_id):
+        return self._entry(dataset_id) is not None
+
+    def _entry(self, dataset_id):
+        """Returns the in-memory entry for dataset_id, loading it from the disk cache on a miss."""
+        with self._lock:
+            entry = self._datasets.get(dataset_id)
+            if entry is not None:
+                self._datasets.move_to_end(dataset_id)
+                return entry
+        if not self.cache_dir or os.sep in dataset_id or not dataset_id.isalnum():
+            return None
+
+        loaded = load_dataset(self._dataset_dir(dataset_id))
+        if loaded is None:
+            return None
+        dataset, meta = loaded
+        try:
+            os.utime(self._dataset_dir(dataset_id))  # Recently used datasets are the last trimmed from disk
+        except OSError:
+            pass
+        logger.info(f"Loaded dataset {dataset_id} from disk cache with {len(dataset)} polygons.")
+        return self._store(dataset_id, dataset, meta['registered_at'])
+
+    def _trim_disk_cache(self, root):
+        """Deletes the least recently used datasets under root beyond MAX_CACHED_DATASETS, except those in memory."""
+        try:
+            entries = [e for e in os.scandir(root) if e.is_dir() and e.name.isalnum()]
+        except OSError:
+            return
+        excess = len(entries) - MAX_CACHED_DATASETS
+        if excess <= 0:
+            return
+        with self._lock:
+            entries = [e for e in entries if e.name not in self._datasets]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:excess]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            logger.info(f"Deleted dataset {entry.name} from disk cache (limit: {MAX_CACHED_DATASETS})")
+
+    def _store(self, dataset_id, dataset, registered_at):
+        with self._lock:
+            entry = self._datasets.setdefault(dataset_id, {
+                'dataset': dataset,
+                'registered_at': registered_at
+            })
+            self._datasets.move_to_end(dataset_id)
+            while len(self._datasets) > self.max_datasets:
+                evicted_id, _ = self._datasets.popitem(last=False)
+                logger.info(f"Evicted dataset {evicted_id} from registry (limit: {self.max_datasets})")
+            return entry
+
+    def get(self, dataset_id):
+        """Returns the registered SpatialDataset for dataset_id, or None if unknown."""
+        entry = self._entry(dataset_id)
+        return entry['dataset'] if entry is not None else None
+
+    def info(self, dataset_id):
+        """Returns summary metadata for a registered dataset, or None if unknown."""
+        entry = self._entry(dataset_id)
+        if entry is None:
+            return None
+        return {
+            'dataset_id': dataset_id,
+            'total_polygons': len(entry['dataset']),
+            'feature_names': entry['dataset'].feature_names,
+            'feature_dtypes': entry['dataset'].feature_table.dtypes(),
+            'feature_bytes': entry['dataset'].feature_table.nbytes,
+            'null_counts': entry['dataset'].feature_table.null_counts(),
+            'category_columns': {name: len(c.categories) for name, c in entry['dataset'].feature_table.categories.items()},
+            'registered_at': entry['registered_at']
+        }
+
+    def register(self, dataset_id, dataset):
+        """Stores a SpatialDataset under dataset_id (and on disk), evicting the least recently used dataset if full."""
+        if self.cache_dir:
+            try:
+                save_dataset(dataset, self._dataset_dir(dataset_id))
+                dataset.feature_table.directory = self._dataset_dir(dataset_id)
+            except OSError as e:
+                logger.warning(f"Could not persist dataset {dataset_id} to {self.cache_dir}: {e}")
+        with self._lock:
+            self._datasets.pop(dataset_id, None)
+        self._store(dataset_id, dataset, time.time())
+        if self.cache_dir:
+            self._trim_disk_cache(self.cache_dir)
+
+    def register_stream(self, stream, prefix=b'', columns=None, feature_keys=FEATURE_ARRAY_KEYS, features_only=False):
+        """
+        Registers a GeoJSON upload by parsing it incrementally from a file-like stream.
+        
+        Raw feature text is spilled straight to the dataset's cache directory while parsing, so
+        neither the raw JSON nor the parsed features are ever held in memory as a whole.
+        The id hashes the whole upload, or only its features when features_only is set (for
+        request bodies), and the kept columns when the upload is restricted to some of them.
+        
+        Returns:
+            Tuple of (dataset_id or None if the upload held no features, other top-level keys)
+        """
+        spill_root = self.cache_dir or os.path.join(tempfile.gettempdir(), 'geo-dataset-cache')
+        os.makedirs(spill_root, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=spill_root, prefix='.staging-')
+        try:
+            parser = StreamingGeoJSONParser(stream, prefix=prefix, feature_keys=feature_keys)
+            with open(os.path.join(staging, 'features.jsonl'), 'wb') as sink:
+                dataset, offsets = build_dataset_from_stream(parser, columns=columns, feature_sink=sink)
+            dataset_id = parser.dataset_id()
+            if features_only:
+                dataset_id = parser.features_id()
+            if columns:
+                dataset_id = compute_dataset_id(f"{dataset_id}:{','.join(sorted(set(columns)))}".encode('utf-8'))
+
+            if not len(dataset) or dataset_id in self:
+                shutil.rmtree(staging, ignore_errors=True)
+                return (dataset_id if len(dataset) else None), parser.payload
+
+            directory = os.path.join(spill_root, dataset_id)
+            save_dataset(dataset, directory, staging=staging, feature_offsets=offsets)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        dataset, _ = load_dataset(directory)
+        with self._lock:
+            self._datasets.pop(dataset_id, None)
+        self._store(dataset_id, dataset, time.time())
+        self._trim_disk_cache(spill_root)
+        logger.info(f"Registered streamed dataset {dataset_id} with {len(dataset)} polygons and {len(dataset.feature_names)} numeric features.")
+        return dataset_id, parser.payload
+
+    def remove(self, dataset_id):
+        """Removes a dataset from memory and the disk cache. Returns True if it was present."""
+        with self._lock:
+            removed = self._datasets.pop(dataset_id, None) is not None
+        if self.cache_dir and dataset_id.isalnum() and os.path.isdir(self._dataset_dir(dataset_id)):
+            shutil.rmtree(self._dataset_dir(dataset_id), ignore_errors=True)
+            removed = True
+        return removed
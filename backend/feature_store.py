@@ -0,0 +1,855 @@
+"""
+Compact column storage for village feature data.
+Each column's dtype is chosen from its unit in FEATURE_DESCRIPTIONS: Yes/No facility flags are
+bit-packed, counts use the narrowest integer type that holds them and areas are float32.
+Filtering decodes one column at a time; scoring decodes only the selected columns and caches
+their normalized matrix, so a weight-only re-score is a single matrix-vector product.
+Columns can be normalized by min-max, robust quantile, z-score or rank, using summary
+statistics computed once per column, and inverted for features where lower values are better.
+Low-cardinality string properties (state, district, ...) are kept as category codes for filtering.
+Missing values are imputed per table and strategy once, into a cached copy of the affected columns.
+Tables opened from a dataset cache directory persist their normalized matrices there as .npy files
+and memory-map them, so every worker shares one copy through the OS page cache.
+"""
+
+import hashlib
+import json
+import logging
+import operator
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from scipy.stats import rankdata
+
+from feature_descriptions import FEATURE_DESCRIPTIONS
+
+logger = logging.getLogger(__name__)
+
+# Storage kinds
+KIND_BINARY = 'binary'
+KIND_COUNT = 'count'
+KIND_AREA = 'area'
+KIND_FLOAT = 'float'
+
+# Catalog units mapped to the storage kind they prefer
+UNIT_KINDS = {
+    'Binary (Yes/No)': KIND_BINARY,
+    'Count': KIND_COUNT,
+    'Hectares': KIND_AREA
+}
+
+# Integer types tried, narrowest first, when storing counts
+_INTEGER_DTYPES = (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.int64)
+
+# Largest magnitude a float64 holds as an exact integer
+_MAX_EXACT_INTEGER = 2 ** 53
+
+# Normalized matrices kept per FeatureTable, by feature selection, before the oldest is evicted
+MAX_CACHED_SELECTIONS = int(os.getenv('MAX_CACHED_SELECTIONS', 4))
+# Bytes of in-memory normalized matrices kept across every FeatureTable in the process
+NORMALIZED_CACHE_MAX_BYTES = int(os.getenv('NORMALIZED_CACHE_MAX_MB', 256)) * 1024 * 1024
+# Normalized matrices kept on disk per dataset cache directory; the least recently written are deleted first
+MAX_PERSISTED_SELECTIONS = int(os.getenv('MAX_PERSISTED_SELECTIONS', 16))
+
+# Normalization methods accepted by FeatureTable.normalized
+NORMALIZATION_MINMAX = 'minmax'
+NORMALIZATION_ROBUST = 'robust'
+NORMALIZATION_ZSCORE = 'zscore'
+NORMALIZATION_RANK = 'rank'
+NORMALIZATION_METHODS = (NORMALIZATION_MINMAX, NORMALIZATION_ROBUST, NORMALIZATION_ZSCORE, NORMALIZATION_RANK)
+
+# Quantiles kept in each column's statistics; robust normalization maps ROBUST_QUANTILES to 0 and 1
+STAT_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+ROBUST_QUANTILES = (0.05, 0.95)
+
+# Ranges below this are treated as constant, as in sklearn's scalers
+_MIN_SCALE = 10 * np.finfo(np.float64).eps
+
+# Missing-value imputation methods accepted by FeatureTable.imputed
+IMPUTATION_ZERO = 'zero'
+IMPUTATION_MEDIAN = 'median'
+IMPUTATION_MEAN = 'mean'
+IMPUTATION_NEIGHBOR = 'neighbor'
+IMPUTATION_METHODS = (IMPUTATION_ZERO, IMPUTATION_MEDIAN, IMPUTATION_MEAN, IMPUTATION_NEIGHBOR)
+
+# Nearest villages with a value whose mean fills a missing value under neighbor imputation
+IMPUTATION_NEIGHBORS = int(os.getenv('IMPUTATION_NEIGHBORS', 5))
+
+# String properties with more distinct values than this are not kept as category columns
+MAX_CATEGORY_VALUES = int(os.getenv('MAX_CATEGORY_VALUES', 16384))
+
+# Operators accepted by CategoryColumn.compare; values are matched case-insensitively
+CATEGORY_OPERATORS = ('==', '!=', 'in', 'not in')
+
+# Comparison operators accepted by FeatureColumn.compare
+COMPARISON_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le
+}
+
+
+def _row_count(rows, length):
+    """Number of rows selected by None (all rows), a slice or an index array."""
+    if rows is None:
+        return length
+    if isinstance(rows, slice):
+        return len(range(*rows.indices(length)))
+    return len(rows)
+
+
+def _read_bits(packed, rows, length):
+    """
+    Returns the bits of a little-endian packed bit array as uint8, for the given rows or all of them.
+    Rows may be a contiguous slice, in which case only the bytes covering it are unpacked.
+    """
+    if rows is None:
+        return np.unpackbits(packed, count=length, bitorder='little')
+    if isinstance(rows, slice):
+        start, stop, _ = rows.indices(length)
+        bits = np.unpackbits(packed[start >> 3:(stop + 7) >> 3], bitorder='little')
+        return bits[start & 7:(start & 7) + max(stop - start, 0)]
+    return (packed[rows >> 3] >> (rows & 7).astype(np.uint8)) & 1
+
+
+def _pack_bits(values):
+    return np.packbits(np.asarray(values, dtype=bool), bitorder='little')
+
+
+def _integer_dtype(data_min, data_max):
+    for dtype in _INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= data_min and data_max <= info.max:
+            return dtype
+    return np.int64
+
+
+def catalog_direction(name):
+    """Whether higher values of a feature are better, from positive_impact in the catalog (True if unlisted)."""
+    return bool(FEATURE_DESCRIPTIONS.get(name, {}).get('positive_impact', True))
+
+
+def _neighbor_fill(values, nulls, coords):
+    """Mean of the IMPUTATION_NEIGHBORS nearest rows with a value, for each missing row; column mean without coordinates."""
+    fill = np.full(int(nulls.sum()), values[~nulls].mean())
+    valid = ~np.isnan(coords).any(axis=1)
+    donors = ~nulls & valid
+    targets = valid[nulls]
+    if not donors.any() or not targets.any():
+        return fill
+    # Equirectangular projection so longitude and latitude distances are comparable
+    points = coords * np.array([np.cos(np.radians(np.nanmean(coords[:, 1]))), 1.0])
+    k = min(IMPUTATION_NEIGHBORS, int(donors.sum()))
+    _, neighbors = cKDTree(points[donors]).query(points[nulls][targets], k=k)
+    fill[targets] = values[donors][neighbors.reshape(len(neighbors), k)].mean(axis=1)
+    return fill
+
+
+def storage_kind(name, present):
+    """
+    Picks the storage kind for a column from its catalog unit, checked against the actual values.
+    Columns outside the catalog, or whose values do not fit their unit, are inferred from the values.
+    """
+    unit_kind = UNIT_KINDS.get(FEATURE_DESCRIPTIONS.get(name, {}).get('unit'))
+    if unit_kind == KIND_AREA:
+        return KIND_AREA
+
+    is_binary = bool(np.isin(present, (0.0, 1.0)).all())
+    is_integral = bool((np.abs(present) < _MAX_EXACT_INTEGER).all() and (present == np.floor(present)).all())
+    if unit_kind == KIND_COUNT and is_integral:
+        return KIND_COUNT
+    if is_binary:
+        return KIND_BINARY
+    if is_integral:
+        return KIND_COUNT
+    return KIND_FLOAT
+
+
+class ColumnStats:
+    """
+    Summary statistics of a column once missing values are filled with 0, as used for scoring.
+
+    Attributes:
+        mean, std: Mean and population standard deviation
+        quantiles: Values at STAT_QUANTILES, keyed by quantile
+    """
+
+    def __init__(self, mean, std, quantiles):
+        self.mean = mean
+        self.std = std
+        self.quantiles = quantiles
+
+    @classmethod
+    def from_values(cls, values):
+        """Computes every statistic from one decoded column, with missing values already filled with 0."""
+        if not len(values):
+            return cls(0.0, 0.0, {q: 0.0 for q in STAT_QUANTILES})
+        quantiles = np.quantile(values, STAT_QUANTILES)
+        return cls(float(values.mean()), float(values.std()), dict(zip(STAT_QUANTILES, quantiles.tolist())))
+
+    def to_dict(self):
+        return {'mean': self.mean, 'std': self.std, 'quantiles': [[q, v] for q, v in self.quantiles.items()]}
+
+    @classmethod
+    def from_dict(cls, info):
+        return cls(info['mean'], info['std'], {q: v for q, v in info['quantiles']})
+
+
+class FeatureColumn:
+    """
+    One feature column in its compact storage form.
+
+    Attributes:
+        kind: 'binary', 'count', 'area' or 'float'
+        data: Packed bits (binary), narrow integers (count), float32 (area) or float64 (float)
+        null_mask: Packed bits marking missing values for binary and count columns, None if complete.
+            Float kinds keep NaN in data instead.
+        length: Number of rows
+        data_min, data_max: Range of the present values (NaN if the column is empty)
+        has_nulls: Whether any value is missing
+    """
+
+    def __init__(self, kind, data, length, null_mask=None, data_min=np.nan, data_max=np.nan, has_nulls=False,
+                 stats=None):
+        self.kind = kind
+        self.data = data
+        self.length = length
+        self.null_mask = null_mask
+        self.data_min = data_min
+        self.data_max = data_max
+        self.has_nulls = has_nulls
+        self._stats = stats
+        self._null_count = None
+        self._imputed = {}  # method -> FeatureColumn with missing values filled
+
+    @classmethod
+    def encode(cls, name, values):
+        """
+        Encodes a float64 column (NaN for missing values) into its compact form.
+        Every ingest path encodes each column once while it is dense in memory, so its ColumnStats
+        are computed here too instead of by decoding the stored column later.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        nulls = np.isnan(values)
+        has_nulls = bool(nulls.any())
+        present = values[~nulls] if has_nulls else values
+        data_min = float(present.min()) if len(present) else np.nan
+        data_max = float(present.max()) if len(present) else np.nan
+
+        kind = storage_kind(name, present)
+        null_mask = _pack_bits(nulls) if has_nulls and kind in (KIND_BINARY, KIND_COUNT) else None
+        if kind == KIND_BINARY:
+            data = _pack_bits(values == 1.0)
+        elif kind == KIND_COUNT:
+            dtype = _integer_dtype(data_min, data_max) if len(present) else np.uint8
+            data = np.where(nulls, 0.0, values).astype(dtype)
+        elif kind == KIND_AREA:
+            data = values.astype(np.float32)
+            # Round-trip through float32 so the stored range matches what decoding returns
+            if len(present):
+                data_min, data_max = float(np.nanmin(data)), float(np.nanmax(data))
+        else:
+            data = values
+        # Statistics describe the stored values, so area columns use their float32 round trip
+        stored = data.astype(np.float64) if kind == KIND_AREA else values
+        stats = ColumnStats.from_values(np.where(nulls, 0.0, stored) if has_nulls else stored)
+        return cls(kind, data, len(values), null_mask, data_min, data_max, has_nulls, stats)
+
+    @property
+    def dtype(self):
+        return 'bit' if self.kind == KIND_BINARY else self.data.dtype.name
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.null_mask.nbytes if self.null_mask is not None else 0)
+
+    def nulls(self, rows=None):
+        """Boolean mask of missing values for the given rows (all rows if None)."""
+        if self.kind in (KIND_AREA, KIND_FLOAT):
+            return np.isnan(self.data if rows is None else self.data[rows])
+        if self.null_mask is None:
+            return np.zeros(_row_count(rows, self.length), dtype=bool)
+        return _read_bits(self.null_mask, rows, self.length).astype(bool)
+
+    def decode(self, rows=None, fill=np.nan):
+        """Returns the column (or the given rows) as float64, with missing values replaced by fill."""
+        if self.kind == KIND_BINARY:
+            values = _read_bits(self.data, rows, self.length).astype(np.float64)
+        else:
+            values = (self.data if rows is None else self.data[rows]).astype(np.float64)
+        if self.null_mask is not None:
+            values[self.nulls(rows)] = fill
+        elif self.has_nulls and not np.isnan(fill):
+            values[np.isnan(values)] = fill
+        return values
+
+    def normalization_range(self):
+        """(min, max) of the column once missing values are filled with 0, as used for scoring."""
+        if np.isnan(self.data_min):
+            return 0.0, 0.0
+        if self.has_nulls:
+            return min(self.data_min, 0.0), max(self.data_max, 0.0)
+        return self.data_min, self.data_max
+
+    def null_count(self):
+        if self._null_count is None:
+            self._null_count = int(self.nulls().sum()) if self.has_nulls else 0
+        return self._null_count
+
+    def imputed(self, name, method, coords=None):
+        """
+        Column with missing values filled by method, re-encoded and cached per method.
+        Complete columns, and 'zero' (which normalization applies already), return the column itself.
+
+        Args:
+            name: Column name, used to pick the storage kind of the filled column
+            method: 'zero', 'median', 'mean' or 'neighbor' (mean of the nearest villages with a value)
+            coords: (n, 2) lng/lat array, required for 'neighbor'
+        """
+        if method == IMPUTATION_ZERO or not self.has_nulls or np.isnan(self.data_min):
+            return self
+        column = self._imputed.get(method)
+        if column is None:
+            values = self.decode()
+            nulls = np.isnan(values)
+            if method == IMPUTATION_MEDIAN:
+                values[nulls] = np.median(values[~nulls])
+            elif method == IMPUTATION_MEAN:
+                values[nulls] = values[~nulls].mean()
+            else:
+                values[nulls] = _neighbor_fill(values, nulls, coords)
+            column = self._imputed[method] = FeatureColumn.encode(name, values)
+        return column
+
+    def stats(self):
+        """ColumnStats of the filled column, computed at encoding (or on first use for columns built otherwise)."""
+        if self._stats is None:
+            self._stats = ColumnStats.from_values(self.decode(fill=0.0))
+        return self._stats
+
+    def normalized(self, rows=None, method=NORMALIZATION_MINMAX):
+        """
+        Normalized column with missing values filled with 0.
+
+        Args:
+            rows: Row indices or a slice of rows to return (all rows if None); statistics always cover
+                the whole column
+            method: 'minmax' (the same arithmetic as sklearn's MinMaxScaler), 'robust' (ROBUST_QUANTILES
+                mapped to 0 and 1, clipped outside them), 'zscore' or 'rank' (average rank scaled to 0-1)
+        """
+        if method == NORMALIZATION_RANK:
+            if self.length < 2:
+                return np.zeros(_row_count(rows, self.length))
+            values = (rankdata(self.decode(fill=0.0)) - 1.0) / (self.length - 1)
+            return values if rows is None else values[rows]
+
+        offset, scale, clip = self.normalization_scale(method)
+        values = self.decode(rows, fill=0.0)
+        values *= scale
+        values += -offset * scale
+        if clip:
+            np.clip(values, 0.0, 1.0, out=values)
+        return values
+
+    def normalization_scale(self, method=NORMALIZATION_MINMAX):
+        """
+        (offset, scale, clip) of a linear normalization method: values map to (x - offset) * scale,
+        clipped to 0-1 when clip is True. Rank normalization has no fixed scale and raises ValueError.
+        """
+        if method == NORMALIZATION_RANK:
+            raise ValueError('Rank normalization has no fixed scale')
+        clip = False
+        if method == NORMALIZATION_ZSCORE:
+            stats = self.stats()
+            offset, data_range = stats.mean, stats.std
+        elif method == NORMALIZATION_ROBUST:
+            quantiles = self.stats().quantiles
+            offset, data_range = quantiles[ROBUST_QUANTILES[0]], quantiles[ROBUST_QUANTILES[1]] - quantiles[ROBUST_QUANTILES[0]]
+            clip = data_range >= _MIN_SCALE
+            if not clip:
+                # Mostly constant columns (e.g. rare facility flags) keep their min-max scale
+                return self.normalization_scale()
+        else:
+            offset, data_max = self.normalization_range()
+            data_range = data_max - offset
+        if data_range < _MIN_SCALE:
+            data_range = 1.0
+        return offset, 1.0 / data_range, clip
+
+    def compare(self, op, value, rows=None):
+        """Evaluates a comparison on the stored form; missing values never match."""
+        compare = COMPARISON_OPERATORS[op]
+        if self.kind == KIND_BINARY:
+            result = compare(_read_bits(self.data, rows, self.length), value)
+        else:
+            # Integer and float32 columns compare in their own dtype
+            result = compare(self.data if rows is None else self.data[rows], value)
+        if self.has_nulls:
+            result &= ~self.nulls(rows)
+        return result
+
+    def metadata(self):
+        return {
+            'kind': self.kind,
+            'data_min': self.data_min,
+            'data_max': self.data_max,
+            'has_nulls': self.has_nulls,
+            'has_null_mask': self.null_mask is not None,
+            'stats': self._stats.to_dict() if self._stats is not None else None
+        }
+
+
+class OverlayColumn(FeatureColumn):
+    """
+    Scenario view of another column: its values multiplied by per-row factors, without copying it.
+    Only the affected row indices (None for every row) and their factors are stored; the base
+    column's storage and null mask are shared.
+
+    Attributes:
+        base: The FeatureColumn being overlaid
+        rows: Sorted affected row indices, or None when every row is affected
+        factors: Multiplier per affected row (a broadcast view when all factors are equal)
+    """
+
+    def __init__(self, base, rows, factors):
+        super().__init__(base.kind, base.data, base.length, base.null_mask, has_nulls=base.has_nulls)
+        self.base = base
+        self.rows = rows
+        self.factors = factors
+        # The overlaid range needs one pass over the values; they are not kept
+        values = self.decode()
+        present = values[~np.isnan(values)] if self.has_nulls else values
+        if len(present):
+            self.data_min, self.data_max = float(present.min()), float(present.max())
+
+    @property
+    def nbytes(self):
+        return (self.rows.nbytes if self.rows is not None else 0) + (self.factors.nbytes if self.factors.strides != (0,) else 8)
+
+    def decode_overlay(self, values, rows=None):
+        """Multiplies base values decoded for rows (None, a slice or an index array) by their factors in place."""
+        if self.rows is None:
+            values *= self.factors if rows is None else self.factors[rows]
+        elif rows is None:
+            values[self.rows] *= self.factors
+        elif isinstance(rows, slice):
+            start, stop, _ = rows.indices(self.length)
+            lo, hi = np.searchsorted(self.rows, (start, stop))
+            values[self.rows[lo:hi] - start] *= self.factors[lo:hi]
+        elif len(self.rows):
+            rows = np.asarray(rows, dtype=np.int64)
+            position = np.minimum(np.searchsorted(self.rows, rows), len(self.rows) - 1)
+            hit = self.rows[position] == rows
+            values[hit] *= self.factors[position[hit]]
+        return values
+
+    def decode(self, rows=None, fill=np.nan):
+        values = self.decode_overlay(self.base.decode(rows), rows)
+        if self.has_nulls and not np.isnan(fill):
+            values[np.isnan(values)] = fill
+        return values
+
+    def compare(self, op, value, rows=None):
+        result = COMPARISON_OPERATORS[op](self.decode(rows), value)
+        if self.has_nulls:
+            result &= ~self.nulls(rows)
+        return result
+
+
+class CategoryColumn:
+    """
+    String column stored as integer codes into its distinct values, for filtering only.
+
+    Attributes:
+        codes: Narrowest signed integer codes, -1 for missing values
+        categories: Distinct values, indexed by code
+    """
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = list(categories)
+        self._lookup = None
+
+    @classmethod
+    def encode(cls, values):
+        """Encodes a sequence of strings (None for missing values); returns None if it has too many distinct values."""
+        codes, categories = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        if len(categories) > MAX_CATEGORY_VALUES:
+            return None
+        return cls.from_codes(codes, [str(c) for c in categories])
+
+    @classmethod
+    def from_codes(cls, codes, categories):
+        """Builds a column from integer codes (-1 for missing), narrowed to the smallest type that holds them."""
+        return cls(np.asarray(codes).astype(_integer_dtype(-1, len(categories))), categories)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    def _codes_for(self, values):
+        if self._lookup is None:
+            lookup = {}
+            for code, category in enumerate(self.categories):
+                lookup.setdefault(category.casefold(), []).append(code)
+            self._lookup = lookup
+        return [code for value in values for code in self._lookup.get(str(value).casefold(), [])]
+
+    def compare(self, op, value):
+        """Evaluates '==' / '!=' against one value or 'in' / 'not in' against a list; missing values never match."""
+        if op not in CATEGORY_OPERATORS:
+            raise ValueError(f"Operator {op} is not supported on text columns. Expected one of {list(CATEGORY_OPERATORS)}")
+        values = value if op in ('in', 'not in') and isinstance(value, (list, tuple)) else [value]
+        result = np.isin(self.codes, self._codes_for(values))
+        if op in ('!=', 'not in'):
+            result = ~result & (self.codes >= 0)
+        return result
+
+
+class NormalizedCacheBudget:
+    """
+    Process-wide least-recently-used accounting of the normalized matrices cached by every FeatureTable,
+    so NORMALIZED_CACHE_MAX_BYTES bounds their total however many datasets are cached.
+    Memory-mapped matrices live in the OS page cache and count as 0 bytes.
+    The most recently cached matrix is always kept, even if it alone exceeds the budget.
+    """
+
+    def __init__(self, max_bytes=NORMALIZED_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (id(table), key) -> (weak reference to the table, bytes)
+        self._tracked = set()  # ids of tables whose collection releases their entries
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def add(self, table, key, matrix):
+        """Accounts for a matrix table has just cached, and evicts the least recently used matrices over budget."""
+        nbytes = 0 if isinstance(matrix, np.memmap) else matrix.nbytes
+        victims = []
+        with self._lock:
+            if id(table) not in self._tracked:
+                self._tracked.add(id(table))
+                weakref.finalize(table, self._forget, id(table))
+            previous = self._entries.pop((id(table), key), None)
+            self._bytes += nbytes - (previous[1] if previous else 0)
+            self._entries[(id(table), key)] = (weakref.ref(table), nbytes)
+            while len(self._entries) > 1 and self._bytes > self.max_bytes:
+                (_, victim_key), (ref, victim_bytes) = self._entries.popitem(last=False)
+                self._bytes -= victim_bytes
+                victims.append((ref, victim_key))
+        # Victims are dropped outside the budget lock, since tables call in here while holding their own
+        for ref, victim_key in victims:
+            victim = ref()
+            if victim is not None:
+                victim._drop_normalized(victim_key)
+
+    def touch(self, table, key):
+        with self._lock:
+            if (id(table), key) in self._entries:
+                self._entries.move_to_end((id(table), key))
+
+    def discard(self, table, key):
+        with self._lock:
+            entry = self._entries.pop((id(table), key), None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def _forget(self, table_id):
+        with self._lock:
+            self._tracked.discard(table_id)
+            for entry_key in [k for k in self._entries if k[0] == table_id]:
+                self._bytes -= self._entries.pop(entry_key)[1]
+
+
+normalized_cache_budget = NormalizedCacheBudget()
+
+
+class FeatureTable:
+    """
+    Named collection of FeatureColumns sharing one row count.
+    Tables are immutable; with_overlay returns a new table where one column is an OverlayColumn
+    over the original and every other column is shared. Because of that, normalized matrices can
+    be cached on the table itself: a scenario that changes a column gets a new table and therefore
+    a fresh cache.
+    Category columns are held alongside, by name, and only take part in filtering.
+    When directory is set (the table was saved to or loaded from a dataset cache directory),
+    full-table normalized matrices are also written there and memory-mapped.
+    """
+
+    def __init__(self, names, columns, length, categories=None):
+        self.names = list(names)
+        self.columns = list(columns)
+        self.length = length
+        self.categories = dict(categories or {})
+        self._index = {name: j for j, name in enumerate(self.names)}
+        self._normalized_cache = OrderedDict()  # (method, tuple(names), directions) -> read-only (n, k) matrix
+        self._imputed_tables = {}  # imputation method -> FeatureTable
+        self._cache_lock = threading.Lock()
+        self.directory = None  # Dataset cache directory that normalized matrices are persisted to
+        self._normalized_prefix = 'normalized'
+
+    @classmethod
+    def from_arrays(cls, names, arrays, length):
+        """Encodes float64 columns (NaN for missing values) one at a time."""
+        return cls(names, [FeatureColumn.encode(name, values) for name, values in zip(names, arrays)], length)
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def column(self, name):
+        """Returns the FeatureColumn for a name, or None if the dataset has no such numeric column."""
+        j = self._index.get(name)
+        return self.columns[j] if j is not None else None
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns) + sum(c.nbytes for c in self.categories.values())
+
+    def dtypes(self):
+        """Storage dtype per column, for reporting."""
+        return {name: column.dtype for name, column in zip(self.names, self.columns)}
+
+    def null_counts(self, names=None):
+        """Number of missing values per column (all numeric columns if names is None); absent columns count every row."""
+        names = self.names if names is None else names
+        return {name: self.column(name).null_count() if name in self else self.length for name in names}
+
+    def imputed(self, method, coords=None, names=None):
+        """
+        Table whose columns have their missing values filled by method (see FeatureColumn.imputed).
+        One table is cached per method, so it keeps its own normalized matrix cache; its columns
+        are filled the first time a selection (names, all columns if None) includes them.
+
+        Raises:
+            ValueError: for an unknown method
+        """
+        if method not in IMPUTATION_METHODS:
+            raise ValueError(f"Unknown imputation: {method}. Expected one of {list(IMPUTATION_METHODS)}")
+        if method == IMPUTATION_ZERO:
+            return self
+        names = self.names if names is None else names
+        with self._cache_lock:
+            table = self._imputed_tables.get(method)
+            if table is None:
+                table = self._imputed_tables[method] = FeatureTable(self.names, self.columns, self.length, self.categories)
+                table.directory = self.directory
+                table._normalized_prefix = f'normalized_{method}'
+            # A column is replaced before any normalized matrix that includes it is built, so cached matrices stay valid
+            for name in names:
+                j = self._index.get(name)
+                if j is not None and table.columns[j] is self.columns[j]:
+                    table.columns[j] = self.columns[j].imputed(name, method, coords)
+        return table
+
+    def decode(self, names, rows=None, fill=0.0):
+        """Dense (rows, len(names)) float64 matrix of the selected columns; absent columns are filled."""
+        n = _row_count(rows, self.length)
+        matrix = np.full((n, len(names)), fill, dtype=np.float64)
+        for k, name in enumerate(names):
+            column = self.column(name)
+            if column is not None:
+                matrix[:, k] = column.decode(rows, fill=fill)
+        return matrix
+
+    def _build_normalized(self, names, rows=None, method=NORMALIZATION_MINMAX, directions=None):
+        n = _row_count(rows, self.length)
+        matrix = np.zeros((n, len(names)), dtype=np.float64)
+        for k, name in enumerate(names):
+            column = self.column(name)
+            if column is not None:
+                matrix[:, k] = column.normalized(rows, method)
+            if directions is not None and not directions[k]:
+                # Lower is better: flip within 0-1, or around the mean for z-scores
+                if method == NORMALIZATION_ZSCORE:
+                    np.negative(matrix[:, k], out=matrix[:, k])
+                else:
+                    matrix[:, k] = 1.0 - matrix[:, k]
+        return matrix
+
+    def normalized(self, names, rows=None, method=NORMALIZATION_MINMAX, directions=None):
+        """
+        Dense normalized (rows, len(names)) matrix; absent columns are all 0.
+        Full-table matrices are cached per normalization method, feature selection and directions
+        and returned read-only. Their memory counts towards the process-wide normalized_cache_budget.
+
+        Args:
+            directions: Per-feature booleans, False where lower values are better and the column is
+                inverted; None keeps every column as is
+        """
+        if method not in NORMALIZATION_METHODS:
+            raise ValueError(f"Unknown normalization: {method}. Expected one of {list(NORMALIZATION_METHODS)}")
+        if directions is not None:
+            directions = tuple(bool(d) for d in directions)
+            if all(directions):
+                directions = None
+        if rows is not None:
+            return self._build_normalized(names, rows, method, directions)
+
+        key = (method, tuple(names), directions)
+        with self._cache_lock:
+            matrix = self._normalized_cache.get(key)
+            if matrix is not None:
+                self._normalized_cache.move_to_end(key)
+        if matrix is not None:
+            normalized_cache_budget.touch(self, key)
+            return matrix
+
+        matrix = self._persisted_normalized(key)
+        if matrix is None:
+            matrix = self._build_normalized(names, method=method, directions=directions)
+            matrix.flags.writeable = False
+            if self.directory is not None:
+                matrix = self._persist_normalized(key, matrix)
+        evicted = []
+        with self._cache_lock:
+            self._normalized_cache[key] = matrix
+            self._normalized_cache.move_to_end(key)
+            while len(self._normalized_cache) > max(MAX_CACHED_SELECTIONS, 1):
+                evicted.append(self._normalized_cache.popitem(last=False)[0])
+        for evicted_key in evicted:
+            normalized_cache_budget.discard(self, evicted_key)
+        normalized_cache_budget.add(self, key, matrix)
+        return matrix
+
+    def _drop_normalized(self, key):
+        """Evicts one cached normalized matrix; called by normalized_cache_budget."""
+        with self._cache_lock:
+            self._normalized_cache.pop(key, None)
+
+    def _normalized_path(self, key):
+        digest = hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f'{self._normalized_prefix}_{digest}.npy')
+
+    def _persisted_normalized(self, key):
+        """Memory-maps the normalized matrix for key written by this or another worker, or returns None."""
+        if self.directory is None:
+            return None
+        try:
+            return np.load(self._normalized_path(key), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+    def _persist_normalized(self, key, matrix):
+        """Writes matrix next to the feature columns and returns it memory-mapped; keeps it in memory on failure."""
+        path = self._normalized_path(key)
+        try:
+            fd, staging = tempfile.mkstemp(dir=self.directory, prefix='.normalized-', suffix='.npy')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, matrix)
+                os.replace(staging, path)
+            except BaseException:
+                os.unlink(staging)
+                raise
+            self._trim_persisted_normalized()
+            return np.load(path, mmap_mode='r')
+        except OSError as e:
+            logger.warning(f"Could not persist normalized matrix to {self.directory}: {e}")
+            return matrix
+
+    def _trim_persisted_normalized(self):
+        entries = [e for e in os.scandir(self.directory) if e.name.startswith('normalized') and e.name.endswith('.npy')]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        # Workers that already mapped a deleted file keep reading it until they drop the mapping
+        for entry in entries[:max(len(entries) - MAX_PERSISTED_SELECTIONS, 0)]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def weighted_sum(self, names, weights, rows=None, method=NORMALIZATION_MINMAX, directions=None):
+        """Weighted sum of the normalized columns: one matrix-vector product on the cached normalized matrix."""
+        return self.normalized(names, rows, method, directions) @ np.asarray(weights, dtype=np.float64)
+
+    def filter_mask(self, conditions):
+        """
+        Rows matching every (name, op, value) condition, evaluated on the packed columns or category codes.
+        Conditions on absent columns match nothing.
+
+        Raises:
+            ValueError: if an operator does not apply to the column
+        """
+        mask = np.ones(self.length, dtype=bool)
+        for name, op, value in conditions:
+            column = self.column(name)
+            if column is None:
+                column = self.categories.get(name)
+            elif op not in COMPARISON_OPERATORS:
+                raise ValueError(f"Operator {op} is not supported on numeric columns. Expected one of {list(COMPARISON_OPERATORS)}")
+            if column is None:
+                return np.zeros(self.length, dtype=bool)
+            mask &= column.compare(op, value)
+        return mask
+
+    def with_overlay(self, name, rows, factors):
+        """
+        Returns a new table where one column is multiplied by factors on the given rows (None for all),
+        as an OverlayColumn over the current column; nothing is copied.
+        """
+        j = self._index[name]
+        rows = None if rows is None else np.asarray(rows, dtype=np.int64)
+        factors = np.broadcast_to(np.asarray(factors, dtype=np.float64), (self.length if rows is None else len(rows),))
+        if rows is not None:
+            order = np.argsort(rows, kind='stable')
+            rows = rows[order]
+            if factors.strides != (0,):
+                factors = factors[order]
+        columns = list(self.columns)
+        columns[j] = OverlayColumn(self.columns[j], rows, factors)
+        return FeatureTable(self.names, columns, self.length, self.categories)
+
+    def save(self, directory):
+        """Writes each column as .npy files plus a features.json describing their kinds and ranges."""
+        for j, column in enumerate(self.columns):
+            np.save(os.path.join(directory, f'feature_{j}.npy'), np.ascontiguousarray(column.data))
+            if column.null_mask is not None:
+                np.save(os.path.join(directory, f'feature_{j}_nulls.npy'), column.null_mask)
+        for j, category in enumerate(self.categories.values()):
+            np.save(os.path.join(directory, f'category_{j}.npy'), np.ascontiguousarray(category.codes))
+        with open(os.path.join(directory, 'features.json'), 'w') as f:
+            json.dump({
+                'length': self.length,
+                'names': self.names,
+                'columns': [column.metadata() for column in self.columns],
+                'categories': [{'name': name, 'values': c.categories} for name, c in self.categories.items()]
+            }, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Opens a table written by save, memory-mapping the column files."""
+        with open(os.path.join(directory, 'features.json')) as f:
+            meta = json.load(f)
+        columns = []
+        for j, info in enumerate(meta['columns']):
+            data = np.load(os.path.join(directory, f'feature_{j}.npy'), mmap_mode=mmap_mode)
+            null_mask = None
+            if info['has_null_mask']:
+                null_mask = np.load(os.path.join(directory, f'feature_{j}_nulls.npy'), mmap_mode=mmap_mode)
+            stats = ColumnStats.from_dict(info['stats']) if info.get('stats') else None
+            columns.append(FeatureColumn(info['kind'], data, meta['length'], null_mask,
+                                         info['data_min'], info['data_max'], info['has_nulls'], stats))
+        categories = {
+            info['name']: CategoryColumn(np.load(os.path.join(directory, f'category_{j}.npy'), mmap_mode=mmap_mode), info['values'])
+            for j, info in enumerate(meta.get('categories', []))
+        }
+        table = cls(meta['names'], columns, meta['length'], categories)
+        table.directory = directory
+        return table
@@ -0,0 +1,415 @@
+"""
+Batch geometry kernels for village boundaries.
+Rings from every Point, Polygon and MultiPolygon are flattened into offset-indexed vertex
+arrays so that centroids, areas and bounding boxes are computed for all polygons at once.
+"""
+
+import os
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import chain
+
+import numpy as np
+import pyarrow as pa
+
+# WKB geometry type codes handled by the kernel
+WKB_POINT = 1
+WKB_POLYGON = 3
+WKB_MULTIPOLYGON = 6
+
+# Relative area (against the squared bounding-box extent) below which rings count as degenerate
+DEGENERATE_AREA_TOLERANCE = 1e-9
+
+# Byte length of a 2D WKB point record (byte order + type + two doubles)
+WKB_POINT_LENGTH = 21
+
+# Maximum number of per-polygon summaries kept by a GeometryCache before evicting the oldest
+GEOMETRY_CACHE_MAX_ENTRIES = int(os.getenv('GEOMETRY_CACHE_MAX_ENTRIES', 200000))
+
+# Packed layout of one cached summary: centroid x/y, area, bbox
+_SUMMARY_FIELDS = 7
+
+
+class GeometrySummary:
+    """
+    Per-polygon geometry summary produced by the batch kernel.
+
+    Attributes:
+        centroids: (n, 2) lng/lat centroids, NaN where the geometry is unusable
+        areas: Planar area in squared degrees (holes subtracted), 0 for points
+        bboxes: (n, 4) min_lng, min_lat, max_lng, max_lat, NaN where the geometry is unusable
+    """
+
+    def __init__(self, centroids, areas, bboxes):
+        self.centroids = centroids
+        self.areas = areas
+        self.bboxes = bboxes
+
+    def __len__(self):
+        return len(self.centroids)
+
+    def packed(self):
+        """Returns the summary as an (n, 7) float64 matrix: centroid x/y, area, bbox."""
+        return np.column_stack([self.centroids, self.areas, self.bboxes])
+
+    @classmethod
+    def from_packed(cls, packed):
+        return cls(packed[:, 0:2].copy(), packed[:, 2].copy(), packed[:, 3:7].copy())
+
+
+class RingAccumulator:
+    """
+    Collects geometry rings into flat typed arrays, one geometry at a time.
+
+    Vertices go into a single x/y array; each ring records its vertex count, the row of the
+    geometry it belongs to and whether it is a hole. Points are kept separately.
+    """
+
+    def __init__(self):
+        self._xy = array('d')
+        self._ring_sizes = array('q')
+        self._ring_rows = array('q')
+        self._ring_holes = array('b')
+        self._point_rows = array('q')
+        self._point_xy = array('d')
+
+    def add(self, row, geometry):
+        """Adds a GeoJSON geometry for the given row; unusable or non-2D geometries are skipped."""
+        geom = geometry or {}
+        geom_type = geom.get('type')
+        marks = self._marks()
+        try:
+            if geom_type == 'Point':
+                self._add_point(row, geom['coordinates'])
+            elif geom_type == 'Polygon':
+                self._add_polygon(row, geom['coordinates'])
+            elif geom_type == 'MultiPolygon':
+                for polygon in geom['coordinates']:
+                    self._add_polygon(row, polygon)
+        except (TypeError, ValueError, KeyError, IndexError):
+            self._rollback(marks)
+
+    def add_ring(self, row, xy, hole=False):
+        """Adds one ring given as a flat float64 x/y array (used by the WKB decoder)."""
+        if len(xy) < 2:
+            return
+        self._xy.frombytes(np.ascontiguousarray(xy, dtype=np.float64).tobytes())
+        self._ring_sizes.append(len(xy) // 2)
+        self._ring_rows.append(row)
+        self._ring_holes.append(hole)
+
+    def add_point(self, row, x, y):
+        """Adds a point geometry; NaN coordinates leave the row unusable."""
+        if x == x and y == y:
+            self._point_rows.append(row)
+            self._point_xy.extend((x, y))
+
+    def _add_point(self, row, coordinates):
+        if len(coordinates) == 2:
+            self.add_point(row, float(coordinates[0]), float(coordinates[1]))
+
+    def _add_polygon(self, row, rings):
+        # A polygon without an exterior ring is unusable, its holes are ignored too
+        if not rings or not rings[0]:
+            return
+        for k, ring in enumerate(rings):
+            if not ring:
+                continue
+            start = len(self._xy)
+            self._xy.extend(chain.from_iterable(ring))
+            if len(self._xy) - start != 2 * len(ring):
+                # Only 2D rings are supported; 3D coordinates make the whole geometry unusable
+                raise ValueError('Ring coordinates must be 2D')
+            self._ring_sizes.append(len(ring))
+            self._ring_rows.append(row)
+            self._ring_holes.append(k > 0)
+
+    def _marks(self):
+        return len(self._xy), len(self._ring_sizes), len(self._point_rows)
+
+    def _rollback(self, marks):
+        del self._xy[marks[0]:]
+        del self._ring_sizes[marks[1]:]
+        del self._ring_rows[marks[1]:]
+        del self._ring_holes[marks[1]:]
+        del self._point_rows[marks[2]:]
+        del self._point_xy[2 * marks[2]:]
+
+    def summarize(self, n):
+        """Runs the batch kernel over everything added so far for a dataset of n rows."""
+        return summarize_rings(
+            _as_numpy(self._xy, np.float64).reshape(-1, 2),
+            _as_numpy(self._ring_sizes, np.int64),
+            _as_numpy(self._ring_rows, np.int64),
+            _as_numpy(self._ring_holes, np.int8).astype(bool),
+            _as_numpy(self._point_rows, np.int64),
+            _as_numpy(self._point_xy, np.float64).reshape(-1, 2),
+            n
+        )
+
+
+def _as_numpy(values, dtype):
+    return np.frombuffer(values, dtype=dtype).copy() if len(values) else np.empty(0, dtype=dtype)
+
+
+def summarize_rings(xy, ring_sizes, ring_rows, ring_holes, point_rows, point_xy, n):
+    """
+    Computes area-weighted centroids, areas and bounding boxes for n geometries at once.
+
+    Each ring's signed area and first moments come from the shoelace formula, evaluated relative
+    to the ring's first vertex to avoid cancellation at lng/lat magnitudes. Exterior rings add
+    their absolute area and holes subtract it, so ring orientation does not matter. Geometries
+    whose area is zero (degenerate or collinear rings) fall back to the mean of their vertices.
+
+    Args:
+        xy: (v, 2) vertices of all rings, ring after ring
+        ring_sizes: Number of vertices in each ring
+        ring_rows: Geometry row of each ring
+        ring_holes: True for interior rings
+        point_rows: Rows whose geometry is a single point
+        point_xy: (p, 2) coordinates of those points
+        n: Number of geometries
+    """
+    centroids = np.full((n, 2), np.nan, dtype=np.float64)
+    bboxes = np.full((n, 4), np.nan, dtype=np.float64)
+    areas = np.zeros(n, dtype=np.float64)
+
+    if len(ring_sizes):
+        n_rings = len(ring_sizes)
+        ring_starts = np.zeros(n_rings, dtype=np.int64)
+        np.cumsum(ring_sizes[:-1], out=ring_starts[1:])
+        vertex_ring = np.repeat(np.arange(n_rings), ring_sizes)
+
+        # Shift every ring to its first vertex, then pair each vertex with the next one (wrapping)
+        local = xy - xy[ring_starts][vertex_ring]
+        following = np.arange(1, len(xy) + 1)
+        following[ring_starts + ring_sizes - 1] = ring_starts
+        x, y = local[:, 0], local[:, 1]
+        xn, yn = x[following], y[following]
+        cross = x * yn - xn * y
+
+        ring_area = 0.5 * np.bincount(vertex_ring, cross, minlength=n_rings)
+        ring_mx = np.bincount(vertex_ring, (x + xn) * cross, minlength=n_rings) / 6.0
+        ring_my = np.bincount(vertex_ring, (y + yn) * cross, minlength=n_rings) / 6.0
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ring_cx = np.where(ring_area != 0, ring_mx / ring_area, 0.0) + xy[ring_starts, 0]
+            ring_cy = np.where(ring_area != 0, ring_my / ring_area, 0.0) + xy[ring_starts, 1]
+        weight = np.where(ring_holes, -1.0, 1.0) * np.abs(ring_area)
+
+        poly_area = np.bincount(ring_rows, weight, minlength=n)
+        poly_mx = np.bincount(ring_rows, weight * ring_cx, minlength=n)
+        poly_my = np.bincount(ring_rows, weight * ring_cy, minlength=n)
+
+        # Vertex mean of the exterior rings, used when the area-weighted centroid is undefined
+        vertex_row = ring_rows[vertex_ring]
+        exterior = ~ring_holes[vertex_ring]
+        counts = np.bincount(vertex_row[exterior], minlength=n)
+        mean_x = np.bincount(vertex_row[exterior], xy[exterior, 0], minlength=n)
+        mean_y = np.bincount(vertex_row[exterior], xy[exterior, 1], minlength=n)
+
+        rows = np.unique(ring_rows)
+        bboxes[rows, :2] = np.inf
+        bboxes[rows, 2:] = -np.inf
+        np.minimum.at(bboxes[:, 0], vertex_row, xy[:, 0])
+        np.minimum.at(bboxes[:, 1], vertex_row, xy[:, 1])
+        np.maximum.at(bboxes[:, 2], vertex_row, xy[:, 0])
+        np.maximum.at(bboxes[:, 3], vertex_row, xy[:, 1])
+
+        # Areas below rounding noise relative to the extent mean the rings are degenerate
+        extent = np.maximum(bboxes[rows, 2] - bboxes[rows, 0], bboxes[rows, 3] - bboxes[rows, 1])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            has_area = poly_area[rows] > DEGENERATE_AREA_TOLERANCE * extent ** 2
+            centroids[rows, 0] = np.where(has_area, poly_mx[rows] / poly_area[rows], mean_x[rows] / counts[rows])
+            centroids[rows, 1] = np.where(has_area, poly_my[rows] / poly_area[rows], mean_y[rows] / counts[rows])
+        areas[rows] = np.where(has_area, poly_area[rows], 0.0)
+
+    if len(point_rows):
+        centroids[point_rows] = point_xy
+        bboxes[point_rows] = np.hstack([point_xy, point_xy])
+        areas[point_rows] = 0.0
+
+    # Rows with NaN vertices are unusable, like rows without geometry
+    unusable = np.isnan(centroids).any(axis=1)
+    bboxes[unusable] = np.nan
+    areas[unusable] = 0.0
+    centroids[unusable] = np.nan
+    return GeometrySummary(centroids, areas, bboxes)
+
+
+def summarize_geojson(geometries):
+    """Summarizes a sequence of GeoJSON geometry dicts (None for missing geometry)."""
+    accumulator = RingAccumulator()
+    n = 0
+    for row, geometry in enumerate(geometries):
+        accumulator.add(row, geometry)
+        n = row + 1
+    return accumulator.summarize(n)
+
+
+def _add_wkb_geometry(accumulator, row, buf, offset):
+    """Decodes one WKB Point, Polygon or MultiPolygon at offset into the accumulator."""
+    byte_order = '<' if buf[offset] == 1 else '>'
+    geom_type = struct.unpack_from(byte_order + 'I', buf, offset + 1)[0]
+    offset += 5
+    if geom_type & 0x20000000:  # EWKB with embedded SRID
+        offset += 4
+    geom_type &= 0x0FFFFFFF
+
+    if geom_type == WKB_POINT:
+        x, y = struct.unpack_from(byte_order + 'dd', buf, offset)
+        accumulator.add_point(row, x, y)
+    elif geom_type == WKB_POLYGON:
+        n_rings = struct.unpack_from(byte_order + 'I', buf, offset)[0]
+        offset += 4
+        has_exterior = True
+        for k in range(n_rings):
+            n_points = struct.unpack_from(byte_order + 'I', buf, offset)[0]
+            # A polygon without an exterior ring is unusable, its holes are ignored too
+            has_exterior = has_exterior and (k > 0 or n_points > 0)
+            if has_exterior:
+                ring = np.frombuffer(buf, dtype=byte_order + 'f8', count=2 * n_points, offset=offset + 4)
+                accumulator.add_ring(row, ring, hole=k > 0)
+            offset += 4 + 16 * n_points
+    elif geom_type == WKB_MULTIPOLYGON:
+        n_parts = struct.unpack_from(byte_order + 'I', buf, offset)[0]
+        offset += 4
+        for _ in range(n_parts):
+            offset = _add_wkb_geometry(accumulator, row, buf, offset)
+            if offset is None:
+                return None
+    else:
+        return None
+    return offset
+
+
+def summarize_wkb(column):
+    """Summarizes a WKB geometry column (binary Arrow array); unsupported geometries are unusable."""
+    column = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    column = column.cast(pa.large_binary())
+    n = len(column)
+    accumulator = RingAccumulator()
+    if n == 0:
+        return accumulator.summarize(0)
+
+    _, offsets_buf, data_buf = column.buffers()
+    offsets = np.frombuffer(offsets_buf, dtype=np.int64, count=n + 1, offset=column.offset * 8)
+    data = data_buf.to_pybytes() if data_buf is not None else b''
+    lengths = np.diff(offsets)
+    valid = column.is_valid().to_numpy(zero_copy_only=False) & (lengths > 0)
+
+    # Fast path: 2D points are fixed 21-byte records that can be decoded without a Python loop
+    point_rows = np.flatnonzero(valid & (lengths == WKB_POINT_LENGTH))
+    points = np.empty((0, 2), dtype=np.float64)
+    if len(point_rows):
+        raw = np.frombuffer(data, dtype=np.uint8)
+        records = raw[offsets[point_rows, None] + np.arange(WKB_POINT_LENGTH)]
+        little = records[:, 0] == 1
+        geom_type = np.where(little, records[:, 1:5].view('<u4')[:, 0], records[:, 1:5].view('>u4')[:, 0])
+        xy = np.where(little[:, None], records[:, 5:21].copy().view('<f8'), records[:, 5:21].copy().view('>f8'))
+        is_point = (geom_type == WKB_POINT) & ~np.isnan(xy).any(axis=1)
+        valid[point_rows[geom_type == WKB_POINT]] = False
+        point_rows, points = point_rows[is_point], xy[is_point]
+
+    for i in np.flatnonzero(valid):
+        marks = accumulator._marks()
+        try:
+            _add_wkb_geometry(accumulator, int(i), data, int(offsets[i]))
+        except struct.error:
+            accumulator._rollback(marks)
+
+    summary = accumulator.summarize(n)
+    if len(point_rows):
+        summary.centroids[point_rows] = points
+        summary.bboxes[point_rows] = np.hstack([points, points])
+    return summary
+
+
+def geometry_fingerprint(geometry):
+    """
+    Cheap identity check for a GeoJSON geometry, read without walking its vertices.
+
+    Combines the geometry type, the number of parts or rings, the vertex count of the first
+    ring and its first vertex, so a boundary re-drawn under an unchanged polygon id is recomputed.
+    """
+    geom = geometry or {}
+    geom_type = geom.get('type')
+    coordinates = geom.get('coordinates')
+    if geom_type == 'Point':
+        return geom_type, coordinates[0], coordinates[1]
+    if geom_type == 'Polygon':
+        ring = coordinates[0]
+    elif geom_type == 'MultiPolygon':
+        ring = coordinates[0][0]
+    else:
+        return geom_type
+    return geom_type, len(coordinates), len(ring), ring[0][0], ring[0][1]
+
+
+class GeometryCache:
+    """
+    Bounded LRU cache of per-polygon geometry summaries keyed by polygon id and geometry fingerprint.
+
+    Summaries are stored packed as 56-byte records, so the cache holds at most
+    max_entries * ~150 bytes; the least recently used polygons are evicted first.
+    """
+
+    def __init__(self, max_entries=GEOMETRY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def summarize(self, features):
+        """Summarizes GeoJSON features, computing geometry only for polygons not already cached."""
+        n = len(features)
+        keys = [None] * n
+        records = [None] * n
+        with self._lock:
+            entries = self._entries
+            for i, f in enumerate(features):
+                try:
+                    key = (f['id'], geometry_fingerprint(f.get('geometry')))
+                    record = entries.get(key)
+                except (KeyError, TypeError, IndexError, AttributeError):
+                    # Missing or unhashable ids and malformed coordinates are summarized without caching
+                    continue
+                keys[i] = key
+                if record is not None:
+                    entries.move_to_end(key)
+                    records[i] = record
+
+        missing = [i for i, record in enumerate(records) if record is None]
+        if len(missing) == n:
+            packed = summarize_geojson(f.get('geometry') for f in features).packed()
+        else:
+            packed = np.empty((n, _SUMMARY_FIELDS), dtype=np.float64)
+            hit_rows = [i for i, record in enumerate(records) if record is not None]
+            packed[hit_rows] = np.frombuffer(b''.join(records[i] for i in hit_rows), dtype=np.float64).reshape(-1, _SUMMARY_FIELDS)
+            if missing:
+                packed[missing] = summarize_geojson(features[i].get('geometry') for i in missing).packed()
+
+        if missing:
+            blob = packed[missing].tobytes()
+            size = _SUMMARY_FIELDS * 8
+            with self._lock:
+                entries = self._entries
+                for k, i in enumerate(missing):
+                    if keys[i] is not None:
+                        entries[keys[i]] = blob[k * size:(k + 1) * size]
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        self.hits += n - len(missing)
+        self.misses += len(missing)
+        return GeometrySummary.from_packed(packed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,145 @@
+"""
+Ranked, paged retrieval of scored villages.
+Pages near the top are answered with np.argpartition over the (filtered) scores; the full
+sorted order of a score vector is built lazily, once, when a request pages past that window.
+Indexes are cached per dataset and scoring parameters, so paging and re-filtering skip scoring.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from feature_store import CATEGORY_OPERATORS, COMPARISON_OPERATORS
+from scoring import top_k_rows
+
+# Ranking indexes kept before the least recently used one is evicted
+MAX_RANKING_INDEXES = int(os.getenv('MAX_RANKING_INDEXES', 16))
+
+# Pages ending within this many ranks use argpartition instead of building the full sorted order
+PARTITION_MAX_RANK = 10000
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+
+class RankingIndex:
+    """
+    Rank index over one score vector. Ties are broken by row order, the same as top_k_rows.
+
+    Attributes:
+        scores: float64 suitability score vector being ranked
+    """
+
+    def __init__(self, scores):
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self._order = None
+        self._lock = threading.Lock()
+
+    def order(self):
+        """Every row by descending score, built on first use and kept."""
+        with self._lock:
+            if self._order is None:
+                self._order = np.argsort(-self.scores, kind='stable')
+            return self._order
+
+    def page(self, offset, limit, mask=None):
+        """
+        Returns the rows ranked offset to offset + limit among those matching mask.
+
+        Returns:
+            Tuple of (row indices best first, number of matching rows)
+        """
+        candidates = None if mask is None else np.flatnonzero(mask)
+        total = len(self.scores) if candidates is None else len(candidates)
+        end = min(offset + limit, total)
+        if offset >= end:
+            return np.empty(0, dtype=np.int64), total
+
+        if self._order is None and end <= PARTITION_MAX_RANK:
+            scores = self.scores if candidates is None else self.scores[candidates]
+            top = top_k_rows(scores[:, None], end)[:, 0]
+            rows = top if candidates is None else candidates[top]
+        else:
+            order = self.order()
+            rows = order[:end] if mask is None else order[mask[order]][:end]
+        return rows[offset:end], total
+
+
+class RankingCache:
+    """Thread-safe LRU of RankingIndex objects keyed by (dataset id, scoring parameters)."""
+
+    def __init__(self, max_entries=MAX_RANKING_INDEXES):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+            return index
+
+    def put(self, key, index):
+        with self._lock:
+            self._entries[key] = index
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, dataset_id):
+        """Drops every index built for a dataset."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == dataset_id]:
+                del self._entries[key]
+
+
+def parse_filters(data, feature_table):
+    """
+    Builds filter_mask conditions from the request's 'filters'.
+
+    Accepts a list of {feature, op, value} (op defaults to '==') or a {feature: value} mapping,
+    where a list value means 'in'. Numeric columns take comparison operators; text columns
+    such as a state name take '==', '!=', 'in' and 'not in', matched case-insensitively.
+
+    Raises:
+        ValueError: for unknown columns, unsupported operators or non-numeric values on numeric columns
+    """
+    filters = (data or {}).get('filters') or []
+    if isinstance(filters, dict):
+        filters = [{'feature': name, 'op': 'in' if isinstance(value, list) else '==', 'value': value}
+                   for name, value in filters.items()]
+
+    conditions = []
+    for condition in filters:
+        name = condition.get('feature') or condition.get('property')
+        op = condition.get('op', '==')
+        value = condition.get('value')
+        if name in feature_table:
+            if op not in COMPARISON_OPERATORS:
+                raise ValueError(f"Operator {op} is not supported on numeric column {name}. Expected one of {list(COMPARISON_OPERATORS)}")
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Filter on {name} needs a numeric value, got {value!r}")
+        elif name in feature_table.categories:
+            if op not in CATEGORY_OPERATORS:
+                raise ValueError(f"Operator {op} is not supported on text column {name}. Expected one of {list(CATEGORY_OPERATORS)}")
+        else:
+            raise ValueError(f"Unknown filter column: {name}")
+        conditions.append((name, op, value))
+    return conditions
+
+
+def parse_page(data):
+    """Returns (page, page_size) from the request, with 1-based pages; raises ValueError when out of range."""
+    page = int((data or {}).get('page', 1))
+    page_size = int((data or {}).get('page_size', DEFAULT_PAGE_SIZE))
+    if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page must be >= 1 and page_size between 1 and {MAX_PAGE_SIZE}")
+    return page, page_size
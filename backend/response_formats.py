@@ -0,0 +1,213 @@
+"""
+Response encoding for the clustering and scoring endpoints.
+JSON with full GeoJSON polygons stays the default; clients can ask for a compact columnar
+body (Arrow IPC or MessagePack) through the Accept header, or for label-only JSON through
+response_mode='labels' in the request body. Large JSON responses are streamed in polygon
+batches and compressed on the fly according to Accept-Encoding.
+"""
+
+import json
+import os
+import zlib
+
+import numpy as np
+import pyarrow as pa
+from flask import Response, current_app, jsonify, request
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+JSON_MIMETYPE = 'application/json'
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+# Response modes: full GeoJSON polygons, or parallel id/score/cluster arrays only
+RESPONSE_MODE_FULL = 'full'
+RESPONSE_MODE_LABELS = 'labels'
+_RESPONSE_MODE_ALIASES = {'full': RESPONSE_MODE_FULL, 'labels': RESPONSE_MODE_LABELS, 'delta': RESPONSE_MODE_LABELS}
+
+# Full JSON responses with at least this many polygons are streamed instead of built in memory
+STREAM_RESPONSE_MIN_POLYGONS = int(os.getenv('STREAM_RESPONSE_MIN_POLYGONS', 5000))
+# Number of polygons materialized and encoded per streamed chunk
+STREAM_RESPONSE_BATCH_SIZE = 1000
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Accepted aliases for the binary formats, mapped to the canonical mimetype
+_MIMETYPE_ALIASES = {
+    ARROW_STREAM_MIMETYPE: ARROW_STREAM_MIMETYPE,
+    'application/vnd.apache.arrow.file': ARROW_STREAM_MIMETYPE,
+    MSGPACK_MIMETYPE: MSGPACK_MIMETYPE,
+    'application/msgpack': MSGPACK_MIMETYPE,
+    'application/vnd.msgpack': MSGPACK_MIMETYPE
+}
+
+
+def negotiate_format():
+    """Picks the response mimetype from the Accept header; JSON unless a binary format is preferred."""
+    offered = [JSON_MIMETYPE] + list(_MIMETYPE_ALIASES)
+    if not MSGPACK_AVAILABLE:
+        offered = [m for m in offered if _MIMETYPE_ALIASES.get(m) != MSGPACK_MIMETYPE]
+    best = request.accept_mimetypes.best_match(offered, default=JSON_MIMETYPE)
+    return _MIMETYPE_ALIASES.get(best, JSON_MIMETYPE)
+
+
+def negotiate_encoding():
+    """Picks the content encoding for streamed responses from Accept-Encoding; None means identity."""
+    offered = (['br'] if BROTLI_AVAILABLE else []) + ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+class _StreamCompressor:
+    """Incremental gzip / brotli compressor; every chunk is flushed so the client can decode it immediately."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == 'gzip':
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        else:
+            self._compressor = None
+
+    def compress(self, data):
+        if self._compressor is None:
+            return data
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self._compressor is None:
+            return b''
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def _json_chunks(result, dataset, rows, dumps):
+    """Yields the JSON document as text chunks: the result keys (clusters, totals, ...) first, then polygon batches."""
+    head = dumps(result)
+    yield head[:-1] + (', ' if result else '') + '"polygons": ['
+    for start in range(0, len(rows), STREAM_RESPONSE_BATCH_SIZE):
+        batch = dumps(dataset.to_features(rows[start:start + STREAM_RESPONSE_BATCH_SIZE]))[1:-1]
+        yield (', ' if start else '') + batch
+    yield ']}'
+
+
+def _streamed_json_response(result, dataset, rows):
+    """Streams the full JSON response chunk by chunk so peak memory is bounded by one polygon batch."""
+    dumps = current_app.json.dumps
+    compressor = _StreamCompressor(negotiate_encoding())
+    rows = np.asarray(rows, dtype=np.int64)
+
+    def generate():
+        for chunk in _json_chunks(result, dataset, rows, dumps):
+            data = compressor.compress(chunk.encode('utf-8'))
+            if data:
+                yield data
+        tail = compressor.finish()
+        if tail:
+            yield tail
+
+    response = Response(generate(), mimetype=JSON_MIMETYPE)
+    if compressor.encoding:
+        response.headers['Content-Encoding'] = compressor.encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def parse_response_mode(data):
+    """Returns the response mode requested in the body, raising ValueError for unknown modes."""
+    mode = (data or {}).get('response_mode', RESPONSE_MODE_FULL)
+    if mode not in _RESPONSE_MODE_ALIASES:
+        raise ValueError(f"Unknown response_mode: {mode}. Expected one of {sorted(_RESPONSE_MODE_ALIASES)}")
+    return _RESPONSE_MODE_ALIASES[mode]
+
+
+def columnar_arrays(dataset, rows, include_labels):
+    """
+    Returns the per-polygon output columns (ids, scores and optionally cluster labels) for the given rows.
+    Ids keep their uploaded JSON type so they join against the GeoJSON features and cluster polygon_ids.
+    """
+    columns = {
+        'id': np.asarray(dataset.ids[rows], dtype=object),
+        'suitabilityScore': np.asarray(dataset.scores[rows], dtype=np.float64)
+    }
+    if include_labels:
+        columns['cluster'] = np.asarray(dataset.labels[rows], dtype=np.int32)
+    return columns
+
+
+def _arrow_response(result, columns):
+    """
+    Encodes columns as an Arrow IPC stream; the non-columnar result travels as JSON schema metadata.
+    Ids become a string column, since an Arrow column needs one type and uploads may mix ints and strings.
+    """
+    columns = {**columns, 'id': [str(i) for i in columns['id']]}
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    table = table.replace_schema_metadata({'result': json.dumps(result)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), mimetype=ARROW_STREAM_MIMETYPE)
+
+
+def _msgpack_response(result, columns):
+    """Encodes the result as MessagePack with numeric columns packed as little-endian binary arrays."""
+    body = dict(result)
+    body['polygon_ids'] = columns.pop('id').tolist()
+    body['columns'] = {
+        name: {'dtype': values.dtype.newbyteorder('<').str, 'data': values.astype(values.dtype.newbyteorder('<')).tobytes()}
+        for name, values in columns.items()
+    }
+    return Response(msgpack.packb(body, use_bin_type=True), mimetype=MSGPACK_MIMETYPE)
+
+
+def _labels_json_response(result, columns, scored):
+    """Returns parallel polygon id -> score (and cluster number) arrays instead of echoing polygons."""
+    body = {
+        **result,
+        'response_mode': RESPONSE_MODE_LABELS,
+        'polygon_ids': columns['id'].tolist()
+    }
+    if scored:
+        body['suitability_scores'] = columns['suitabilityScore'].tolist()
+    if 'cluster' in columns:
+        body['cluster_numbers'] = columns['cluster'].tolist()
+    return jsonify(body)
+
+
+def build_response(result, dataset, rows, include_labels=False, response_mode=RESPONSE_MODE_FULL, stream=False):
+    """
+    Builds the endpoint response in the negotiated format.
+
+    Args:
+        result: Non-polygon part of the response (clusters, totals, ...)
+        dataset: SpatialDataset holding ids, scores and labels
+        rows: Row indices of the polygons to return
+        include_labels: Whether a per-polygon cluster column is included
+        response_mode: 'full' to echo GeoJSON polygons in JSON responses, 'labels' for parallel arrays
+        stream: Stream a full JSON response even below STREAM_RESPONSE_MIN_POLYGONS
+    """
+    mimetype = negotiate_format()
+    if mimetype == JSON_MIMETYPE and response_mode == RESPONSE_MODE_FULL:
+        if stream or len(rows) >= STREAM_RESPONSE_MIN_POLYGONS:
+            return _streamed_json_response(result, dataset, rows)
+        return jsonify({**result, 'polygons': dataset.to_features(rows)})
+
+    columns = columnar_arrays(dataset, rows, include_labels)
+    if mimetype == JSON_MIMETYPE:
+        return _labels_json_response(result, columns, dataset.scored)
+    if mimetype == ARROW_STREAM_MIMETYPE:
+        return _arrow_response(result, columns)
+    return _msgpack_response(result, columns)
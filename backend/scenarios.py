@@ -0,0 +1,537 @@
+"""
+What-if scenarios applied to a dataset's feature columns.
+A scenario multiplies the affected villages' feature values by per-village factors. Each changed
+column becomes an overlay over the original one (affected rows plus their factors), so the base
+dataset is never copied or modified. Scenarios can be limited to a target: property filters,
+a bounding box, polygon ids or cluster numbers from a previous clustering run.
+
+Scenarios draw from an isolated generator seeded by scenarioConfig.seed, or by a hash of the
+config when no seed is given, so the same config always gives the same result and clustered
+scenario results can be cached per dataset and request.
+
+Sweeps evaluate a range of percent changes per feature at once: every point's score change is
+computed against the baseline's normalization scale as one broadcast over the targeted rows.
+
+The same arithmetic gives closed-form sensitivities: the exact score change of a percent change
+and its marginal effect per percent, for every village and every fixed cluster.
+
+Ensembles run many seeded replicates of a randomized scenario. The villages and percent changes
+of every replicate are drawn up front as one random tensor, so results depend only on the seed,
+and replicates are scored by a pool of threads into a memory-mapped score matrix.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from feature_store import OverlayColumn
+from ranking import parse_filters
+from scoring import SCORE_MAX, SCORE_MIN, normalize_weights, rescale_scores
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on replicates per ensemble, since scores are held as a (replicates, n) matrix
+MAX_ENSEMBLE_REPLICATES = int(os.getenv('MAX_ENSEMBLE_REPLICATES', 500))
+DEFAULT_ENSEMBLE_REPLICATES = 100
+DEFAULT_ENSEMBLE_PERCENTILES = (5, 50, 95)
+
+# Threads scoring ensemble replicates; 1 scores them in the request's thread
+ENSEMBLE_WORKERS = int(os.getenv('ENSEMBLE_WORKERS', min(4, os.cpu_count() or 1)))
+# Ensembles with fewer scores than this (rows x replicates) are scored in the request's thread, where threads gain nothing
+ENSEMBLE_POOL_MIN_SCORES = int(os.getenv('ENSEMBLE_POOL_MIN_SCORES', 2_000_000))
+# Scores (replicates x villages) read from the ensemble's memory-mapped matrix per summary chunk
+ENSEMBLE_SUMMARY_CHUNK_SCORES = int(os.getenv('ENSEMBLE_SUMMARY_CHUNK_SCORES', 4_000_000))
+
+# Upper bound on points per sweep request, since scores are held as an (n, points) matrix
+MAX_SWEEP_POINTS = int(os.getenv('MAX_SWEEP_POINTS', 256))
+
+# Clustered scenario results kept before the least recently used one is evicted
+MAX_SCENARIO_RESULTS = int(os.getenv('MAX_SCENARIO_RESULTS', 16))
+# Baseline clusterings kept for scenario comparisons
+MAX_BASELINE_CLUSTERINGS = int(os.getenv('MAX_BASELINE_CLUSTERINGS', 32))
+
+
+def canonical_hash(value):
+    """Stable hex digest of a JSON-like value, independent of key order."""
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def scenario_seed(scenario_config):
+    """The scenario's 'seed', or one derived from the rest of its config so equal configs draw alike."""
+    seed = (scenario_config or {}).get('seed')
+    if seed is not None:
+        return int(seed)
+    return int(canonical_hash(scenario_config or {})[:16], 16)
+
+
+class ScenarioResultCache:
+    """
+    Thread-safe LRU of clustering results keyed by (dataset key, request or parameter hash).
+    Entries should hold only what rebuilds a response (result dict, scenario_overlays, scores and
+    labels), never a FeatureTable, whose normalized and imputed caches would stay pinned with it.
+    """
+
+    def __init__(self, max_entries=MAX_SCENARIO_RESULTS):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, dataset_key):
+        """Drops every result computed for a dataset."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == dataset_key]:
+                del self._entries[key]
+
+
+def scenario_target_mask(dataset, target):
+    """
+    Rows a scenario may affect.
+
+    Args:
+        target: None for every row, or a dict with any of 'filters' (as in /api/rankings, e.g.
+            {"state_name": "Maharashtra"}), 'bbox' ([min_lng, min_lat, max_lng, max_lat]),
+            'polygon_ids' and 'clusters' (cluster numbers held in the dataset's labels, e.g. the
+            'cluster' values of polygons echoed from /api/cluster); rows must match all of them
+    Raises:
+        ValueError: if a filter or bbox is malformed
+    """
+    mask = np.ones(len(dataset), dtype=bool)
+    if not target:
+        return mask
+    if target.get('filters'):
+        mask &= dataset.feature_table.filter_mask(parse_filters(target, dataset.feature_table))
+    if target.get('bbox') is not None:
+        bbox = target['bbox']
+        if len(bbox) != 4:
+            raise ValueError(f"bbox must be [min_lng, min_lat, max_lng, max_lat], got {bbox}")
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in bbox)
+        lng, lat = dataset.coords[:, 0], dataset.coords[:, 1]
+        mask &= (lng >= min_lng) & (lng <= max_lng) & (lat >= min_lat) & (lat <= max_lat)
+    if target.get('polygon_ids') is not None:
+        mask &= pd.Series(dataset.ids).isin(set(target['polygon_ids'])).to_numpy()
+    if target.get('clusters') is not None:
+        mask &= np.isin(dataset.labels, np.asarray(target['clusters'], dtype=np.int64))
+    return mask
+
+
+def draw_scenario_replicates(dataset, scenario_config, replicates, rng):
+    """
+    Draws the affected villages and percent changes of many replicates of a scenario at once.
+
+    Args:
+        scenario_config: {featureChanges: [{feature, percentChange}], villagePercentage,
+            randomnessFactor, target}; villagePercentage is taken of the targeted villages
+    Returns:
+        Tuple of (changed feature names, affected rows as a (replicates, n_affected) array or None
+        when every row is affected, percent changes as a (replicates, features, n_affected) array,
+        or (replicates, features) when randomnessFactor is 0)
+    Raises:
+        ValueError: if the target is malformed
+    """
+    changes = []
+    for fc in scenario_config.get('featureChanges', []):
+        if fc['feature'] not in dataset.feature_table:
+            logger.warning(f"Scenario feature '{fc['feature']}' not found in dataset, skipping.")
+            continue
+        changes.append((fc['feature'], float(fc['percentChange'])))
+    village_percentage = scenario_config.get('villagePercentage', 100)
+    randomness_factor = scenario_config.get('randomnessFactor', 0)
+
+    candidates = None
+    if scenario_config.get('target'):
+        candidates = np.flatnonzero(scenario_target_mask(dataset, scenario_config['target']))
+        if not len(candidates):
+            logger.warning("Scenario target matches no villages; no changes applied.")
+            changes = []
+
+    n = len(dataset) if candidates is None else len(candidates)
+    n_affected = min(n, max(1, int(n * village_percentage / 100)))
+    if not changes or n_affected == len(dataset):
+        rows = None
+    elif n_affected == n:
+        rows = np.broadcast_to(candidates, (replicates, n))
+    else:
+        # Each replicate keeps the n_affected villages with the smallest random keys
+        keys = rng.random((replicates, n), dtype=np.float32)
+        picked = np.sort(np.argpartition(keys, n_affected - 1, axis=1)[:, :n_affected], axis=1)
+        rows = picked if candidates is None else candidates[picked]
+
+    percents = np.array([percent for _, percent in changes], dtype=np.float64)
+    if randomness_factor and changes:
+        jitter = rng.uniform(-randomness_factor, randomness_factor, size=(replicates, len(changes), n_affected))
+        percents = percents[None, :, None] + jitter
+    else:
+        percents = np.broadcast_to(percents, (replicates, len(changes)))
+    return [name for name, _ in changes], rows, percents
+
+
+def overlay_scenario(dataset, changes, rows, percents):
+    """Shallow copy of the dataset with one replicate's percent changes overlaid on the affected rows."""
+    scenario = dataset.shallow_copy()
+    for k, feat in enumerate(changes):
+        scenario.feature_table = scenario.feature_table.with_overlay(feat, rows, 1 + percents[k] / 100)
+        scenario.modified_columns.add(feat)
+    return scenario
+
+
+def scenario_overlays(dataset):
+    """The (feature, rows, factors) overlays on the dataset's modified columns, in the order they were applied."""
+    overlays = []
+    for name in sorted(dataset.modified_columns):
+        column, layers = dataset.feature_table.column(name), []
+        while isinstance(column, OverlayColumn):
+            layers.append((name, column.rows, column.factors))
+            column = column.base
+        overlays.extend(reversed(layers))
+    return overlays
+
+
+def restore_overlays(dataset, overlays):
+    """Re-applies overlays taken by scenario_overlays to an unmodified copy of the same dataset, in place."""
+    for name, rows, factors in overlays:
+        dataset.feature_table = dataset.feature_table.with_overlay(name, rows, factors)
+        dataset.modified_columns.add(name)
+    return dataset
+
+
+def apply_scenario(dataset, scenario_config, rng=None):
+    """
+    Returns a shallow copy of the dataset with the scenario's feature changes overlaid.
+
+    Args:
+        scenario_config: See draw_scenario_replicates
+        rng: numpy Generator used to pick villages and jitter changes; seeded by scenario_seed if None
+    Raises:
+        ValueError: if the target is malformed
+    """
+    rng = rng if rng is not None else np.random.default_rng(scenario_seed(scenario_config))
+    changes, rows, percents = draw_scenario_replicates(dataset, scenario_config, 1, rng)
+    return overlay_scenario(dataset, changes, None if rows is None else rows[0], percents[0])
+
+
+def parse_ensemble(scenario_config):
+    """
+    Returns the scenario's 'ensemble' settings as {replicates, seed, percentiles}, or None.
+    The seed defaults to the scenario's own (see scenario_seed).
+
+    Raises:
+        ValueError: if the replicate count or percentiles are out of range
+    """
+    ensemble = (scenario_config or {}).get('ensemble')
+    if not ensemble:
+        return None
+    if ensemble is True:
+        ensemble = {}
+    replicates = int(ensemble.get('replicates', DEFAULT_ENSEMBLE_REPLICATES))
+    if not 1 <= replicates <= MAX_ENSEMBLE_REPLICATES:
+        raise ValueError(f"Ensemble replicates must be between 1 and {MAX_ENSEMBLE_REPLICATES}, got {replicates}")
+    percentiles = [float(q) for q in ensemble.get('percentiles', DEFAULT_ENSEMBLE_PERCENTILES)]
+    if not all(0 <= q <= 100 for q in percentiles):
+        raise ValueError(f"Ensemble percentiles must be between 0 and 100, got {percentiles}")
+    seed = ensemble.get('seed')
+    seed = scenario_seed(scenario_config) if seed is None else int(seed)
+    return {'replicates': replicates, 'seed': seed, 'percentiles': percentiles}
+
+
+def _score_replicates(ensemble, replicates):
+    """Scores the given replicates of an ensemble into its score matrix, re-normalizing only the changed features."""
+    (dataset, changes, rows, percents, features, weights, normalization, directions, imputation,
+     base_raw, base_changed, scores) = ensemble
+    changed = [k for k, f in enumerate(features) if f in changes]
+    changed_names = [features[k] for k in changed]
+    changed_directions = tuple(directions[k] for k in changed)
+    for r in replicates:
+        scenario = overlay_scenario(dataset, changes, None if rows is None else rows[r], percents[r])
+        table = scenario.feature_table.imputed(imputation, scenario.coords, changed_names)
+        delta = table.normalized(changed_names, method=normalization, directions=changed_directions) @ weights[changed]
+        scores[r] = rescale_scores(base_raw - base_changed + delta)
+
+
+def score_scenario_ensemble(dataset, scenario_config, features, weights, normalization, directions, imputation,
+                            replicates=DEFAULT_ENSEMBLE_REPLICATES, seed=None, workers=ENSEMBLE_WORKERS):
+    """
+    Scores many seeded replicates of a scenario.
+
+    Every replicate shares the baseline's normalized matrix: only the changed features are
+    re-normalized, and their weighted difference is added to the baseline's raw scores before
+    rescaling. Large ensembles are split across threads writing disjoint rows of the score matrix;
+    the NumPy kernels release the GIL, and nothing is forked from the server's threads.
+
+    Args:
+        directions: Per-feature booleans aligned with features, False where lower is better
+        seed: Seed of the random draws; the same seed gives the same replicates for any worker count
+    Returns:
+        Tuple of (the first replicate's scenario dataset, (replicates, n) float64 np.memmap of scores)
+    Raises:
+        ValueError: if the target is malformed
+    """
+    rng = np.random.default_rng(seed)
+    changes, rows, percents = draw_scenario_replicates(dataset, scenario_config, replicates, rng)
+    weights = normalize_weights(weights)
+    changed = [k for k, f in enumerate(features) if f in changes]
+
+    base_table = dataset.feature_table.imputed(imputation, dataset.coords, features)
+    base_raw = base_table.weighted_sum(features, weights, method=normalization, directions=directions)
+    base_changed = base_table.normalized([features[k] for k in changed], method=normalization,
+                                         directions=tuple(directions[k] for k in changed)) @ weights[changed]
+
+    with tempfile.TemporaryFile(prefix='ensemble_') as f:
+        scores = np.memmap(f, dtype=np.float64, mode='w+', shape=(replicates, len(dataset)))
+    ensemble = (dataset, changes, rows, percents, features, weights, normalization, directions, imputation,
+                base_raw, base_changed, scores)
+
+    workers = min(workers, replicates)
+    if workers > 1 and changed and replicates * len(dataset) >= ENSEMBLE_POOL_MIN_SCORES:
+        logger.info(f"Scoring {replicates} scenario replicates of {len(dataset)} polygons across {workers} threads.")
+        blocks = [block.tolist() for block in np.array_split(np.arange(replicates), workers)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda block: _score_replicates(ensemble, block), blocks))
+    else:
+        _score_replicates(ensemble, range(replicates))
+
+    first = overlay_scenario(dataset, changes, None if rows is None else rows[0], percents[0])
+    return first, scores
+
+
+def _column_chunks(scores, columns):
+    """Yields (slice into columns, dense scores[:, chunk]) so only one chunk of the matrix is in memory at a time."""
+    size = max(1, ENSEMBLE_SUMMARY_CHUNK_SCORES // max(scores.shape[0], 1))
+    for start in range(0, len(columns), size):
+        chunk = slice(start, start + size)
+        yield chunk, np.asarray(scores[:, columns[chunk]])
+
+
+def summarize_ensemble(scores, labels, rows, percentiles):
+    """
+    Mean and percentile bands of an ensemble's village scores and cluster average scores.
+    The score matrix is reduced in chunks of villages, so a memory-mapped ensemble is never loaded whole.
+
+    Args:
+        scores: (replicates, n) score matrix
+        labels: Cluster number per row, -1 for unassigned rows
+        rows: Rows to report village bands for
+    Returns:
+        Tuple of ({'mean', 'p5', ...: per-village lists aligned with rows},
+                  {cluster number: {'mean', 'p5', ...}} of avg_suitability_score)
+    """
+    keys = [f"p{q:g}" for q in percentiles]
+    rows = np.asarray(rows, dtype=np.int64)
+    village_means = np.empty(len(rows))
+    village_bands = np.empty((len(percentiles), len(rows)))
+    for chunk, village_scores in _column_chunks(scores, rows):
+        village_means[chunk] = village_scores.mean(axis=0)
+        village_bands[:, chunk] = np.percentile(village_scores, percentiles, axis=0)
+    villages = {'mean': village_means.tolist()}
+    for key, band in zip(keys, village_bands):
+        villages[key] = band.tolist()
+
+    numbers, means = cluster_means(scores, labels)
+    bands = np.percentile(means, percentiles, axis=0)
+    clusters = {}
+    for c, number in enumerate(numbers.tolist()):
+        clusters[number] = {'mean': float(means[:, c].mean())}
+        clusters[number].update({key: float(band[c]) for key, band in zip(keys, bands)})
+    return villages, clusters
+
+
+def cluster_means(scores, labels):
+    """
+    Average score of every cluster in every row of a (k, n) score matrix at once, as products
+    with a sparse (n, clusters) membership matrix accumulated over chunks of villages.
+
+    Returns:
+        Tuple of (sorted cluster numbers, (k, clusters) averages)
+    """
+    members = np.flatnonzero(labels >= 0)
+    numbers, index, counts = np.unique(labels[members], return_inverse=True, return_counts=True)
+    membership = sparse.csr_matrix((1.0 / counts[index], (np.arange(len(members)), index)),
+                                   shape=(len(members), len(numbers)))
+    totals = np.zeros((len(numbers), scores.shape[0]))
+    for chunk, member_scores in _column_chunks(scores, members):
+        totals += membership[chunk].T @ member_scores.T
+    return numbers, totals.T
+
+
+def parse_sweep(data, features):
+    """
+    Returns the request's 'sweep' as a list of (feature, percent changes array).
+
+    Each entry is {feature, percent_changes: [...]} or {feature, min, max, steps} (evenly spaced,
+    endpoints included). Swept features must be among the scored features.
+
+    Raises:
+        ValueError: if an entry is malformed or the sweep has more than MAX_SWEEP_POINTS points
+    """
+    sweeps = []
+    for entry in (data or {}).get('sweep') or []:
+        feature = entry.get('feature')
+        if feature not in features:
+            raise ValueError(f"Swept feature {feature} must be one of the scored features")
+        if entry.get('percent_changes') is not None:
+            percents = np.asarray(entry['percent_changes'], dtype=np.float64)
+        else:
+            try:
+                percents = np.linspace(float(entry['min']), float(entry['max']), int(entry.get('steps', 11)))
+            except KeyError:
+                raise ValueError(f"Sweep of {feature} needs percent_changes or min and max")
+        if not len(percents) or (percents <= -100).any():
+            raise ValueError(f"Sweep of {feature} needs percent changes above -100")
+        sweeps.append((feature, percents))
+    if not sweeps:
+        raise ValueError('Provide sweep: a list of {feature, percent_changes} or {feature, min, max, steps}')
+    total = sum(len(percents) for _, percents in sweeps)
+    if total > MAX_SWEEP_POINTS:
+        raise ValueError(f"At most {MAX_SWEEP_POINTS} sweep points per request, got {total}")
+    return sweeps
+
+
+def sweep_scores(feature_table, features, weights, sweeps, normalization, directions, rows=None):
+    """
+    Scores every point of a sweep against the baseline.
+
+    A point multiplies one feature by (1 + percent / 100) on the targeted rows. The feature is
+    re-normalized with the baseline's scale (see FeatureColumn.normalization_scale), so only its
+    weighted change is added to the baseline's raw scores; each feature's points are one
+    (rows, points) broadcast. Scores are rescaled with the baseline's bounds, so they are on the
+    baseline's 7-10 scale and can leave it.
+
+    Args:
+        sweeps: List of (feature, percent changes array) from parse_sweep
+        rows: Targeted row indices, all rows if None
+    Returns:
+        Tuple of (baseline scores, (points, n) sweep scores)
+    Raises:
+        ValueError: for rank normalization, which has no fixed scale
+    """
+    weights = normalize_weights(weights)
+    base_raw = feature_table.weighted_sum(features, weights, method=normalization, directions=directions)
+    bounds = (base_raw.min(), base_raw.max())
+
+    index = {f: k for k, f in enumerate(features)}
+    n_points = sum(len(percents) for _, percents in sweeps)
+    raw = np.empty((len(feature_table), n_points), dtype=np.float64)
+    raw[:] = base_raw[:, None]
+    start = 0
+    for feature, percents in sweeps:
+        k = index[feature]
+        column = feature_table.column(feature)
+        points = slice(start, start + len(percents))
+        start += len(percents)
+        if column is None:
+            continue
+        offset, scale, clip = column.normalization_scale(normalization)
+        values = column.decode(rows, fill=0.0)
+        base = values * scale + (-offset * scale)
+        swept = (values[:, None] * (1 + percents[None, :] / 100)) * scale + (-offset * scale)
+        if clip:
+            np.clip(base, 0.0, 1.0, out=base)
+            np.clip(swept, 0.0, 1.0, out=swept)
+        delta = swept - base[:, None]
+        if not directions[k]:
+            np.negative(delta, out=delta)
+        delta *= weights[k]
+        if rows is None:
+            raw[:, points] += delta
+        else:
+            raw[rows, points] += delta
+    return rescale_scores(base_raw, bounds), rescale_scores(raw, bounds).T
+
+
+def labels_from_clusters(dataset, clusters):
+    """
+    Cluster number per row from clusters listing their polygon_ids (as /api/cluster returns them), -1 elsewhere.
+    Every row sharing a listed id is labelled, so repeated polygon ids are allowed.
+    """
+    labels = np.full(len(dataset), -1, dtype=np.int64)
+    index = pd.Index(dataset.ids)
+    for i, cluster in enumerate(clusters):
+        rows = index.get_indexer_for(cluster.get('polygon_ids') or [])
+        labels[rows[rows >= 0]] = cluster.get('cluster_number', i + 1)
+    return labels
+
+
+def feature_sensitivity(feature_table, features, weights, changes, normalization, directions, labels, rows=None):
+    """
+    Closed-form effect of each percent change on every village and every fixed cluster.
+
+    Scores are linear in each normalized feature, so with the baseline's normalization scale and
+    score bounds held fixed (as in sweep_scores), a change to feature f moves village i by
+    (SCORE_MAX - SCORE_MIN) / raw range * w_f * scale_f * (percent / 100) * x_i, with the sign
+    flipped for inverted features and robust clipping applied. Cluster effects are member averages.
+
+    Args:
+        changes: List of (feature, percent change)
+        labels: Cluster number per row, -1 for rows outside the clusters
+        rows: Rows the changes apply to, all rows if None
+    Returns:
+        Tuple of (sorted cluster numbers, list of {feature, percent_change, village_changes,
+        cluster_changes, cluster_marginals}) where marginals are score change per 1% at the baseline
+    Raises:
+        ValueError: for rank normalization, which has no fixed scale
+    """
+    sweeps = [(feature, np.array([percent], dtype=np.float64)) for feature, percent in changes]
+    baseline, scores = sweep_scores(feature_table, features, weights, sweeps, normalization, directions, rows)
+    village_changes = scores - baseline[None, :]
+
+    weights = normalize_weights(weights)
+    base_raw = feature_table.weighted_sum(features, weights, method=normalization, directions=directions)
+    raw_range = base_raw.max() - base_raw.min()
+    score_scale = (SCORE_MAX - SCORE_MIN) / raw_range if raw_range > 0 else 0.0
+
+    index = {f: k for k, f in enumerate(features)}
+    marginals = np.zeros((len(changes), len(feature_table)), dtype=np.float64)
+    for c, (feature, _) in enumerate(changes):
+        k = index[feature]
+        column = feature_table.column(feature)
+        if column is None:
+            continue
+        offset, scale, clip = column.normalization_scale(normalization)
+        values = column.decode(rows, fill=0.0)
+        marginal = score_scale * weights[k] * scale * values / 100
+        if clip:
+            normalized = values * scale + (-offset * scale)
+            marginal[(normalized <= 0.0) | (normalized >= 1.0)] = 0.0
+        if not directions[k]:
+            np.negative(marginal, out=marginal)
+        if rows is None:
+            marginals[c] = marginal
+        else:
+            marginals[c, rows] = marginal
+
+    numbers, cluster_changes = cluster_means(village_changes, labels)
+    _, cluster_marginals = cluster_means(marginals, labels)
+    effects = [{
+        'feature': feature,
+        'percent_change': percent,
+        'village_changes': village_changes[c],
+        'cluster_changes': cluster_changes[c],
+        'cluster_marginals': cluster_marginals[c]
+    } for c, (feature, percent) in enumerate(changes)]
+    return numbers, effects
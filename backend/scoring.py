@@ -0,0 +1,254 @@
+"""
+Suitability scoring helpers shared by the scoring endpoints.
+Scores are weighted sums of normalized feature columns, rescaled to the 7-10 range used by
+the frontend. Many weighting schemes can be scored together with one matrix-matrix product.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+from scipy.stats import rankdata
+
+from feature_store import (IMPUTATION_METHODS, IMPUTATION_ZERO, NORMALIZATION_METHODS, NORMALIZATION_MINMAX, NORMALIZATION_RANK,
+                           catalog_direction)
+
+# Score range shown in the frontend; constant score vectors map to the midpoint
+SCORE_MIN = 7.0
+SCORE_MAX = 10.0
+CONSTANT_SCORE = 8.5
+
+# Upper bound on weighting schemes per batch request, since scores are held as an (n, schemes) matrix
+MAX_BATCH_SCHEMES = int(os.getenv('MAX_BATCH_SCHEMES', 64))
+
+# Rows normalized and scored per chunk by out-of-core scoring
+SCORING_CHUNK_ROWS = int(os.getenv('SCORING_CHUNK_ROWS', 262144))
+# Selections whose normalized matrix would exceed this are scored out of core unless the request says otherwise
+CHUNKED_SCORING_MIN_BYTES = int(os.getenv('CHUNKED_SCORING_MIN_MB', 512)) * 1024 * 1024
+
+# Accepted values of a feature_directions override, mapped to "higher is better"
+_DIRECTION_VALUES = {'positive': True, 'negative': False, True: True, False: False}
+
+
+def normalize_weights(weights):
+    """Scales weights (a vector, or a (features, schemes) matrix column-wise) to sum to 1."""
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / weights.sum(axis=0)
+
+
+def rescale_scores(raw_scores, bounds=None):
+    """
+    Maps raw weighted sums to the 7-10 range, per column for a (n, schemes) matrix.
+    Columns whose scores are all equal become 8.5.
+
+    Args:
+        bounds: (min, max) of the raw scores when raw_scores is only one chunk of them
+    """
+    raw_scores = np.asarray(raw_scores, dtype=np.float64)
+    min_s, max_s = bounds if bounds is not None else (raw_scores.min(axis=0), raw_scores.max(axis=0))
+    spread = max_s > min_s
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scaled = SCORE_MIN + (SCORE_MAX - SCORE_MIN) * (raw_scores - min_s) / (max_s - min_s)
+    return np.where(spread, scaled, CONSTANT_SCORE)
+
+
+def parse_normalization(data):
+    """Returns the normalization method requested in the body, raising ValueError for unknown methods."""
+    method = (data or {}).get('normalization') or NORMALIZATION_MINMAX
+    if method not in NORMALIZATION_METHODS:
+        raise ValueError(f"Unknown normalization: {method}. Expected one of {list(NORMALIZATION_METHODS)}")
+    return method
+
+
+def parse_imputation(data):
+    """Returns the missing-value imputation requested in the body, raising ValueError for unknown methods."""
+    method = (data or {}).get('imputation') or IMPUTATION_ZERO
+    if method not in IMPUTATION_METHODS:
+        raise ValueError(f"Unknown imputation: {method}. Expected one of {list(IMPUTATION_METHODS)}")
+    return method
+
+
+def parse_chunked_scoring(data, normalization):
+    """
+    Returns the 'chunked_scoring' flag of the request: True or False to force out-of-core or
+    in-memory scoring, None to decide from the selection size (see use_chunked_scoring).
+
+    Raises:
+        ValueError: if chunked scoring is forced with rank normalization, which needs whole columns
+    """
+    chunked = (data or {}).get('chunked_scoring')
+    if chunked is not None:
+        chunked = bool(chunked)
+    if chunked and normalization == NORMALIZATION_RANK:
+        raise ValueError('Rank normalization cannot be combined with chunked_scoring')
+    return chunked
+
+
+def use_chunked_scoring(feature_table, features, normalization, chunked=None):
+    """Whether to score out of core: as requested, or when the normalized matrix would not fit the threshold."""
+    if chunked is not None:
+        return chunked
+    if normalization == NORMALIZATION_RANK:
+        return False
+    return len(feature_table) * len(features) * 8 > CHUNKED_SCORING_MIN_BYTES
+
+
+def resolve_directions(features, data):
+    """
+    Per-feature scoring directions (True where higher is better) from the catalog's positive_impact,
+    overridden by the request's 'feature_directions' ({feature: 'positive' | 'negative' | bool}).
+
+    Raises:
+        ValueError: if an override is not a recognised direction
+    """
+    directions = [catalog_direction(f) for f in features]
+    overrides = (data or {}).get('feature_directions') or {}
+    index = {f: k for k, f in enumerate(features)}
+    for feature, direction in overrides.items():
+        if not isinstance(direction, (str, bool)) or direction not in _DIRECTION_VALUES:
+            raise ValueError(f"Invalid direction for {feature}: {direction}. Expected 'positive' or 'negative'")
+        if feature in index:
+            directions[index[feature]] = _DIRECTION_VALUES[direction]
+    return tuple(directions)
+
+
+def resolve_weight_schemes(data, presets):
+    """
+    Builds the (features, schemes) weight matrix of a batch request.
+
+    Schemes come from 'weights_matrix' (rows aligned with 'features', optionally named by
+    'scheme_names') and/or 'schemes', a list of {name, preset, weights}. A preset is a
+    get_feature_suggestions name and gives each of its features weight 1; 'weights' (a list
+    aligned with 'features' or a {feature: weight} mapping) overrides or adds to it.
+
+    Returns:
+        Tuple of (feature names, scheme names, weight matrix)
+    Raises:
+        ValueError: if a scheme is malformed, references an unknown preset or has zero total weight
+    """
+    features = list(data.get('features') or [])
+    schemes = []  # (name, {feature: weight})
+
+    matrix = data.get('weights_matrix') or []
+    names = data.get('scheme_names') or []
+    for i, row in enumerate(matrix):
+        if len(row) != len(features):
+            raise ValueError(f"weights_matrix row {i} has {len(row)} weights for {len(features)} features")
+        schemes.append((names[i] if i < len(names) else f'scheme_{i + 1}', dict(zip(features, row))))
+
+    for i, scheme in enumerate(data.get('schemes') or []):
+        weights = {}
+        preset = scheme.get('preset')
+        if preset is not None:
+            if preset not in presets:
+                raise ValueError(f"Unknown preset: {preset}. Available presets: {sorted(presets)}")
+            weights.update({feature: 1.0 for feature in presets[preset]})
+        overrides = scheme.get('weights') or {}
+        if isinstance(overrides, list):
+            if len(overrides) != len(features):
+                raise ValueError(f"Scheme {i} has {len(overrides)} weights for {len(features)} features")
+            overrides = dict(zip(features, overrides))
+        weights.update(overrides)
+        schemes.append((scheme.get('name') or preset or f'scheme_{len(schemes) + 1}', weights))
+
+    if not schemes:
+        raise ValueError('Provide weights_matrix or schemes')
+    if len(schemes) > MAX_BATCH_SCHEMES:
+        raise ValueError(f"At most {MAX_BATCH_SCHEMES} schemes per request, got {len(schemes)}")
+
+    # Union of every feature referenced, keeping the request's order first
+    for _, weights in schemes:
+        features.extend(f for f in weights if f not in features)
+
+    weight_matrix = np.zeros((len(features), len(schemes)), dtype=np.float64)
+    index = {f: j for j, f in enumerate(features)}
+    for s, (name, weights) in enumerate(schemes):
+        for feature, weight in weights.items():
+            weight_matrix[index[feature], s] = float(weight)
+        if weight_matrix[:, s].sum() == 0:
+            raise ValueError(f"Scheme '{name}' has zero total weight")
+    return features, [name for name, _ in schemes], weight_matrix
+
+
+def score_batch(feature_table, features, weight_matrix, normalization=NORMALIZATION_MINMAX, directions=None):
+    """Scores every scheme at once: (n, features) normalized matrix times (features, schemes) weights."""
+    normalized = feature_table.normalized(features, method=normalization, directions=directions)
+    raw_scores = normalized @ normalize_weights(weight_matrix)
+    return rescale_scores(raw_scores)
+
+
+def score_chunked(feature_table, features, weights, normalization=NORMALIZATION_MINMAX, directions=None,
+                  chunk_rows=SCORING_CHUNK_ROWS):
+    """
+    Out-of-core version of normalizing, weighting and rescaling, for tables larger than worker memory.
+
+    Pass one walks the columns for their normalization statistics: the min/max recorded when the
+    column was encoded, or ColumnStats decoded one column at a time. Pass two walks row chunks,
+    normalizing and weighting each into a memory-mapped score vector while tracking its range, and
+    the scores are then rescaled to 7-10 chunk by chunk in place. Every step uses the same
+    arithmetic as the in-memory path, so the scores are identical.
+
+    Args:
+        weights: Weights already normalized to sum to 1
+    Returns:
+        float64 np.memmap of the rescaled scores, backed by an anonymous temporary file
+    """
+    if normalization == NORMALIZATION_RANK:
+        raise ValueError('Rank normalization cannot be combined with chunked_scoring')
+    weights = np.asarray(weights, dtype=np.float64)
+    n = len(feature_table)
+
+    # Pass one: per-column statistics
+    for name in features:
+        column = feature_table.column(name)
+        if column is not None and normalization != NORMALIZATION_MINMAX:
+            column.stats()
+
+    # Pass two: raw scores chunk by chunk, then rescaled in place
+    with tempfile.TemporaryFile(prefix='scores_') as f:
+        scores = np.memmap(f, dtype=np.float64, mode='w+', shape=(n,))
+    min_s, max_s = np.inf, -np.inf
+    for start in range(0, n, chunk_rows):
+        rows = slice(start, min(start + chunk_rows, n))
+        chunk = feature_table.normalized(features, rows, normalization, directions) @ weights
+        scores[rows] = chunk
+        min_s, max_s = min(min_s, chunk.min()), max(max_s, chunk.max())
+    for start in range(0, n, chunk_rows):
+        rows = slice(start, min(start + chunk_rows, n))
+        scores[rows] = rescale_scores(scores[rows], (min_s, max_s))
+    return scores
+
+
+def top_k_rows(scores, k):
+    """Row indices of the k highest scores per column, best first; ties go to the earlier row."""
+    n, n_schemes = scores.shape
+    k = min(k, n)
+    result = np.empty((k, n_schemes), dtype=np.int64)
+    if k == 0:
+        return result
+    for s in range(n_schemes):
+        column = scores[:, s]
+        kth = np.partition(column, n - k)[n - k]
+        above = np.flatnonzero(column > kth)
+        rows = np.concatenate([above, np.flatnonzero(column == kth)[:k - len(above)]])
+        rows.sort()
+        result[:, s] = rows[np.argsort(-column[rows], kind='stable')]
+    return result
+
+
+def rank_correlations(scores):
+    """Spearman rank correlation matrix between the score columns (NaN where a column is constant)."""
+    if scores.shape[1] == 1:
+        return np.ones((1, 1))
+    ranks = rankdata(scores, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.corrcoef(ranks, rowvar=False)
+
+
+def score_histograms(scores, bins):
+    """Histogram counts of each score column over equal-width bins spanning the 7-10 range."""
+    edges = np.linspace(SCORE_MIN, SCORE_MAX, bins + 1)
+    index = np.clip(((scores - SCORE_MIN) / (SCORE_MAX - SCORE_MIN) * bins).astype(np.int64), 0, bins - 1)
+    offsets = index + np.arange(scores.shape[1]) * bins
+    counts = np.bincount(offsets.ravel(), minlength=bins * scores.shape[1]).reshape(scores.shape[1], bins)
+    return edges, counts
@@ -0,0 +1,71 @@
+import json
+import random
+import time
+
+from cluster_api import app
+
+def test_baseline_reuse():
+    """Test that scenario comparisons reuse the retained baseline clustering"""
+    client = app.test_client()
+
+    # Sample data
+    random.seed(24)
+    polygons = []
+    for i in range(10000):
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "net_sown_area_in_hac": random.uniform(0, 300)
+            }
+        })
+    request_data = {
+        "algorithm": "kmeans",
+        "params": {"n_clusters": 6, "max_polygons_per_cluster": 10000},
+        "features": ["total_population", "net_sown_area_in_hac"],
+        "weights": [1, 1],
+        "response_mode": "labels"
+    }
+    scenario = {"featureChanges": [{"feature": "total_population", "percentChange": 20}]}
+
+    print("=== Testing Baseline Clustering Reuse ===\n")
+
+    response = client.post("/api/datasets", json={"features": polygons})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    dataset_id = response.get_json()['dataset_id']
+
+    # Baseline run
+    start = time.time()
+    response = client.post("/api/cluster", json={**request_data, "dataset_id": dataset_id})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    baseline = response.get_json()
+    assert baseline.get('baseline_id')
+    print(f"✅ Baseline clustered in {time.time() - start:.3f}s, baseline_id {baseline['baseline_id']}")
+
+    # Comparison against the same baseline
+    start = time.time()
+    comparison = client.post("/api/cluster", json={
+        **request_data, "dataset_id": dataset_id, "include_ai_insights": True, "scenarioConfig": scenario
+    }).get_json()
+    assert comparison.get('baseline_reused'), f"Baseline not reused: {comparison.get('baseline_id')}"
+    assert comparison['baseline_id'] == baseline['baseline_id']
+    print(f"✅ Comparison reused the baseline ({time.time() - start:.3f}s, baseline_id {comparison['baseline_id']})")
+
+    # Different parameters need their own baseline, unless one is referenced explicitly
+    other = {**request_data, "params": {"n_clusters": 4, "max_polygons_per_cluster": 10000}}
+    comparison = client.post("/api/cluster", json={
+        **other, "dataset_id": dataset_id, "include_ai_insights": True, "scenarioConfig": scenario
+    }).get_json()
+    assert not comparison.get('baseline_reused'), "New parameters reused the old baseline"
+    print("✅ New parameters cluster a new baseline")
+    comparison = client.post("/api/cluster", json={
+        **other, "dataset_id": dataset_id, "include_ai_insights": True, "baseline_id": baseline['baseline_id'],
+        "scenarioConfig": {"featureChanges": [{"feature": "total_population", "percentChange": 30}]}
+    }).get_json()
+    assert comparison.get('baseline_reused'), "Explicit baseline_id was not reused"
+    print("✅ Explicit baseline_id is reused")
+
+if __name__ == "__main__":
+    test_baseline_reuse()
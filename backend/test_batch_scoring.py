@@ -0,0 +1,78 @@
+import json
+import random
+
+from cluster_api import app
+
+def test_batch_scoring():
+    """Test scoring several weighting schemes in one batch request"""
+    client = app.test_client()
+
+    # Sample data
+    random.seed(11)
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "total_hhd": random.randint(10, 900),
+                "is_bank_available": random.randint(0, 1),
+                "is_atm_available": random.randint(0, 1),
+                "net_sown_area_in_hac": random.random() * 300
+            }
+        }
+        for i in range(2000)
+    ]
+    features = ["total_population", "total_hhd", "is_bank_available", "net_sown_area_in_hac"]
+
+    print("=== Testing Batch Scoring ===\n")
+
+    response = client.post("/api/batch-score", json={
+        "polygons": polygons,
+        "features": features,
+        "weights_matrix": [[1, 1, 1, 1], [3, 1, 0, 1]],
+        "scheme_names": ["equal", "population heavy"],
+        "schemes": [
+            {"preset": "Financial Inclusion"},
+            {"name": "Financial Inclusion + population", "preset": "Financial Inclusion", "weights": {"total_population": 2}}
+        ],
+        "top_k": 5
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    result = response.get_json()
+    assert len(result['schemes']) == 4
+    print(f"✅ Scored {len(result['schemes'])} schemes over {result['total_polygons']} polygons")
+    print(f"   Features used: {result['features_used']}\n")
+    for scheme in result['schemes']:
+        assert len(scheme['top_villages']) == 5
+        assert sum(scheme['histogram']) == len(polygons)
+        top = ', '.join(f"{v['id']} ({v['suitabilityScore']:.3f})" for v in scheme['top_villages'])
+        print(f"  {scheme['name']}: mean {scheme['mean_score']:.3f}, top: {top}")
+        print(f"    histogram: {scheme['histogram']}")
+
+    print("\n  Rank correlations:")
+    for name, row in zip(result['rank_correlation']['schemes'], result['rank_correlation']['matrix']):
+        print(f"    {name:>35}: {['-' if v is None else f'{v:.2f}' for v in row]}")
+
+    # The first scheme must match scoring the same weights on their own
+    single = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": [1, 1, 1, 1], "response_mode": "labels"
+    })
+    assert single.status_code == 200, single.get_data(as_text=True)
+    body = single.get_json()
+    scores = dict(zip(body['polygon_ids'], body['suitability_scores']))
+    max_diff = max(abs(v['suitabilityScore'] - scores[v['id']]) for v in result['schemes'][0]['top_villages'])
+    assert max_diff < 1e-9, f"Batch and single scores differ by {max_diff}"
+    print(f"\n  ✅ Matches /api/normalize-score (max difference {max_diff})")
+
+    # Unknown presets are rejected
+    bad = client.post("/api/batch-score", json={
+        "polygons": polygons, "schemes": [{"preset": "No Such Preset"}]
+    })
+    assert bad.status_code == 400, bad.status_code
+    print(f"  ✅ Unknown preset rejected ({bad.status_code})")
+
+if __name__ == "__main__":
+    test_batch_scoring()
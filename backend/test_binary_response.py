@@ -0,0 +1,63 @@
+import json
+import pyarrow as pa
+
+from cluster_api import app
+
+def test_binary_response():
+    """Test Arrow IPC responses negotiated through the Accept header"""
+    client = app.test_client()
+
+    # Sample data
+    test_polygons = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [77.2090 + i * 0.05, 28.6139 + (i % 3) * 0.05]},
+            "properties": {"total_population": 800 + i * 50, "total_hhd": 150 + i * 10, "is_bank_available": i % 2}
+        }
+        for i in range(12)
+    ]
+
+    features = ["total_population", "total_hhd", "is_bank_available"]
+    weights = [1, 1, 1]
+
+    print("=== Testing Binary Responses ===\n")
+
+    print("Step 1: Scoring with Accept: application/vnd.apache.arrow.stream...")
+    response = client.post(
+        "/api/normalize-score",
+        json={"polygons": test_polygons, "features": features, "weights": weights},
+        headers={"Accept": "application/vnd.apache.arrow.stream"}
+    )
+    print(f"  Status Code: {response.status_code}")
+    print(f"  Content-Type: {response.headers.get('Content-Type')}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.headers.get('Content-Type').startswith('application/vnd.apache.arrow.stream')
+    table = pa.ipc.open_stream(response.data).read_all()
+    result = json.loads(table.schema.metadata[b'result'])
+    assert table.num_rows == len(test_polygons)
+    assert {'id', 'suitabilityScore'} <= set(table.column_names)
+    print(f"  ✅ Received {table.num_rows} rows with columns {table.column_names}")
+    print(f"  📊 Result metadata: {result}")
+    scored_polygons = []
+    for polygon, score, polygon_id in zip(test_polygons, table['suitabilityScore'].to_pylist(), table['id'].to_pylist()):
+        scored_polygons.append({**polygon, "id": polygon_id, "properties": {**polygon["properties"], "suitabilityScore": score}})
+
+    print("\nStep 2: Clustering with Accept: application/vnd.apache.arrow.stream...")
+    response = client.post(
+        "/api/cluster",
+        json={"polygons": scored_polygons, "algorithm": "kmeans", "params": {"n_clusters": 3}},
+        headers={"Accept": "application/vnd.apache.arrow.stream"}
+    )
+    print(f"  Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    table = pa.ipc.open_stream(response.data).read_all()
+    result = json.loads(table.schema.metadata[b'result'])
+    assert table.num_rows == len(test_polygons)
+    assert len(result['clusters']) == 3
+    assert set(table['cluster'].to_pylist()) == {c['cluster_number'] for c in result['clusters']}
+    print(f"  ✅ Received {table.num_rows} labelled polygons and {len(result['clusters'])} clusters")
+    for polygon_id, cluster in list(zip(table['id'].to_pylist(), table['cluster'].to_pylist()))[:5]:
+        print(f"     {polygon_id}: cluster {cluster}")
+
+if __name__ == "__main__":
+    test_binary_response()
@@ -0,0 +1,61 @@
+import json
+
+from cluster_api import app
+
+def test_centroids():
+    """Test that clustering uses area-weighted centroids for polygons, holes and multi-part polygons"""
+    client = app.test_client()
+
+    square = [[77.0, 28.0], [78.0, 28.0], [78.0, 29.0], [77.0, 29.0], [77.0, 28.0]]
+    hole = [[77.5, 28.0], [77.5, 29.0], [78.0, 29.0], [78.0, 28.0], [77.5, 28.0]]
+    l_shape = [[80.0, 20.0], [82.0, 20.0], [82.0, 21.0], [81.0, 21.0], [81.0, 22.0], [80.0, 22.0], [80.0, 20.0]]
+
+    # Sample data, far enough apart that each polygon forms its own cluster
+    polygons = [
+        {
+            "type": "Feature", "id": "square_with_hole",
+            "geometry": {"type": "Polygon", "coordinates": [square, hole]},
+            "properties": {"total_population": 1000}
+        },
+        {
+            "type": "Feature", "id": "l_shape",
+            "geometry": {"type": "Polygon", "coordinates": [l_shape]},
+            "properties": {"total_population": 1500}
+        },
+        {
+            "type": "Feature", "id": "two_parts",
+            "geometry": {"type": "MultiPolygon", "coordinates": [
+                [[[70.0, 10.0], [71.0, 10.0], [71.0, 11.0], [70.0, 11.0], [70.0, 10.0]]],
+                [[[72.0, 10.0], [74.0, 10.0], [74.0, 11.0], [72.0, 11.0], [72.0, 10.0]]]
+            ]},
+            "properties": {"total_population": 800}
+        }
+    ]
+
+    # Expected area-weighted centroids (lng, lat)
+    expected = {
+        "square_with_hole": [77.25, 28.5],
+        "l_shape": [80.8333, 20.8333],
+        "two_parts": [72.1667, 10.5]
+    }
+
+    print("=== Testing Area-weighted Centroids ===\n")
+
+    response = client.post("/api/cluster", json={
+        "polygons": polygons,
+        "algorithm": "kmeans",
+        "params": {"n_clusters": 3, "min_polygons_per_cluster": 1, "max_polygons_per_cluster": 10}
+    })
+    print(f"Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    result = response.get_json()
+    cluster_of = {p['id']: p['cluster'] for p in result['polygons']}
+    centroids = {c['cluster_id']: c['centroid'] for c in result['clusters']}
+    for polygon_id, point in expected.items():
+        got = centroids[cluster_of[polygon_id]]
+        assert abs(got[0] - point[0]) < 1e-3 and abs(got[1] - point[1]) < 1e-3, f"{polygon_id}: {got}, expected {point}"
+        print(f"  ✅ {polygon_id}: centroid {[round(v, 4) for v in got]}, expected {point}")
+
+if __name__ == "__main__":
+    test_centroids()
@@ -0,0 +1,89 @@
+import json
+import random
+
+from cluster_api import app
+
+def test_cluster_matching():
+    """Test optimal matching of scenario clusters to the baseline clusters"""
+    client = app.test_client()
+
+    # Sample data: 15 well separated groups of villages
+    random.seed(25)
+    polygons = []
+    for i in range(3000):
+        group = i % 15
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [70.0 + group + random.random() * 0.2,
+                                                          20.0 + (group % 3) + random.random() * 0.2]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "total_hhd_having_piped_water_con": random.randint(0, 300),
+                "no_electricity": random.randint(0, 50)
+            }
+        })
+    request_data = {
+        "polygons": polygons,
+        "algorithm": "kmeans",
+        "params": {"n_clusters": 15, "max_clusters": 0, "random_state": 42},
+        "features": ["total_population", "total_hhd_having_piped_water_con", "no_electricity"],
+        "weights": [1, 2, 1],
+        "response_mode": "labels"
+    }
+
+    print("=== Testing Cluster Matching ===\n")
+
+    response = client.post("/api/cluster", json=request_data)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    baseline = response.get_json()
+    assert baseline['total_clusters'] == 15, baseline['total_clusters']
+    print(f"✅ max_clusters 0 returns all {baseline['total_clusters']} clusters")
+
+    # Raising piped water in half the groups reorders the clusters by score
+    scenario = {
+        "featureChanges": [{"feature": "total_hhd_having_piped_water_con", "percentChange": 200}],
+        "target": {"bbox": [70.0, 20.0, 77.5, 23.0]}
+    }
+    response = client.post("/api/cluster", json={
+        **request_data, "scenarioConfig": scenario, "match_baseline": True
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    matching = result['cluster_matching']
+    assert len(matching['matches']) == 15
+    assert all(m['jaccard'] == 1.0 for m in matching['matches'])
+    print(f"✅ {len(matching['matches'])} clusters matched on identical members")
+
+    original = {c['cluster_number']: set(c['polygon_ids']) for c in baseline['clusters']}
+    assert all(set(c['polygon_ids']) == original.get(c['cluster_number']) for c in result['clusters'])
+    print("✅ Scenario clusters keep the baseline cluster numbers")
+    labels = dict(zip(result['polygon_ids'], result['cluster_numbers']))
+    assert all(labels[i] == c['cluster_number'] for c in result['clusters'] for i in c['polygon_ids'])
+    print("✅ Polygon cluster labels follow the matching")
+
+    # A split: one original cluster becomes two scenario clusters
+    split_ids = baseline['clusters'][0]['polygon_ids']
+    scenario_clusters = [dict(c) for c in baseline['clusters'][1:]] + [
+        {**baseline['clusters'][0], 'cluster_number': 101, 'polygon_ids': split_ids[:len(split_ids) // 2]},
+        {**baseline['clusters'][0], 'cluster_number': 102, 'polygon_ids': split_ids[len(split_ids) // 2:]}
+    ]
+    response = client.post("/api/match-clusters", json={
+        "original_clusters": baseline['clusters'], "scenario_clusters": scenario_clusters
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    assert len(result['splits']) == 1, result['splits']
+    print(f"✅ Split detected: {json.dumps(result['splits'])}")
+    numbers = sorted(c['cluster_number'] for c in result['matched_scenario_clusters'])
+    assert numbers == list(range(1, 17)), numbers
+    print(f"✅ New cluster numbered after the originals: {numbers[-3:]}")
+
+    response = client.post("/api/match-clusters", json={
+        "original_clusters": baseline['clusters'], "scenario_clusters": scenario_clusters, "distance_weight": 2
+    })
+    assert response.status_code == 400, response.status_code
+    print(f"✅ Invalid distance_weight rejected ({response.status_code})")
+
+if __name__ == "__main__":
+    test_cluster_matching()
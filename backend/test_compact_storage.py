@@ -0,0 +1,61 @@
+import json
+import random
+
+from cluster_api import app
+
+def test_compact_storage():
+    """Test that registered datasets store catalog features in compact dtypes and still score correctly"""
+    client = app.test_client()
+
+    # Sample data with binary flags, counts, areas and an uncatalogued float
+    random.seed(42)
+    polygons = []
+    for i in range(1000):
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "total_hhd": random.randint(10, 900) if i % 10 else None,
+                "is_bank_available": random.randint(0, 1),
+                "is_atm_available": random.randint(0, 1),
+                "net_sown_area_in_hac": round(random.random() * 300, 2),
+                "literacy_rate": random.random()
+            }
+        })
+
+    features = ["total_population", "total_hhd", "is_bank_available", "is_atm_available", "net_sown_area_in_hac", "literacy_rate"]
+    weights = [2, 1, 1, 1, 1, 1]
+
+    print("=== Testing Compact Feature Storage ===\n")
+
+    # Step 1: Register and inspect storage dtypes
+    print("Step 1: Registering dataset...")
+    response = client.post("/api/datasets", json={"type": "FeatureCollection", "features": polygons})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    info = response.get_json()
+    dense_bytes = info['total_polygons'] * len(info['feature_names']) * 8
+    print(f"  Storage dtypes: {info['feature_dtypes']}")
+    assert info['feature_dtypes']['literacy_rate'] == 'float64'
+    assert info['feature_dtypes']['is_bank_available'] != 'float64'
+    assert info['feature_bytes'] < dense_bytes
+    print(f"  ✅ {info['feature_bytes']} bytes compact vs {dense_bytes} bytes as float64")
+
+    # Step 2: Scores from the registered (compact) dataset match inline scoring
+    print("\nStep 2: Comparing scores by dataset_id and inline...")
+    by_id = client.post("/api/normalize-score", json={
+        "dataset_id": info['dataset_id'], "features": features, "weights": weights, "response_mode": "labels"
+    })
+    inline = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": weights, "response_mode": "labels"
+    })
+    assert by_id.status_code == 200, by_id.get_data(as_text=True)
+    assert inline.status_code == 200, inline.get_data(as_text=True)
+    a, b = by_id.get_json()['suitability_scores'], inline.get_json()['suitability_scores']
+    max_diff = max(abs(x - y) for x, y in zip(a, b))
+    assert max_diff < 1e-9, f"Max score difference: {max_diff}"
+    print(f"  ✅ Max score difference: {max_diff}")
+
+if __name__ == "__main__":
+    test_compact_storage()
@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from dataset_store import DatasetRegistry, SpatialDataset
+
+def test_dataset_cache():
+    """Test that a restarted worker reopens datasets and normalized matrices from the disk cache"""
+    # Sample data with mixed integer and string ids
+    polygons = [
+        {
+            "type": "Feature",
+            "id": i if i % 2 else f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + i * 0.01, 28.0 + i * 0.01]},
+            "properties": {"total_population": 500 + i * 10, "total_hhd": 100 + (i * 7) % 30}
+        }
+        for i in range(100)
+    ]
+    features = ["total_population", "total_hhd"]
+
+    print("=== Testing Dataset Disk Cache ===\n")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        registry = DatasetRegistry(cache_dir=cache_dir)
+        dataset = SpatialDataset.from_features(polygons)
+        registry.register("abc123", dataset)
+        scores = dataset.feature_table.weighted_sum(features, [1, 2])
+        persisted = [name for name in os.listdir(os.path.join(cache_dir, "abc123")) if name.startswith("normalized_")]
+        assert len(persisted) == 1, persisted
+        print(f"  ✅ Normalized matrix persisted as {persisted[0]}")
+
+        # A second registry on the same directory stands in for a restarted or sibling worker
+        reloaded = DatasetRegistry(cache_dir=cache_dir).get("abc123")
+        assert reloaded.ids.tolist() == [p["id"] for p in polygons]
+        print("  ✅ Mixed int and string ids keep their types")
+
+        matrix = reloaded.feature_table.normalized(features)
+        assert isinstance(matrix, np.memmap) and matrix.filename.endswith(persisted[0])
+        assert np.allclose(reloaded.feature_table.weighted_sum(features, [1, 2]), scores)
+        print("  ✅ Reloaded table memory-maps the persisted normalized matrix")
+
+if __name__ == "__main__":
+    test_dataset_cache()
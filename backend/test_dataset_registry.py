@@ -0,0 +1,99 @@
+import json
+
+from cluster_api import app
+
+def test_dataset_registry():
+    """Test uploading a dataset once and referencing it by dataset_id"""
+    client = app.test_client()
+
+    # Sample data
+    feature_collection = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [77.2090, 28.6139]},
+                "properties": {"total_population": 1000, "total_hhd": 200, "is_bank_available": 1}
+            },
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [77.2290, 28.6339]},
+                "properties": {"total_population": 1500, "total_hhd": 300, "is_bank_available": 1}
+            },
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [72.8777, 19.0760]},
+                "properties": {"total_population": 800, "total_hhd": 150, "is_bank_available": 0}
+            },
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [72.8977, 19.0960]},
+                "properties": {"total_population": 1200, "total_hhd": 250, "is_bank_available": 0}
+            }
+        ]
+    }
+
+    features = ["total_population", "total_hhd", "is_bank_available"]
+    weights = [1, 1, 1]
+
+    print("=== Testing Dataset Registry ===\n")
+
+    # Step 1: Register the dataset
+    print("Step 1: Registering dataset...")
+    response = client.post("/api/datasets", data=json.dumps(feature_collection))
+    print(f"  Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    dataset_id = response.get_json()['dataset_id']
+    assert response.get_json()['total_polygons'] == 4
+    print(f"  ✅ Registered dataset {dataset_id} with {response.get_json()['total_polygons']} polygons")
+
+    # Step 2: Re-upload the same bytes, should be recognised without parsing
+    print("\nStep 2: Re-uploading the same dataset...")
+    response = client.post("/api/datasets", data=json.dumps(feature_collection))
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json().get('already_registered')
+    assert response.get_json()['dataset_id'] == dataset_id
+    print("  ✅ Same dataset_id returned")
+
+    # Step 3: Score by dataset_id
+    print("\nStep 3: Scoring by dataset_id...")
+    response = client.post("/api/normalize-score", json={
+        "dataset_id": dataset_id,
+        "features": features,
+        "weights": weights
+    })
+    print(f"  Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    scored = response.get_json()['polygons']
+    assert len(scored) == 4
+    print(f"  ✅ Scored {len(scored)} polygons")
+    for polygon in scored:
+        print(f"     {polygon.get('id')}: {polygon['properties'].get('suitabilityScore')}")
+
+    # Step 4: Cluster by dataset_id
+    print("\nStep 4: Clustering by dataset_id...")
+    response = client.post("/api/cluster", json={
+        "dataset_id": dataset_id,
+        "features": features,
+        "weights": weights,
+        "algorithm": "kmeans",
+        "params": {"n_clusters": 2, "min_polygons_per_cluster": 1, "max_polygons_per_cluster": 100}
+    })
+    print(f"  Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    assert result['total_clusters'] == 2 and result['total_polygons'] == 4
+    print(f"  ✅ Found {result['total_clusters']} clusters with {result['total_polygons']} polygons")
+
+    # Step 5: Unknown dataset_id should be rejected
+    print("\nStep 5: Using an unknown dataset_id...")
+    response = client.post("/api/normalize-score", json={
+        "dataset_id": "does-not-exist",
+        "features": features,
+        "weights": weights
+    })
+    assert response.status_code == 404, response.status_code
+    print("  ✅ Unknown dataset_id rejected with 404")
+
+if __name__ == "__main__":
+    test_dataset_registry()
@@ -0,0 +1,53 @@
+import json
+
+from cluster_api import app
+
+def test_feature_directions():
+    """Test that negative-impact catalog features are inverted and can be overridden per request"""
+    client = app.test_client()
+
+    # Sample data: more households without latrines should mean a lower score
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + i * 0.01, 28.0]},
+            "properties": {"total_hhd_not_having_sanitary_la": i * 10, "total_population": 1000 + i}
+        }
+        for i in range(10)
+    ]
+    features = ["total_hhd_not_having_sanitary_la"]
+
+    print("=== Testing Feature Directions ===\n")
+
+    response = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": [1], "response_mode": "labels"
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    scores = result['suitability_scores']
+    print(f"Inverted features: {result['inverted_features']}")
+    assert result['inverted_features'] == features
+    assert scores[0] > scores[-1], (scores[0], scores[-1])
+    print(f"✅ Fewest households without latrines scores highest ({scores[0]:.2f} vs {scores[-1]:.2f})")
+
+    # Override the catalog direction
+    response = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": [1], "response_mode": "labels",
+        "feature_directions": {"total_hhd_not_having_sanitary_la": "positive"}
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    scores = response.get_json()['suitability_scores']
+    assert scores[0] < scores[-1], (scores[0], scores[-1])
+    print(f"✅ Override restores raw direction ({scores[0]:.2f} vs {scores[-1]:.2f})")
+
+    # Invalid directions are rejected
+    response = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": [1],
+        "feature_directions": {"total_hhd_not_having_sanitary_la": "sideways"}
+    })
+    assert response.status_code == 400, response.status_code
+    print(f"✅ Invalid direction rejected ({response.status_code})")
+
+if __name__ == "__main__":
+    test_feature_directions()
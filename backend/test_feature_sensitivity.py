@@ -0,0 +1,87 @@
+import json
+import random
+import time
+
+from cluster_api import app
+
+def test_feature_sensitivity():
+    """Test closed-form feature sensitivity for fixed clusters"""
+    client = app.test_client()
+
+    # Sample data
+    random.seed(23)
+    polygons = []
+    for i in range(20000):
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "total_hhd_having_piped_water_con": random.randint(0, 300),
+                "no_electricity": random.randint(0, 50)
+            }
+        })
+    features = ["total_population", "total_hhd_having_piped_water_con", "no_electricity"]
+    weights = [1, 2, 1]
+    feature_changes = [
+        {"feature": "total_hhd_having_piped_water_con", "percentChange": 20},
+        {"feature": "no_electricity", "percentChange": -30}
+    ]
+
+    print("=== Testing Analytic Feature Sensitivity ===\n")
+
+    response = client.post("/api/datasets", json={"features": polygons})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    dataset_id = response.get_json()['dataset_id']
+    response = client.post("/api/cluster", json={
+        "dataset_id": dataset_id, "algorithm": "kmeans",
+        "params": {"n_clusters": 5, "max_polygons_per_cluster": 20000},
+        "features": features, "weights": weights, "response_mode": "labels"
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    clusters = response.get_json()['clusters']
+
+    start = time.time()
+    response = client.post("/api/feature-analysis", json={
+        "sensitivity_mode": "analytic", "dataset_id": dataset_id, "features": features, "weights": weights,
+        "original_clusters": clusters, "feature_changes": feature_changes
+    })
+    elapsed = time.time() - start
+    assert response.status_code == 200, response.get_data(as_text=True)
+    sensitivity = response.get_json()['sensitivity_analysis']
+    assert set(sensitivity) == {c['feature'] for c in feature_changes}
+    print(f"✅ Sensitivity for {len(sensitivity)} features in {elapsed:.3f}s")
+    for feature, result in sensitivity.items():
+        print(f"   {feature}: avg change {result['avg_score_change']:+.4f} ({result['sensitivity_level']}), "
+              f"{len(result['clusters'])} clusters")
+        assert len(result['clusters']) == 5
+        # Min-max scores are linear in the change, so marginal effect times percent is the change
+        assert all(abs(c['marginal_effect_per_percent'] * result['percent_change'] - c['score_change']) < 1e-9
+                   for c in result['clusters'])
+        print("✅ Marginal effects match the score changes")
+
+    water = sensitivity['total_hhd_having_piped_water_con']['avg_score_change']
+    electricity = sensitivity['no_electricity']['avg_score_change']
+    assert water > 0 and electricity > 0, (water, electricity)
+    print("✅ More piped water and fewer unelectrified households both raise scores")
+
+    # Inline polygons may repeat an id; every row carrying a listed id belongs to the cluster
+    repeated = [{**p, "id": f"village_{i % 50}"} for i, p in enumerate(polygons[:200])]
+    response = client.post("/api/feature-analysis", json={
+        "sensitivity_mode": "analytic", "polygons": repeated, "features": features, "weights": weights,
+        "original_clusters": [{"cluster_number": 1, "polygon_ids": ["village_1", "village_2"]}],
+        "feature_changes": feature_changes
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    print("✅ Repeated polygon ids accepted")
+
+    response = client.post("/api/feature-analysis", json={
+        "sensitivity_mode": "analytic", "dataset_id": dataset_id, "features": features, "weights": weights,
+        "feature_changes": feature_changes, "normalization": "rank"
+    })
+    assert response.status_code == 400, response.status_code
+    print(f"✅ Rank normalization rejected ({response.status_code})")
+
+if __name__ == "__main__":
+    test_feature_sensitivity()
@@ -0,0 +1,56 @@
+import json
+import time
+
+from cluster_api import app
+
+def test_geometry_cache():
+    """Test that re-posting the same polygons gives identical clusters from cached geometry summaries"""
+    client = app.test_client()
+
+    # Sample data: small square villages on a grid
+    polygons = []
+    for i in range(2000):
+        lng, lat = 77.0 + (i % 50) * 0.02, 28.0 + (i // 50) * 0.02
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Polygon", "coordinates": [[
+                [lng, lat], [lng + 0.01, lat], [lng + 0.01, lat + 0.01], [lng, lat + 0.01], [lng, lat]
+            ]]},
+            "properties": {"total_population": 500 + i}
+        })
+
+    body = {
+        "polygons": polygons,
+        "algorithm": "kmeans",
+        "params": {"n_clusters": 5, "min_polygons_per_cluster": 1, "max_polygons_per_cluster": 5000},
+        "response_mode": "labels"
+    }
+
+    print("=== Testing Geometry Summary Cache ===\n")
+
+    results = []
+    for attempt in ("first", "repeat"):
+        start = time.time()
+        response = client.post("/api/cluster", json=body)
+        elapsed = time.time() - start
+        print(f"  {attempt} request: status {response.status_code} in {elapsed:.2f}s")
+        assert response.status_code == 200, response.get_data(as_text=True)
+        results.append(response.get_json())
+
+    same = json.dumps(results[0]['clusters'], sort_keys=True) == json.dumps(results[1]['clusters'], sort_keys=True)
+    assert same, "Clusters differ across identical requests"
+    print("  ✅ Cluster centroids identical across requests")
+
+    # Move one village; its centroid must be recomputed rather than served from the cache
+    moved = json.loads(json.dumps(body))
+    ring = moved["polygons"][0]["geometry"]["coordinates"][0]
+    moved["polygons"][0]["geometry"]["coordinates"][0] = [[x + 5.0, y] for x, y in ring]
+    response = client.post("/api/cluster", json=moved)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    changed = json.dumps(response.get_json()['clusters'], sort_keys=True) != json.dumps(results[0]['clusters'], sort_keys=True)
+    assert changed, "Edited geometry was served from the cache"
+    print("  ✅ Edited geometry picked up")
+
+if __name__ == "__main__":
+    test_geometry_cache()
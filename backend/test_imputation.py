@@ -0,0 +1,58 @@
+import json
+import random
+
+from cluster_api import app
+
+def test_imputation():
+    """Test the missing-value imputation methods and reported null counts"""
+    client = app.test_client()
+
+    # Sample data: sown area follows latitude and is missing for every fifth village
+    random.seed(23)
+    polygons = []
+    for i in range(5000):
+        lng, lat = 77.0 + random.random(), 28.0 + random.random()
+        properties = {"total_population": random.randint(100, 5000)}
+        if i % 5:
+            properties["net_sown_area_in_hac"] = (lat - 28.0) * 300
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [lng, lat]},
+            "properties": properties
+        })
+    features = ["total_population", "net_sown_area_in_hac"]
+
+    print("=== Testing Missing-value Imputation ===\n")
+
+    response = client.post("/api/datasets", json={"features": polygons})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    dataset_id = response.get_json()['dataset_id']
+    print(f"Null counts: {response.get_json().get('null_counts')}\n")
+    assert response.get_json()['null_counts']['net_sown_area_in_hac'] == 1000
+
+    missing_means = {}
+    for method in ["zero", "median", "mean", "neighbor"]:
+        response = client.post("/api/normalize-score", json={
+            "dataset_id": dataset_id, "features": features, "weights": [1, 1],
+            "imputation": method, "response_mode": "labels"
+        })
+        assert response.status_code == 200, f"{method}: {response.get_data(as_text=True)}"
+        result = response.get_json()
+        assert result['imputation'] == method
+        scores = result['suitability_scores']
+        missing = [scores[i] for i in range(0, len(scores), 5)]
+        missing_means[method] = sum(missing) / len(missing)
+        print(f"✅ {method:>8}: mean score of villages with missing area {missing_means[method]:.3f}, null counts {result['null_counts']}")
+    # Filling with a typical value scores missing villages above counting them as zero
+    assert missing_means['median'] > missing_means['zero'] and missing_means['mean'] > missing_means['zero']
+
+    # Unknown methods are rejected
+    response = client.post("/api/normalize-score", json={
+        "dataset_id": dataset_id, "features": features, "weights": [1, 1], "imputation": "knn"
+    })
+    assert response.status_code == 400, response.status_code
+    print(f"✅ Unknown imputation rejected ({response.status_code})")
+
+if __name__ == "__main__":
+    test_imputation()
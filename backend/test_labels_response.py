@@ -0,0 +1,108 @@
+import json
+
+import msgpack
+
+from cluster_api import app
+
+def test_labels_response():
+    """Test the label-only response mode against the full polygon response"""
+    client = app.test_client()
+
+    # Sample data
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.2 + (i % 5) * 0.01, 28.6 + (i // 5) * 0.5]},
+            "properties": {"total_population": 800 + i * 50, "total_hhd": 150 + i * 10, "is_bank_available": i % 2}
+        }
+        for i in range(20)
+    ]
+
+    features = ["total_population", "total_hhd", "is_bank_available"]
+    weights = [1, 1, 1]
+
+    print("=== Testing Label-only Response Mode ===\n")
+
+    # Step 1: Full and label-only scoring responses
+    print("Step 1: Scoring with response_mode='labels'...")
+    full = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": weights
+    })
+    labels = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": weights, "response_mode": "labels"
+    })
+    print(f"  Status Codes: {full.status_code}, {labels.status_code}")
+    assert full.status_code == 200, full.get_data(as_text=True)
+    assert labels.status_code == 200, labels.get_data(as_text=True)
+    result = labels.get_json()
+    full_scores = {p['id']: p['properties']['suitabilityScore'] for p in full.get_json()['polygons']}
+    label_scores = dict(zip(result['polygon_ids'], result['suitability_scores']))
+    assert full_scores == label_scores
+    assert len(labels.data) < len(full.data)
+    print("  ✅ Scores match full response")
+    print(f"  Response size: {len(full.data)} bytes -> {len(labels.data)} bytes")
+
+    # Step 2: Label-only clustering response
+    print("\nStep 2: Clustering with response_mode='labels'...")
+    response = client.post("/api/cluster", json={
+        "polygons": polygons,
+        "algorithm": "kmeans",
+        "params": {"n_clusters": 4, "min_polygons_per_cluster": 1, "max_polygons_per_cluster": 100},
+        "response_mode": "labels"
+    })
+    print(f"  Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    assert len(result['polygon_ids']) == len(result['cluster_numbers']) == len(polygons)
+    assert 'polygons' not in result
+    print(f"  ✅ {len(result['polygon_ids'])} polygon ids, {len(result['cluster_numbers'])} cluster numbers, {result['total_clusters']} clusters")
+
+    # Step 3: Unknown response_mode should be rejected
+    print("\nStep 3: Using an unknown response_mode...")
+    response = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": weights, "response_mode": "everything"
+    })
+    assert response.status_code == 400, response.status_code
+    print("  ✅ Unknown response_mode rejected with 400")
+
+def test_labels_id_types():
+    """Test that polygon ids keep their JSON type across response modes"""
+    client = app.test_client()
+
+    # Integer ids, with one string id mixed in
+    polygons = [
+        {
+            "type": "Feature",
+            "id": i if i else "village_0",
+            "geometry": {"type": "Point", "coordinates": [77.2 + (i % 5) * 0.01, 28.6 + (i // 5) * 0.5]},
+            "properties": {"total_population": 800 + i * 50, "total_hhd": 150 + i * 10}
+        }
+        for i in range(20)
+    ]
+    expected = [p["id"] for p in polygons]
+    body = {
+        "polygons": polygons, "algorithm": "kmeans", "features": ["total_population", "total_hhd"], "weights": [1, 1],
+        "params": {"n_clusters": 4, "min_polygons_per_cluster": 1, "max_polygons_per_cluster": 100}
+    }
+
+    print("=== Testing Polygon Id Types ===\n")
+
+    full = client.post("/api/cluster", json=body).get_json()
+    assert [p["id"] for p in full["polygons"]] == expected
+    labels = client.post("/api/cluster", json={**body, "response_mode": "labels"}).get_json()
+    assert labels["polygon_ids"] == expected
+    cluster_ids = [i for c in labels["clusters"] for i in c["polygon_ids"]]
+    assert sorted(map(str, cluster_ids)) == sorted(map(str, expected))
+    assert {type(i) for i in cluster_ids} == {type(i) for i in labels["polygon_ids"]} == {int, str}
+    print("  ✅ Label ids match the GeoJSON and cluster polygon ids")
+
+    response = client.post("/api/cluster", json={**body, "response_mode": "labels"},
+                           headers={"Accept": "application/x-msgpack"})
+    assert response.status_code == 200, response.status_code
+    assert msgpack.unpackb(response.data, raw=False)["polygon_ids"] == expected
+    print("  ✅ MessagePack ids keep their type")
+
+if __name__ == "__main__":
+    test_labels_response()
+    test_labels_id_types()
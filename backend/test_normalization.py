@@ -0,0 +1,98 @@
+import io
+import json
+import random
+
+from cluster_api import app
+from dataset_store import SpatialDataset, StreamingGeoJSONParser, build_dataset_from_stream
+from feature_store import ColumnStats
+
+def test_normalization():
+    """Test the normalization strategies on a dataset with one extreme outlier"""
+    client = app.test_client()
+
+    # Sample data: one village with a huge sown area
+    random.seed(5)
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "is_bank_available": random.randint(0, 1),
+                "net_sown_area_in_hac": 1000000.0 if i == 0 else random.random() * 300
+            }
+        }
+        for i in range(1000)
+    ]
+    features = ["total_population", "is_bank_available", "net_sown_area_in_hac"]
+
+    print("=== Testing Normalization Strategies ===\n")
+
+    response = client.post("/api/datasets", json={"features": polygons})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    dataset_id = response.get_json()['dataset_id']
+
+    medians = {}
+    for method in ["minmax", "robust", "zscore", "rank"]:
+        response = client.post("/api/normalize-score", json={
+            "dataset_id": dataset_id, "features": ["net_sown_area_in_hac"], "weights": [1],
+            "normalization": method, "response_mode": "labels"
+        })
+        assert response.status_code == 200, f"{method}: {response.get_data(as_text=True)}"
+        scores = sorted(response.get_json()['suitability_scores'])
+        medians[method] = scores[len(scores) // 2]
+        assert 7.0 <= scores[0] and scores[-1] <= 10.0
+        print(f"✅ {method:>6}: median score {medians[method]:.3f}, min {scores[0]:.3f}, max {scores[-1]:.3f}")
+    # The outlier squashes every other village to the bottom under min-max, but not under robust scaling
+    assert medians['robust'] > medians['minmax'] + 1
+
+    # Batch scoring accepts the same option
+    response = client.post("/api/batch-score", json={
+        "dataset_id": dataset_id, "features": features, "weights_matrix": [[1, 1, 1]], "normalization": "robust"
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    print(f"✅ Batch scoring with robust normalization ({response.status_code})")
+
+    # Unknown strategies are rejected
+    response = client.post("/api/normalize-score", json={
+        "dataset_id": dataset_id, "features": features, "weights": [1, 1, 1], "normalization": "log"
+    })
+    assert response.status_code == 400, response.status_code
+    print(f"✅ Unknown normalization rejected ({response.status_code})")
+
+def test_ingest_statistics():
+    """Test that column statistics are computed while a dataset is ingested, inline or streamed"""
+    random.seed(6)
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "is_bank_available": random.randint(0, 1),
+                "net_sown_area_in_hac": None if i % 9 == 0 else random.random() * 300
+            }
+        }
+        for i in range(500)
+    ]
+
+    print("=== Testing Ingest Statistics ===\n")
+
+    inline = SpatialDataset.from_features(polygons)
+    parser = StreamingGeoJSONParser(io.BytesIO(json.dumps({"type": "FeatureCollection", "features": polygons}).encode('utf-8')))
+    streamed, _ = build_dataset_from_stream(parser)
+    for dataset in (inline, streamed):
+        for name in dataset.feature_names:
+            column = dataset.feature_table.column(name)
+            stats = column.metadata()['stats']
+            assert stats is not None, name
+            assert stats == ColumnStats.from_values(column.decode(fill=0.0)).to_dict(), name
+    assert inline.feature_table.column("net_sown_area_in_hac").metadata()['stats'] == \
+        streamed.feature_table.column("net_sown_area_in_hac").metadata()['stats']
+    print("  ✅ Statistics ready after ingest and equal to those of the decoded columns")
+
+if __name__ == "__main__":
+    test_normalization()
+    test_ingest_statistics()
@@ -0,0 +1,63 @@
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cluster_api import app
+
+def test_parquet_upload():
+    """Test registering a Parquet dataset and scoring it by dataset_id"""
+    client = app.test_client()
+
+    # Sample data with lon/lat columns instead of GeoJSON geometry
+    table = pa.table({
+        "id": ["village_001", "village_002", "village_003", "village_004"],
+        "lon": [77.2090, 77.2290, 72.8777, 72.8977],
+        "lat": [28.6139, 28.6339, 19.0760, 19.0960],
+        "village_name": ["Alpha", "Beta", "Gamma", "Delta"],
+        "total_population": [1000, 1500, 800, 1200],
+        "total_hhd": [200, 300, 150, None],
+        "is_bank_available": [True, True, False, False]
+    })
+
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+
+    features = ["total_population", "total_hhd", "is_bank_available"]
+    weights = [1, 1, 1]
+
+    print("=== Testing Parquet Upload ===\n")
+
+    print("Step 1: Uploading Parquet file...")
+    response = client.post(
+        "/api/datasets",
+        data={"file": (io.BytesIO(buffer.getvalue()), "villages.parquet", "application/vnd.apache.parquet")},
+        content_type="multipart/form-data"
+    )
+    print(f"  Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    result = response.get_json()
+    dataset_id = result['dataset_id']
+    assert result['total_polygons'] == 4
+    assert set(features) <= set(result['feature_names'])
+    print(f"  ✅ Registered dataset {dataset_id} with {result['total_polygons']} rows")
+    print(f"  📊 Feature columns: {result['feature_names']}")
+
+    print("\nStep 2: Scoring by dataset_id...")
+    response = client.post("/api/normalize-score", json={
+        "dataset_id": dataset_id,
+        "features": features,
+        "weights": weights
+    })
+    print(f"  Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    polygons = response.get_json()['polygons']
+    assert [p['id'] for p in polygons] == table.column("id").to_pylist()
+    for polygon in polygons:
+        props = polygon['properties']
+        assert props.get('village_name') is not None
+        print(f"     {polygon['id']} ({props.get('village_name')}): {props.get('suitabilityScore'):.2f}")
+    print("  ✅ Parquet rows scored by dataset_id")
+
+if __name__ == "__main__":
+    test_parquet_upload()
@@ -0,0 +1,85 @@
+import json
+import random
+import time
+
+from cluster_api import app
+
+def test_rankings():
+    """Test paged village rankings with numeric and text filters"""
+    client = app.test_client()
+
+    # Sample data
+    random.seed(17)
+    states = ["Maharashtra", "Bihar", "Kerala", "Punjab"]
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "state_name": random.choice(states),
+                "total_population": random.randint(100, 5000),
+                "is_bank_available": random.randint(0, 1),
+                "net_sown_area_in_hac": random.random() * 300
+            }
+        }
+        for i in range(20000)
+    ]
+    features = ["total_population", "is_bank_available", "net_sown_area_in_hac"]
+
+    print("=== Testing Village Rankings ===\n")
+
+    response = client.post("/api/datasets", json={"features": polygons})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    dataset_id = response.get_json()['dataset_id']
+    print(f"Registered dataset {dataset_id} with text columns {response.get_json().get('category_columns')}\n")
+
+    request_body = {
+        "dataset_id": dataset_id, "features": features, "weights": [2, 1, 1],
+        "filters": {"state_name": "Maharashtra"}, "page_size": 100
+    }
+    for attempt in ("first", "cached"):
+        start = time.time()
+        response = client.post("/api/rankings", json=request_body)
+        elapsed = time.time() - start
+        assert response.status_code == 200, response.get_data(as_text=True)
+        result = response.get_json()
+        print(f"  {attempt}: {len(result['villages'])} of {result['total_matches']} Maharashtra villages in {elapsed * 1000:.0f} ms")
+
+    villages = result['villages']
+    assert len(villages) == 100
+    assert result['total_matches'] == sum(p['properties']['state_name'] == "Maharashtra" for p in polygons)
+    assert all(polygons[int(v['id'].split('_')[1])]['properties']['state_name'] == "Maharashtra" for v in villages)
+    print("  ✅ Every village is in Maharashtra")
+    assert all(a['suitabilityScore'] >= b['suitabilityScore'] for a, b in zip(villages, villages[1:]))
+    print("  ✅ Villages are ordered by score")
+    print(f"  Top village: {villages[0]['id']} ({villages[0]['suitabilityScore']:.3f})")
+
+    # Page 2 continues where page 1 stopped
+    response = client.post("/api/rankings", json={**request_body, "page": 2})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    page_2 = response.get_json()['villages']
+    assert page_2[0]['rank'] == 101 and page_2[0]['suitabilityScore'] <= villages[-1]['suitabilityScore']
+    print(f"  ✅ Page 2 starts at rank {page_2[0]['rank']}")
+
+    # Numeric and text conditions combined
+    response = client.post("/api/rankings", json={
+        **request_body,
+        "filters": [
+            {"feature": "state_name", "op": "in", "value": ["kerala", "punjab"]},
+            {"feature": "is_bank_available", "op": "==", "value": 1}
+        ]
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    expected = sum(p['properties']['state_name'] in ("Kerala", "Punjab") and p['properties']['is_bank_available'] == 1
+                   for p in polygons)
+    assert response.get_json()['total_matches'] == expected
+    print(f"  ✅ Combined filters: {response.get_json()['total_matches']} matches")
+
+    # Unknown filter columns are rejected
+    response = client.post("/api/rankings", json={**request_body, "filters": {"district": "Pune"}})
+    assert response.status_code == 400, response.status_code
+    print(f"  ✅ Unknown filter column rejected ({response.status_code})")
+
+if __name__ == "__main__":
+    test_rankings()
@@ -0,0 +1,130 @@
+import json
+import random
+import time
+
+import cluster_api
+from cluster_api import app
+
+def test_scenario_cache():
+    """Test seeded scenarios and the scenario result cache"""
+    client = app.test_client()
+
+    # Sample data
+    random.seed(21)
+    polygons = []
+    for i in range(10000):
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "net_sown_area_in_hac": random.uniform(0, 300)
+            }
+        })
+    scenario = {
+        "featureChanges": [{"feature": "total_population", "percentChange": -30}],
+        "villagePercentage": 40, "randomnessFactor": 15
+    }
+
+    print("=== Testing Seeded Scenarios and Result Cache ===\n")
+
+    response = client.post("/api/datasets", json={"features": polygons})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    dataset_id = response.get_json()['dataset_id']
+
+    def run(config):
+        start = time.time()
+        response = client.post("/api/cluster", json={
+            "dataset_id": dataset_id, "algorithm": "kmeans",
+            "params": {"n_clusters": 5, "max_polygons_per_cluster": 10000},
+            "features": ["total_population", "net_sown_area_in_hac"], "weights": [1, 1],
+            "response_mode": "labels", "scenarioConfig": config
+        })
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return response.get_json(), time.time() - start
+
+    first, first_time = run(scenario)
+    second, second_time = run(scenario)
+    print(f"✅ First run {first_time:.3f}s (seed {first['scenario_seed']}), repeat {second_time:.3f}s")
+    assert second['scenario_cached']
+    print("✅ Repeat served from cache")
+    assert first['suitability_scores'] == second['suitability_scores']
+    print("✅ Repeat returns the same scores")
+
+    seeded, _ = run({**scenario, "seed": 42})
+    assert seeded['suitability_scores'] != first['suitability_scores']
+    print("✅ A different seed draws different villages")
+
+    # Clearing the dataset clears its cached results
+    client.delete(f"/api/datasets/{dataset_id}")
+    response = client.post("/api/datasets", json={"features": polygons})
+    assert response.get_json()['dataset_id'] == dataset_id
+    again, _ = run(scenario)
+    assert not again['scenario_cached']
+    print("✅ Cache dropped with the dataset")
+    assert again['suitability_scores'] == first['suitability_scores']
+    print("✅ Same config reproduces the same scores")
+
+def test_scenario_cache_baseline():
+    """Test that cached scenario results follow the retained baseline their clusters were matched to"""
+    client = app.test_client()
+
+    random.seed(24)
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "net_sown_area_in_hac": random.uniform(0, 300)
+            }
+        }
+        for i in range(2000)
+    ]
+    response = client.post("/api/datasets", json={"features": polygons})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    dataset_id = response.get_json()['dataset_id']
+    request_data = {
+        "dataset_id": dataset_id, "algorithm": "kmeans",
+        "params": {"n_clusters": 4, "max_polygons_per_cluster": 2000, "random_state": 1},
+        "features": ["total_population", "net_sown_area_in_hac"], "weights": [1, 1], "response_mode": "labels"
+    }
+    scenario = {
+        **request_data,
+        "scenarioConfig": {"featureChanges": [{"feature": "total_population", "percentChange": 40}],
+                           "villagePercentage": 50, "randomnessFactor": 5, "seed": 9}
+    }
+
+    print("=== Testing Scenario Cache and Baselines ===\n")
+
+    def run(body):
+        response = client.post("/api/cluster", json=body)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return response.get_json()
+
+    cluster_api.baseline_cache.discard(dataset_id)
+    unmatched = run(scenario)
+    assert 'cluster_matching' not in unmatched
+    print("✅ Without a retained baseline the scenario is not matched")
+
+    # Retaining a baseline must not serve the unmatched result from the cache
+    baseline = run(request_data)
+    matched = run(scenario)
+    assert not matched['scenario_cached'] and matched['baseline_id'] == baseline['baseline_id']
+    assert 'cluster_matching' in matched
+    again = run(scenario)
+    assert again['scenario_cached'] and again['cluster_matching'] == matched['cluster_matching']
+    print("✅ Matched result cached once a baseline is retained")
+
+    # Once that baseline is gone, neither is its matching
+    cluster_api.baseline_cache.discard(dataset_id)
+    dropped = run(scenario)
+    assert 'cluster_matching' not in dropped
+    assert dropped['suitability_scores'] == matched['suitability_scores']
+    print("✅ Matching dropped with the baseline")
+
+if __name__ == "__main__":
+    test_scenario_cache()
+    test_scenario_cache_baseline()
@@ -0,0 +1,115 @@
+import json
+import random
+
+import numpy as np
+
+import scenarios
+from cluster_api import app
+from dataset_store import SpatialDataset
+
+def test_scenario_ensemble():
+    """Test seeded Monte Carlo scenario ensembles and their percentile bands"""
+    client = app.test_client()
+
+    # Sample data
+    random.seed(20)
+    polygons = []
+    for i in range(3000):
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "net_sown_area_in_hac": random.uniform(0, 300)
+            }
+        })
+
+    def run(ensemble):
+        return client.post("/api/cluster", json={
+            "polygons": polygons, "algorithm": "kmeans", "params": {"n_clusters": 4},
+            "features": ["total_population", "net_sown_area_in_hac"], "weights": [1, 1],
+            "response_mode": "labels",
+            "scenarioConfig": {
+                "featureChanges": [{"feature": "total_population", "percentChange": 20}],
+                "villagePercentage": 30, "randomnessFactor": 10, "ensemble": ensemble
+            }
+        })
+
+    print("=== Testing Scenario Ensembles ===\n")
+
+    response = run({"replicates": 50, "seed": 7, "percentiles": [5, 50, 95]})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    for cluster in result['clusters']:
+        bands = cluster['avg_suitability_score_bands']
+        assert bands['p5'] <= bands['p50'] <= bands['p95'], bands
+        print(f"✅ Cluster {cluster['cluster_number']}: "
+              f"avg score {cluster['avg_suitability_score']:.3f}, 90% band {bands['p5']:.3f}-{bands['p95']:.3f}")
+
+    villages = result['ensemble']['village_scores']
+    assert len(result['ensemble']['polygon_ids']) == len(polygons)
+    assert all(lo <= hi for lo, hi in zip(villages['p5'], villages['p95']))
+    widths = [hi - lo for lo, hi in zip(villages['p5'], villages['p95'])]
+    print(f"✅ Village bands for {len(result['ensemble']['polygon_ids'])} villages, mean 90% width {sum(widths) / len(widths):.3f}")
+
+    # The same seed reproduces the ensemble
+    again = run({"replicates": 50, "seed": 7}).get_json()
+    assert again['ensemble']['village_scores']['mean'] == villages['mean']
+    print("✅ Same seed gives the same ensemble")
+
+    # Replicate counts are bounded
+    response = run({"replicates": 100000})
+    assert response.status_code == 400, response.status_code
+    print(f"✅ Oversized ensemble rejected ({response.status_code})")
+
+def test_threaded_ensemble():
+    """Test that threaded replicate scoring and chunked summaries match the single-threaded, unchunked results"""
+    random.seed(21)
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "net_sown_area_in_hac": random.uniform(0, 300)
+            },
+            "cluster": i % 4 + 1
+        }
+        for i in range(500)
+    ]
+    dataset = SpatialDataset.from_features(polygons)
+    config = {
+        "featureChanges": [{"feature": "total_population", "percentChange": 20}],
+        "villagePercentage": 30, "randomnessFactor": 10
+    }
+    args = (dataset, config, ["total_population", "net_sown_area_in_hac"], [1, 1], "minmax", (True, True), "zero")
+
+    print("=== Testing Threaded Ensembles ===\n")
+
+    pool_min_scores, chunk_scores = scenarios.ENSEMBLE_POOL_MIN_SCORES, scenarios.ENSEMBLE_SUMMARY_CHUNK_SCORES
+    try:
+        # Force the thread pool, and summaries over several small chunks
+        scenarios.ENSEMBLE_POOL_MIN_SCORES = 0
+        scenarios.ENSEMBLE_SUMMARY_CHUNK_SCORES = 20 * 64
+        _, single = scenarios.score_scenario_ensemble(*args, replicates=20, seed=3, workers=1)
+        _, threaded = scenarios.score_scenario_ensemble(*args, replicates=20, seed=3, workers=4)
+        assert np.array_equal(np.asarray(single), np.asarray(threaded))
+        print("  ✅ Four threads give the same scores as one")
+
+        rows = np.arange(0, len(dataset), 3)
+        villages, clusters = scenarios.summarize_ensemble(threaded, dataset.labels, rows, [5, 50, 95])
+        dense = np.asarray(threaded)
+        assert np.allclose(villages['mean'], dense[:, rows].mean(axis=0))
+        assert np.allclose(villages['p95'], np.percentile(dense[:, rows], 95, axis=0))
+        for number, bands in clusters.items():
+            means = dense[:, dataset.labels == number].mean(axis=1)
+            assert np.isclose(bands['mean'], means.mean()) and np.isclose(bands['p5'], np.percentile(means, 5))
+        print(f"  ✅ Chunked summaries match the whole-matrix reductions for {len(clusters)} clusters")
+    finally:
+        scenarios.ENSEMBLE_POOL_MIN_SCORES, scenarios.ENSEMBLE_SUMMARY_CHUNK_SCORES = pool_min_scores, chunk_scores
+
+if __name__ == "__main__":
+    test_scenario_ensemble()
+    test_threaded_ensemble()
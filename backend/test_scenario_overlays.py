@@ -0,0 +1,85 @@
+import json
+import random
+
+from cluster_api import app
+
+def test_scenario_overlays():
+    """Test targeted scenarios: filters, bounding boxes, polygon ids and clusters"""
+    client = app.test_client()
+
+    # Sample data: two states side by side
+    random.seed(19)
+    polygons = []
+    for i in range(2000):
+        lng, lat = 77.0 + random.random(), 28.0 + random.random()
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [lng, lat]},
+            "properties": {
+                "state_name": "Goa" if lng < 77.5 else "Kerala",
+                "total_population": random.randint(100, 5000),
+                "net_sown_area_in_hac": random.uniform(0, 300)
+            }
+        })
+    original = {p["id"]: p["properties"]["total_population"] for p in polygons}
+    features = ["total_population", "net_sown_area_in_hac"]
+
+    def changed_ids(result):
+        return {p["id"] for p in result["polygons"] if p["properties"]["total_population"] != original[p["id"]]}
+
+    def run(target, polygons=polygons):
+        response = client.post("/api/cluster", json={
+            "polygons": polygons, "algorithm": "kmeans", "params": {"n_clusters": 3},
+            "features": features, "weights": [1, 1],
+            "scenarioConfig": {
+                "featureChanges": [{"feature": "total_population", "percentChange": -50}],
+                "villagePercentage": 100, "randomnessFactor": 0, "target": target
+            }
+        })
+        return response
+
+    print("=== Testing Scenario Targets ===\n")
+
+    response = run({"filters": {"state_name": "Goa"}})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    goa = {p["id"] for p in polygons if p["properties"]["state_name"] == "Goa"}
+    changed = changed_ids(response.get_json())
+    assert changed == goa
+    print(f"✅ Filter target changed {len(changed)} of {len(goa)} Goa villages")
+
+    response = run({"bbox": [77.0, 28.0, 77.25, 28.25]})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    inside = {p["id"] for p in polygons
+              if p["geometry"]["coordinates"][0] <= 77.25 and p["geometry"]["coordinates"][1] <= 28.25}
+    changed = changed_ids(response.get_json())
+    assert changed == inside
+    print(f"✅ Bounding box target changed {len(changed)} of {len(inside)} villages")
+
+    response = run({"polygon_ids": ["village_1", "village_2"]})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    changed = changed_ids(response.get_json())
+    assert changed == {"village_1", "village_2"}
+    print(f"✅ Polygon id target changed {sorted(changed)}")
+
+    # Cluster numbers come from a previous clustering run's polygons
+    response = client.post("/api/cluster", json={
+        "polygons": polygons, "algorithm": "kmeans", "params": {"n_clusters": 3},
+        "features": features, "weights": [1, 1]
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    clustered = response.get_json()
+    cluster = clustered["clusters"][0]
+    response = run({"clusters": [cluster["cluster_number"]]}, clustered["polygons"])
+    assert response.status_code == 200, response.get_data(as_text=True)
+    changed = changed_ids(response.get_json())
+    assert changed == set(cluster['polygon_ids'])
+    print(f"✅ Cluster target changed {len(changed)} of {len(cluster['polygon_ids'])} villages")
+
+    # Malformed targets are rejected
+    response = run({"bbox": [77.0, 28.0]})
+    assert response.status_code == 400, response.status_code
+    print(f"✅ Malformed bbox rejected ({response.status_code})")
+
+if __name__ == "__main__":
+    test_scenario_overlays()
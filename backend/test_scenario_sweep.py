@@ -0,0 +1,72 @@
+import json
+import random
+
+from cluster_api import app
+
+def test_scenario_sweep():
+    """Test the scenario sweep endpoint's score curves"""
+    client = app.test_client()
+
+    # Sample data
+    random.seed(22)
+    polygons = []
+    for i in range(10000):
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "state_name": "Goa" if i % 2 else "Kerala",
+                "total_population": random.randint(100, 5000),
+                "total_hhd_having_piped_water_con": random.randint(0, 300),
+                "no_electricity": random.randint(0, 50)
+            }
+        })
+    request_data = {
+        "polygons": polygons,
+        "features": ["total_population", "total_hhd_having_piped_water_con", "no_electricity"],
+        "weights": [1, 2, 1],
+        "sweep": [
+            {"feature": "total_hhd_having_piped_water_con", "min": -50, "max": 100, "steps": 7},
+            {"feature": "no_electricity", "percent_changes": [-50, 0, 50]}
+        ],
+        "algorithm": "kmeans",
+        "params": {"n_clusters": 4, "max_polygons_per_cluster": 10000},
+        "top_k": 20
+    }
+
+    print("=== Testing Scenario Sweeps ===\n")
+
+    response = client.post("/api/scenario-sweep", json=request_data)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    assert [len(curve['percent_changes']) for curve in result['curves']] == [7, 3]
+    for curve in result['curves']:
+        changes = ", ".join(f"{p:+.0f}%: {c:+.3f}" for p, c in zip(curve['percent_changes'], curve['mean_score_change']))
+        print(f"✅ {curve['feature']}: {changes}")
+        print(f"   {len(curve['clusters'])} cluster curves, top-{result['top_k']} retained {curve['top_k_retained']}")
+
+    water = result['curves'][0]['mean_score_change']
+    assert water == sorted(water)
+    print("✅ More piped water raises scores")
+    electricity = result['curves'][1]['mean_score_change']
+    assert electricity == sorted(electricity, reverse=True)
+    print("✅ More unelectrified households lower scores")
+
+    # Targeted sweep with re-clustering per point
+    response = client.post("/api/scenario-sweep", json={
+        **request_data, "target": {"filters": {"state_name": "Goa"}}, "recluster": True
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    assert result['targeted_polygons'] == sum(p['properties']['state_name'] == "Goa" for p in polygons)
+    assert len(result['curves'][0]['reclustered']) == 7
+    print(f"✅ Targeted {result['targeted_polygons']} villages, {len(result['curves'][0]['reclustered'])} re-clustered points")
+
+    # Rank normalization has no fixed scale to sweep against
+    response = client.post("/api/scenario-sweep", json={**request_data, "normalization": "rank"})
+    assert response.status_code == 400, response.status_code
+    print(f"✅ Rank normalization rejected ({response.status_code})")
+
+if __name__ == "__main__":
+    test_scenario_sweep()
@@ -0,0 +1,105 @@
+import json
+import random
+
+import numpy as np
+
+from cluster_api import app
+from dataset_store import SpatialDataset
+
+def test_spatial_dataset():
+    """Test the columnar SpatialDataset round trip and clustering registered datasets by id"""
+    client = app.test_client()
+
+    # Sample data: uploaded scores and cluster numbers echoed from an earlier response
+    random.seed(11)
+    polygons = []
+    for i in range(200):
+        polygons.append({
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "state_name": "Goa" if i % 2 else "Kerala",
+                "suitabilityScore": i / 200
+            },
+            "cluster": i % 3 + 1
+        })
+    features = ["total_population"]
+
+    print("=== Testing SpatialDataset ===\n")
+
+    # Step 1: Columns built from GeoJSON features
+    print("Step 1: Building a dataset from features...")
+    dataset = SpatialDataset.from_features(polygons)
+    assert len(dataset) == len(polygons)
+    assert dataset.ids.tolist() == [p["id"] for p in polygons]
+    assert np.allclose(dataset.coords, [p["geometry"]["coordinates"] for p in polygons])
+    assert dataset.valid_mask.all()
+    assert dataset.feature_names == ["total_population"]
+    assert "state_name" in dataset.feature_table.categories
+    assert dataset.scores.tolist() == [i / 200 for i in range(len(polygons))]
+    assert dataset.labels.tolist() == [i % 3 + 1 for i in range(len(polygons))]
+    assert not dataset.scored
+    print(f"  ✅ {len(dataset)} rows, features {dataset.feature_names}, uploaded scores and clusters kept")
+
+    # Step 2: Materializing features returns the uploaded properties and clusters
+    print("\nStep 2: Round trip back to GeoJSON...")
+    output = dataset.to_features([0, 5])
+    assert [f["id"] for f in output] == ["village_0", "village_5"]
+    assert output[1]["properties"] == polygons[5]["properties"]
+    assert output[1]["cluster"] == polygons[5]["cluster"]
+    dataset.scores = dataset.scores * 2
+    dataset.scored = True
+    assert dataset.to_features([5])[0]["properties"]["suitabilityScore"] == 2 * polygons[5]["properties"]["suitabilityScore"]
+    print("  ✅ Properties, clusters and pipeline scores materialized")
+
+    # Step 3: Cluster statistics agree with the member scores
+    print("\nStep 3: Clustering inline polygons...")
+    response = client.post("/api/cluster", json={
+        "polygons": polygons, "algorithm": "kmeans",
+        "params": {"n_clusters": 4, "min_polygons_per_cluster": 1, "max_polygons_per_cluster": 200}
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    scores = {p["id"]: p["properties"]["suitabilityScore"] for p in polygons}
+    assert sum(c["count"] for c in result["clusters"]) == len(polygons)
+    for cluster in result["clusters"]:
+        members = [scores[i] for i in cluster["polygon_ids"]]
+        assert cluster["count"] == len(members)
+        assert abs(cluster["avg_suitability_score"] - sum(members) / len(members)) < 1e-9
+        assert cluster["min_suitability_score"] == min(members) and cluster["max_suitability_score"] == max(members)
+    numbers = {p["id"]: p["cluster"] for p in result["polygons"]}
+    assert all(numbers[i] == c["cluster_number"] for c in result["clusters"] for i in c["polygon_ids"])
+    print(f"  ✅ Statistics for {len(result['clusters'])} clusters match their members")
+
+    # Step 4: A registered dataset without scores cannot be clustered on its own
+    print("\nStep 4: Clustering a registered dataset by id...")
+    unscored = [{**p, "properties": {k: v for k, v in p["properties"].items() if k != "suitabilityScore"}}
+                for p in polygons]
+    response = client.post("/api/datasets", json={"features": unscored})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    dataset_id = response.get_json()["dataset_id"]
+    body = {
+        "dataset_id": dataset_id, "algorithm": "kmeans",
+        "params": {"n_clusters": 4, "min_polygons_per_cluster": 1, "max_polygons_per_cluster": 200},
+        "response_mode": "labels"
+    }
+    response = client.post("/api/cluster", json=body)
+    assert response.status_code == 400, response.status_code
+    print(f"  ✅ Unscored dataset rejected ({response.status_code})")
+
+    # Passing features and weights scores it in the same request, matching normalize-score
+    response = client.post("/api/cluster", json={**body, "features": features, "weights": [1]})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    assert result["dataset_id"] == dataset_id
+    reference = client.post("/api/normalize-score", json={
+        "dataset_id": dataset_id, "features": features, "weights": [1], "response_mode": "labels"
+    }).get_json()
+    assert result["suitability_scores"] == reference["suitability_scores"]
+    assert any(score > 0 for score in result["suitability_scores"])
+    print(f"  ✅ Scored and clustered {len(result['polygon_ids'])} villages by dataset id")
+
+if __name__ == "__main__":
+    test_spatial_dataset()
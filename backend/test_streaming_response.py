@@ -0,0 +1,69 @@
+import json
+import zlib
+
+from cluster_api import app
+
+def test_streaming_response():
+    """Test chunked, compressed JSON responses for large result sets"""
+    client = app.test_client()
+
+    # Sample data
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.2 + (i % 50) * 0.01, 28.6 + (i // 50) * 0.01]},
+            "properties": {"total_population": 800 + i, "total_hhd": 150 + i % 40, "is_bank_available": i % 2}
+        }
+        for i in range(3000)
+    ]
+
+    features = ["total_population", "total_hhd", "is_bank_available"]
+    weights = [1, 1, 1]
+
+    print("=== Testing Streaming Responses ===\n")
+
+    # Step 1: Buffered response as the reference
+    print("Step 1: Scoring without streaming...")
+    reference = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": weights
+    })
+    print(f"  Status Code: {reference.status_code}")
+    assert reference.status_code == 200, reference.get_data(as_text=True)
+
+    # Step 2: Streamed gzip response, decoded chunk by chunk
+    print("\nStep 2: Scoring with stream_response and gzip...")
+    response = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": weights, "stream_response": True
+    }, headers={"Accept-Encoding": "gzip"})
+    print(f"  Status Code: {response.status_code}, Content-Encoding: {response.headers.get('Content-Encoding')}")
+    assert response.status_code == 200
+    assert response.headers.get('Content-Encoding') == 'gzip'
+    decompressor = zlib.decompressobj(31)
+    chunks, body, compressed_size = 0, b"", 0
+    for chunk in response.response:
+        chunks += 1
+        compressed_size += len(chunk)
+        body += decompressor.decompress(chunk)
+    result = json.loads(body)
+    assert chunks > 1
+    assert result['polygons'] == reference.get_json()['polygons']
+    print(f"  ✅ Received {chunks} chunks, {compressed_size} compressed bytes for {len(body)} bytes of JSON")
+    print("  ✅ Same polygons as buffered response")
+
+    # Step 3: Streamed clustering response without compression
+    print("\nStep 3: Clustering with stream_response...")
+    response = client.post("/api/cluster", json={
+        "polygons": result['polygons'],
+        "algorithm": "kmeans",
+        "params": {"n_clusters": 5, "min_polygons_per_cluster": 1, "max_polygons_per_cluster": 5000},
+        "stream_response": True
+    }, headers={"Accept-Encoding": "identity"})
+    print(f"  Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = json.loads(response.get_data())
+    assert len(result['polygons']) == len(polygons)
+    print(f"  ✅ Found {result['total_clusters']} clusters with {len(result['polygons'])} polygons")
+
+if __name__ == "__main__":
+    test_streaming_response()
@@ -0,0 +1,120 @@
+import io
+import json
+
+from cluster_api import app
+from dataset_store import SpatialDataset, StreamingGeoJSONParser, build_dataset_from_stream
+
+def test_streaming_upload():
+    """Test registering a GeoJSON dataset through the incremental streaming parser"""
+    client = app.test_client()
+
+    # Sample data with polygon geometry; only the centroid and numeric columns are kept
+    features = []
+    for i in range(50):
+        lng, lat = 77.0 + i * 0.01, 28.0 + i * 0.01
+        features.append({
+            "type": "Feature",
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [[[lng, lat], [lng + 0.005, lat], [lng + 0.005, lat + 0.005], [lng, lat + 0.005], [lng, lat]]]
+            },
+            "properties": {
+                "village_name": f"Village {i}",
+                "total_population": 500 + i * 10,
+                "total_hhd": 100 + i,
+                "is_bank_available": i % 2
+            }
+        })
+    body = json.dumps({"type": "FeatureCollection", "features": features})
+
+    print("=== Testing Streaming Upload ===\n")
+
+    print("Step 1: Streaming dataset with a column filter...")
+    response = client.post(
+        "/api/datasets?stream=true&columns=total_population,total_hhd",
+        data=body,
+        content_type="application/json"
+    )
+    print(f"  Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    result = response.get_json()
+    assert result['total_polygons'] == len(features)
+    assert sorted(result['feature_names']) == ["total_hhd", "total_population"]
+    filtered_id = result['dataset_id']
+    print(f"  ✅ Registered dataset {filtered_id} with {result['total_polygons']} polygons")
+    print(f"  📊 Kept feature columns: {result['feature_names']}")
+
+    # The same body without a column filter is a different dataset
+    response = client.post("/api/datasets?stream=true", data=body, content_type="application/json")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['dataset_id'] != filtered_id
+    assert "is_bank_available" in response.get_json()['feature_names']
+    print("  ✅ Unfiltered upload registered separately")
+
+    print("\nStep 2: Streaming a normalize-score request body...")
+    def score(weights):
+        return client.post(
+            "/api/normalize-score?stream=true",
+            data=json.dumps({
+                "features": ["total_population", "total_hhd"],
+                "weights": weights,
+                "polygons": features
+            }),
+            content_type="application/json"
+        )
+    response = score([1, 1])
+    print(f"  Status Code: {response.status_code}")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result = response.get_json()
+    assert result['total_polygons'] == len(features)
+    print(f"  ✅ Scored {result['total_polygons']} polygons (dataset_id: {result.get('dataset_id')})")
+
+    # Changing only the weights reuses the dataset registered from the same polygons
+    again = score([2, 1]).get_json()
+    assert again.get('dataset_id') == result.get('dataset_id')
+    print("  ✅ Same polygons map to the same dataset across weight changes")
+
+def test_streamed_cluster_labels():
+    """Test that streamed uploads keep the cluster numbers echoed from an earlier response"""
+    client = app.test_client()
+
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + i * 0.01, 28.0 + (i % 4) * 0.01]},
+            "properties": {"total_population": 500 + i * 10, "total_hhd": 100 + i},
+            "cluster": i % 3 + 1
+        }
+        for i in range(20)
+    ]
+
+    print("=== Testing Streamed Cluster Labels ===\n")
+
+    inline = SpatialDataset.from_features(polygons)
+    parser = StreamingGeoJSONParser(io.BytesIO(json.dumps({"type": "FeatureCollection", "features": polygons}).encode('utf-8')))
+    streamed, _ = build_dataset_from_stream(parser)
+    assert streamed.labels.tolist() == inline.labels.tolist() == [i % 3 + 1 for i in range(20)]
+    print("  ✅ Streamed labels match SpatialDataset.from_features")
+
+    # A scenario targeting a cluster must change the same villages whichever way the body is parsed
+    body = json.dumps({
+        "polygons": polygons, "algorithm": "kmeans", "params": {"n_clusters": 3, "min_polygons_per_cluster": 1},
+        "features": ["total_population", "total_hhd"], "weights": [1, 1], "response_mode": "labels",
+        "scenarioConfig": {
+            "featureChanges": [{"feature": "total_population", "percentChange": 50}],
+            "villagePercentage": 100, "randomnessFactor": 0, "target": {"clusters": [2]}
+        }
+    })
+    results = []
+    for path in ("/api/cluster", "/api/cluster?stream=true"):
+        response = client.post(path, data=body, content_type="application/json")
+        assert response.status_code == 200, response.get_data(as_text=True)
+        results.append(response.get_json())
+    assert results[0]['suitability_scores'] == results[1]['suitability_scores']
+    print("  ✅ Inline and streamed scenario requests return the same scores")
+
+if __name__ == "__main__":
+    test_streaming_upload()
+    test_streamed_cluster_labels()
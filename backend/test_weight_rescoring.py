@@ -0,0 +1,98 @@
+import gc
+import json
+import random
+import time
+
+import numpy as np
+
+import feature_store
+from cluster_api import app
+from feature_store import FeatureTable
+
+def test_weight_rescoring():
+    """Test that weight-only re-scoring of a registered dataset is fast and matches a full re-score"""
+    client = app.test_client()
+
+    # Sample data
+    random.seed(7)
+    polygons = [
+        {
+            "type": "Feature",
+            "id": f"village_{i}",
+            "geometry": {"type": "Point", "coordinates": [77.0 + random.random(), 28.0 + random.random()]},
+            "properties": {
+                "total_population": random.randint(100, 5000),
+                "total_hhd": random.randint(10, 900),
+                "is_bank_available": random.randint(0, 1),
+                "net_sown_area_in_hac": random.random() * 300
+            }
+        }
+        for i in range(20000)
+    ]
+    features = ["total_population", "total_hhd", "is_bank_available", "net_sown_area_in_hac"]
+
+    print("=== Testing Weight-only Re-scoring ===\n")
+
+    response = client.post("/api/datasets", json={"features": polygons})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    dataset_id = response.get_json()['dataset_id']
+    print(f"Registered dataset {dataset_id}\n")
+
+    # Simulate a weight slider: same features, changing weights
+    for weights in ([1, 1, 1, 1], [3, 1, 1, 1], [3, 1, 2, 1], [3, 1, 2, 5]):
+        start = time.time()
+        response = client.post("/api/normalize-score", json={
+            "dataset_id": dataset_id, "features": features, "weights": weights, "response_mode": "labels"
+        })
+        elapsed = time.time() - start
+        assert response.status_code == 200, response.get_data(as_text=True)
+        scores = response.get_json()['suitability_scores']
+        assert len(scores) == len(polygons)
+        print(f"  weights {weights}: {len(scores)} scores in {elapsed * 1000:.0f} ms")
+
+    # The last cached re-score must match scoring the same polygons inline
+    inline = client.post("/api/normalize-score", json={
+        "polygons": polygons, "features": features, "weights": [3, 1, 2, 5], "response_mode": "labels"
+    })
+    assert inline.status_code == 200, inline.get_data(as_text=True)
+    max_diff = max(abs(a - b) for a, b in zip(scores, inline.get_json()['suitability_scores']))
+    assert max_diff < 1e-9, max_diff
+    print(f"\n  ✅ Matches inline scoring (max difference {max_diff})")
+
+def test_normalized_cache_budget():
+    """Test that the normalized matrix cache limit holds across every table in the process"""
+    budget = feature_store.normalized_cache_budget
+    max_bytes = budget.max_bytes
+    matrix_bytes = 1000 * 2 * 8
+
+    print("=== Testing Normalized Cache Budget ===\n")
+
+    try:
+        # Matrices cached by earlier requests are older, so they are evicted first
+        budget.max_bytes = 3 * matrix_bytes
+        tables = [FeatureTable.from_arrays(["a", "b"], [np.random.rand(1000), np.random.rand(1000)], 1000)
+                  for _ in range(5)]
+        for table in tables:
+            table.normalized(["a", "b"])
+        assert budget.nbytes <= budget.max_bytes
+        assert [len(table._normalized_cache) for table in tables] == [0, 0, 1, 1, 1]
+        print("  ✅ Five tables share a budget of three matrices, oldest evicted first")
+
+        # A hit refreshes the matrix, so the next eviction takes another table's
+        tables[2].normalized(["a", "b"])
+        FeatureTable.from_arrays(["a"], [np.random.rand(2000)], 2000).normalized(["a"])
+        assert [len(table._normalized_cache) for table in tables] == [0, 0, 1, 0, 1]
+        print("  ✅ Recently used matrices are kept")
+
+        # Collected tables release their share
+        held = budget.nbytes
+        del tables, table
+        gc.collect()
+        assert budget.nbytes == held - 2 * matrix_bytes
+        print("  ✅ Collected tables release their bytes")
+    finally:
+        budget.max_bytes = max_bytes
+
+if __name__ == "__main__":
+    test_weight_rescoring()
+    test_normalized_cache_budget()